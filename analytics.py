@@ -0,0 +1,185 @@
+"""Columnar NumPy analytics over a user's full transaction history.
+
+A user's transactions are loaded once into compact parallel arrays (int64
+cents, int32 day numbers, int32 category codes, a bool income flag) and kept
+in a small LRU keyed by user id. Each entry remembers the user's data_version,
+read in the same transaction as the arrays, so any write makes the next lookup
+reload them, and arrays from a lagging analytics replica are never filed under
+a newer version than the one they were read at.
+"""
+from collections import OrderedDict
+import threading
+
+import numpy as np
+
+EPOCH_JULIAN_DAY = 2440587.5  # julianday('1970-01-01')
+
+# SQLite does the per-row conversions, so Python only sees ints
+COLUMNS_SQL = (
+    'SELECT CAST(ROUND(amount * 100) AS INTEGER), '
+    'CAST(julianday(date(date)) - %s AS INTEGER), '
+    'category_id, type = \'income\' '
+    'FROM "transaction" WHERE user_id = ?' % EPOCH_JULIAN_DAY
+)
+CATEGORY_NAMES_SQL = 'SELECT id, name FROM category WHERE user_id = ?'
+DATA_VERSION_SQL = 'SELECT data_version FROM "user" WHERE id = ?'
+
+
+class UserColumns:
+    __slots__ = ('cents', 'days', 'codes', 'income', 'categories')
+
+    def __init__(self, cents, days, codes, income, categories):
+        self.cents = cents
+        self.days = days
+        self.codes = codes
+        self.income = income
+        self.categories = categories
+
+    def __len__(self):
+        return len(self.cents)
+
+    @classmethod
+    def from_rows(cls, rows, names):
+        """Build from (cents, day, category_id, is_income) rows; `names` maps category ids to names"""
+        if not rows:
+            empty = np.empty(0, dtype=np.int64)
+            return cls(empty, empty.astype(np.int32), empty.astype(np.int32), empty.astype(bool), [])
+        cents, days, category, income = zip(*rows)
+        # Category ids are global, so renumber them densely in first-seen order for bincount
+        lookup = {}
+        codes = np.fromiter((lookup.setdefault(c, len(lookup)) for c in category), dtype=np.int32, count=len(category))
+        return cls(
+            np.array(cents, dtype=np.int64),
+            np.array(days, dtype=np.int32),
+            codes,
+            np.array(income, dtype=bool),
+            [names[c] for c in lookup]
+        )
+
+    @property
+    def months(self):
+        """Months since 1970-01 for every row"""
+        return self.days.astype('datetime64[D]').astype('datetime64[M]').astype(np.int64)
+
+
+def load_columns(connection, user_id):
+    """(data_version, UserColumns) for `user_id`, all read from one snapshot of the database"""
+    # Plain sqlite3 tuples; SQLAlchemy Row wrapping costs more than the query at 100k+ rows
+    dbapi_connection = connection.connection.dbapi_connection
+    cursor = dbapi_connection.cursor()
+    # pysqlite opens no transaction for SELECTs; without one each statement would see its own snapshot
+    own_transaction = not dbapi_connection.in_transaction
+    try:
+        if own_transaction:
+            cursor.execute('BEGIN')
+        version = cursor.execute(DATA_VERSION_SQL, (user_id,)).fetchone()[0]
+        rows = cursor.execute(COLUMNS_SQL, (user_id,)).fetchall()
+        names = dict(cursor.execute(CATEGORY_NAMES_SQL, (user_id,)).fetchall())
+        return version, UserColumns.from_rows(rows, names)
+    finally:
+        if own_transaction and dbapi_connection.in_transaction:
+            dbapi_connection.rollback()
+        cursor.close()
+
+
+class ColumnStore:
+    """LRU of per-user column sets, invalidated by the user's data_version"""
+
+    def __init__(self, max_users=256):
+        self.max_users = max_users
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, user_id, version, loader):
+        """(version, columns) cached at `version`, or whatever `loader` returns, kept under its own version"""
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is not None and entry[0] == version:
+                self._entries.move_to_end(user_id)
+                return entry
+        entry = loader()
+        with self._lock:
+            self._entries[user_id] = entry
+            self._entries.move_to_end(user_id)
+            while len(self._entries) > self.max_users:
+                self._entries.popitem(last=False)
+        return entry
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+def _month_label(month_index):
+    return str(np.datetime64(int(month_index), 'M'))
+
+
+def monthly_series(cols, first_month, last_month):
+    """Income and expense cents per month index in [first_month, last_month]"""
+    size = last_month - first_month + 1
+    months = cols.months - first_month
+    in_range = (months >= 0) & (months < size)
+    income = np.bincount(months[in_range & cols.income], weights=cols.cents[in_range & cols.income],
+                         minlength=size)
+    expense = np.bincount(months[in_range & ~cols.income], weights=cols.cents[in_range & ~cols.income],
+                          minlength=size)
+    return income, expense
+
+
+def weekly_expenses(cols, last_day, weeks):
+    """Expense cents per Monday-based week, for the `weeks` weeks ending with `last_day`'s week"""
+    week = (cols.days.astype(np.int64) + 3) // 7  # 1970-01-01 was a Thursday
+    last_week = (last_day + 3) // 7
+    offset = week - (last_week - weeks + 1)
+    keep = ~cols.income & (offset >= 0) & (offset < weeks)
+    totals = np.bincount(offset[keep], weights=cols.cents[keep], minlength=weeks)
+    starts = (np.arange(last_week - weeks + 1, last_week + 1) * 7 - 3).astype('datetime64[D]')
+    return starts, totals
+
+
+def rolling_mean(values, window):
+    """Trailing mean; the first window-1 points average over what is available"""
+    values = np.asarray(values, dtype=np.float64)
+    if len(values) == 0:
+        return values
+    sums = np.cumsum(values)
+    sums[window:] = sums[window:] - sums[:-window]
+    counts = np.minimum(np.arange(1, len(values) + 1), window)
+    return sums / counts
+
+
+def insights(cols, today_days, months=12, weeks=12, window=3, percentiles=(50, 90, 99)):
+    """Vectorized analytics summary over the whole history, in dollars"""
+    last_month = int(np.array(today_days, dtype='datetime64[D]').astype('datetime64[M]').astype(np.int64))
+    first_month = last_month - months + 1
+    income, expense = monthly_series(cols, first_month, last_month)
+    week_starts, week_totals = weekly_expenses(cols, today_days, weeks)
+
+    expense_rows = ~cols.income
+    category_expense = np.bincount(cols.codes[expense_rows], weights=cols.cents[expense_rows],
+                                   minlength=len(cols.categories))
+    category_income = np.bincount(cols.codes[cols.income], weights=cols.cents[cols.income],
+                                  minlength=len(cols.categories))
+    order = np.argsort(-category_expense, kind='stable')
+
+    expense_amounts = cols.cents[expense_rows]
+    if len(expense_amounts):
+        pct_values = np.percentile(expense_amounts, percentiles) / 100
+    else:
+        pct_values = np.zeros(len(percentiles))
+
+    return {
+        'transactions': len(cols),
+        'monthly': [{'period': _month_label(first_month + i), 'income': inc / 100, 'expenses': exp / 100,
+                     'net': (inc - exp) / 100}
+                    for i, (inc, exp) in enumerate(zip(income, expense))],
+        'rolling_expenses': [round(v / 100, 2) for v in rolling_mean(expense, window)],
+        'rolling_net': [round(v / 100, 2) for v in rolling_mean(income - expense, window)],
+        'weekly_expenses': [{'week_start': str(start), 'expenses': total / 100}
+                            for start, total in zip(week_starts, week_totals)],
+        'category_expenses': [{'category': cols.categories[i], 'total': category_expense[i] / 100}
+                              for i in order if category_expense[i] > 0],
+        'category_income': [{'category': cols.categories[i], 'total': category_income[i] / 100}
+                            for i in np.argsort(-category_income, kind='stable') if category_income[i] > 0],
+        'expense_percentiles': {f'p{p}': round(float(v), 2) for p, v in zip(percentiles, pct_values)},
+    }
@@ -1,65 +1,131 @@
-from flask import Flask, render_template, request, jsonify, session, redirect, url_for
+from flask import (Flask, Blueprint, render_template, request, jsonify, session, redirect, url_for, make_response,
+                   send_file, send_from_directory, stream_with_context, g, current_app, has_request_context)
 from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy import create_engine
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.engine import make_url
+from sqlalchemy.orm import Session, object_session
 from werkzeug.security import generate_password_hash, check_password_hash
+from werkzeug.utils import safe_join
 from datetime import datetime, timedelta
-from functools import wraps
+from dateutil.relativedelta import relativedelta
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial, wraps
+import base64
+import click
+import csv
+import heapq
+import io
+import itertools
+import mimetypes
 import os
+import time
 
-app = Flask(__name__)
-app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///finance.db'
-app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
-app.secret_key = 'change-me-in-production-' + os.urandom(16).hex()
-app.permanent_session_lifetime = 24 * 60 * 60  # 24 hours
+import numpy as np
 
-db = SQLAlchemy(app)
+from analytics import ColumnStore, insights, load_columns
+import assets
+from cache import ResponseCache
+from compression import COMPRESSIBLE_MIMETYPES, FILE_SUFFIXES, compress, negotiate
+from config import Config
+from events import EventBroker, format_sse
+import metrics
+from database import engine_options, install_sqlite_pragmas, is_memory_sqlite, sqlite_pragmas
+from importer import ImportFormatError, PARSERS, detect_format
+from migrations import init_db, lock_for_migration, upgrade
+from reports import JOB_ID_PATTERN, PERIOD_PATTERNS, ReportJobs, job_id_for
+import recurring
+import search
+import sharding
+from writes import WriteQueue, WriteQueueUnavailable
+
+db = SQLAlchemy(session_options={'class_': sharding.ShardedSession})
+# cli_group=None keeps the commands top-level: `flask upgrade-db`, not `flask main upgrade-db`
+bp = Blueprint('main', __name__, cli_group=None)
+# Process-wide; create_app() sizes them from its config
+response_cache = ResponseCache()
+report_jobs = ReportJobs()
+column_store = ColumnStore()
+event_broker = EventBroker()
 
 # ==================== Models ====================
 class User(db.Model):
+    # Accounts always live in the main database; see sharding.py
+    __table_args__ = {'info': {'central': True}}
+
     id = db.Column(db.Integer, primary_key=True)
     username = db.Column(db.String(80), unique=True, nullable=False)
     email = db.Column(db.String(120), unique=True, nullable=False)
     password = db.Column(db.String(200), nullable=False)
     created_at = db.Column(db.DateTime, nullable=False, default=datetime.now)
+    data_version = db.Column(db.Integer, nullable=False, default=0)  # bumped on every write to the user's data
     
     transactions = db.relationship('Transaction', backref='user', lazy=True, cascade='all, delete-orphan')
     budgets = db.relationship('Budget', backref='user', lazy=True, cascade='all, delete-orphan')
     goals = db.relationship('SavingsGoal', backref='user', lazy=True, cascade='all, delete-orphan')
+    categories = db.relationship('Category', backref='user', lazy=True, cascade='all, delete-orphan')
+    recurring_rules = db.relationship('RecurringRule', backref='user', lazy=True, cascade='all, delete-orphan')
+
+class Category(db.Model):
+    """A user's category names; transactions, budgets and rollups refer to them by id"""
+    __table_args__ = (
+        db.UniqueConstraint('user_id', 'name', name='uq_category_user_name'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    name = db.Column(db.String(100), nullable=False)
 
 class Transaction(db.Model):
+    __table_args__ = (
+        db.Index('ix_transaction_user_date', 'user_id', 'date'),
+        db.Index('ix_transaction_user_type_category_date', 'user_id', 'type', 'category_id', 'date'),
+    )
+
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
     type = db.Column(db.String(50), nullable=False)  # 'income' or 'expense'
-    category = db.Column(db.String(100), nullable=False)
+    category_id = db.Column(db.Integer, db.ForeignKey('category.id'), nullable=False)
     amount = db.Column(db.Float, nullable=False)
     description = db.Column(db.String(500))
     date = db.Column(db.DateTime, nullable=False, default=datetime.now)
+    category = db.relationship(Category, lazy='joined', innerjoin=True, load_on_pending=True)
     
     def to_dict(self):
         return {
             'id': self.id,
             'type': self.type,
-            'category': self.category,
+            'category': self.category.name,
             'amount': self.amount,
             'description': self.description,
             'date': self.date.strftime('%Y-%m-%d %H:%M')
         }
 
 class Budget(db.Model):
+    __table_args__ = (
+        db.Index('ix_budget_user_month_category', 'user_id', 'month', 'category_id'),
+    )
+
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
-    category = db.Column(db.String(100), nullable=False)
+    category_id = db.Column(db.Integer, db.ForeignKey('category.id'), nullable=False)
     limit = db.Column(db.Float, nullable=False)
     month = db.Column(db.String(7), nullable=False, default=datetime.now().strftime('%Y-%m'))
+    category = db.relationship(Category, lazy='joined', innerjoin=True, load_on_pending=True)
     
     def to_dict(self):
         return {
             'id': self.id,
-            'category': self.category,
+            'category': self.category.name,
             'limit': self.limit,
             'month': self.month
         }
 
 class SavingsGoal(db.Model):
+    __table_args__ = (
+        db.Index('ix_savings_goal_user', 'user_id'),
+    )
+
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
     name = db.Column(db.String(200), nullable=False)
@@ -79,11 +145,994 @@ class SavingsGoal(db.Model):
             'progress': round((self.current / self.target) * 100, 1) if self.target > 0 else 0
         }
 
-# Create tables
-with app.app_context():
-    db.drop_all()
-    db.create_all()
-    print("[OK] Database initialized")
+class RecurringRule(db.Model):
+    """A repeating transaction kept as one row; the scheduler writes its occurrences as they fall due"""
+    __table_args__ = (
+        db.Index('ix_recurring_rule_user', 'user_id'),
+        db.Index('ix_recurring_rule_next_date', 'next_date'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    type = db.Column(db.String(50), nullable=False)
+    category_id = db.Column(db.Integer, db.ForeignKey('category.id'), nullable=False)
+    amount = db.Column(db.Float, nullable=False)
+    description = db.Column(db.String(500))
+    frequency = db.Column(db.String(10), nullable=False)  # 'daily', 'weekly', 'monthly' or 'yearly'
+    start_date = db.Column(db.DateTime, nullable=False)
+    end_date = db.Column(db.DateTime)  # last day an occurrence may fall on; None runs forever
+    materialized = db.Column(db.Integer, nullable=False, default=0)  # occurrences written as transactions
+    next_date = db.Column(db.DateTime)  # date of occurrence number `materialized`; None once the rule has ended
+    category = db.relationship(Category, lazy='joined', innerjoin=True, load_on_pending=True)
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'type': self.type,
+            'category': self.category.name,
+            'amount': self.amount,
+            'description': self.description,
+            'frequency': self.frequency,
+            'start_date': self.start_date.strftime('%Y-%m-%d'),
+            'end_date': self.end_date.strftime('%Y-%m-%d') if self.end_date else None,
+            'next_date': self.next_date.strftime('%Y-%m-%d') if self.next_date else None,
+            'materialized': self.materialized
+        }
+
+class MonthlyRollup(db.Model):
+    """Per-user monthly totals, maintained alongside every Transaction insert/delete"""
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), primary_key=True)
+    month = db.Column(db.String(7), primary_key=True)  # 'YYYY-MM'
+    type = db.Column(db.String(50), primary_key=True)
+    category_id = db.Column(db.Integer, db.ForeignKey('category.id'), primary_key=True)
+    total = db.Column(db.Float, nullable=False, default=0)
+    count = db.Column(db.Integer, nullable=False, default=0)
+
+class ChangeLog(db.Model):
+    """One row per write to a user's transactions, budgets, goals or recurring rules, read by GET /api/sync"""
+    __tablename__ = 'change_log'
+    __table_args__ = (
+        db.Index('ix_change_log_user_version', 'user_id', 'version'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    version = db.Column(db.Integer, nullable=False)  # the user's data_version after the write
+    kind = db.Column(db.String(20), nullable=False)  # 'transaction', 'budget', 'goal', 'recurring' or 'reset'
+    first_id = db.Column(db.Integer)  # rows first_id..last_id of `kind`; a range for imports
+    last_id = db.Column(db.Integer)
+    deleted = db.Column(db.Boolean, nullable=False, default=False)
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.now)
+
+def apply_to_rollup(connection, transaction, sign):
+    """Add (sign=1) or remove (sign=-1) one transaction from its rollup bucket"""
+    amount = sign * transaction.amount
+    rollups = MonthlyRollup.__table__
+    key = {'user_id': transaction.user_id, 'month': transaction.date.strftime('%Y-%m'),
+           'type': transaction.type, 'category_id': transaction.category_id}
+    stmt = sqlite_insert(rollups).values(total=amount, count=sign, **key)
+    connection.execute(stmt.on_conflict_do_update(
+        index_elements=['user_id', 'month', 'type', 'category_id'],
+        set_={'total': rollups.c.total + amount, 'count': rollups.c.count + sign}
+    ))
+    if sign < 0:
+        # Only the bucket just decremented, found by its primary key
+        connection.execute(rollups.delete().where(
+            *(rollups.c[name] == value for name, value in key.items()), rollups.c.count <= 0
+        ))
+
+# Mapper events run inside the flush, so rollups commit or roll back with the transaction itself
+@db.event.listens_for(Transaction, 'after_insert')
+def _rollup_after_insert(mapper, connection, target):
+    apply_to_rollup(connection, target, 1)
+
+@db.event.listens_for(Transaction, 'after_delete')
+def _rollup_after_delete(mapper, connection, target):
+    apply_to_rollup(connection, target, -1)
+
+# The search index is not in the metadata: create and drop it with the transaction table
+db.event.listen(Transaction.__table__, 'after_create', db.DDL(search.CREATE_SQL))
+db.event.listen(Transaction.__table__, 'before_drop', db.DDL(search.DROP_SQL))
+
+@db.event.listens_for(Transaction, 'after_insert')
+def _search_after_insert(mapper, connection, target):
+    search.index_rows(connection, [(target.id, target.user_id, target.description)])
+
+SEARCH_ATTRIBUTES = ('user_id', 'description')
+
+def _load_old_value(target, value, oldvalue, initiator):
+    pass  # registered with active_history so an update can unindex the old terms
+
+for _name in SEARCH_ATTRIBUTES:
+    db.event.listen(getattr(Transaction, _name), 'set', _load_old_value, active_history=True)
+
+def value_before_flush(state, name):
+    """An attribute's value before the flush in progress, from the history active_history keeps"""
+    history = state.attrs[name].history
+    if history.deleted:
+        return history.deleted[0]
+    if history.added:
+        return None  # set for the first time
+    return getattr(state.object, name)  # unchanged
+
+@db.event.listens_for(Transaction, 'after_update')
+def _search_after_update(mapper, connection, target):
+    state = db.inspect(target)
+    # Old terms: what the row was indexed with before this update
+    old_user_id, old_description = (value_before_flush(state, name) for name in SEARCH_ATTRIBUTES)
+    old_terms = search.terms(old_user_id, old_description)
+    # New terms: what it has to be indexed with now
+    new_terms = search.terms(target.user_id, target.description)
+    # Other columns (amount, date, category) are not in the index
+    if new_terms == old_terms:
+        return
+    search.unindex_rows(connection, [(target.id, old_user_id, old_description)])
+    search.index_rows(connection, [(target.id, target.user_id, target.description)])
+
+@db.event.listens_for(Transaction, 'after_delete')
+def _search_after_delete(mapper, connection, target):
+    search.unindex_rows(connection, [(target.id, target.user_id, target.description)])
+
+def bump_data_version(connection, user_id):
+    """Increment the user's data_version and return the new value"""
+    users = User.__table__
+    return connection.execute(users.update().where(users.c.id == user_id).values(
+        data_version=users.c.data_version + 1
+    ).returning(users.c.data_version)).scalar()
+
+def log_change(connection, user_id, version, kind, first_id=None, last_id=None, deleted=False):
+    """Record a write in the user's change log; 'reset' tells sync clients to reload everything"""
+    connection.execute(ChangeLog.__table__.insert().values(
+        user_id=user_id, version=version, kind=kind, first_id=first_id,
+        last_id=first_id if last_id is None else last_id, deleted=deleted
+    ))
+
+def queue_event(session, user_id, event_type, data):
+    """Hold a live-update event until the session commits (dropped on rollback)"""
+    session.info.setdefault('pending_events', []).append((user_id, event_type, data))
+
+EVENT_NAMES = {Transaction: 'transaction', Budget: 'budget', SavingsGoal: 'goal', RecurringRule: 'recurring'}
+
+def _write_listener(action):
+    def after_write(mapper, connection, target):
+        version = bump_data_version(connection, target.user_id)
+        kind = EVENT_NAMES[type(target)]
+        log_change(connection, target.user_id, version, kind, target.id, deleted=action == 'deleted')
+        data = {'id': target.id} if action == 'deleted' else target.to_dict()
+        data['version'] = version
+        queue_event(object_session(target), target.user_id, f'{kind}.{action}', data)
+    return after_write
+
+for _model in EVENT_NAMES:
+    for _event, _action in (('after_insert', 'created'), ('after_update', 'updated'), ('after_delete', 'deleted')):
+        db.event.listen(_model, _event, _write_listener(_action))
+
+@db.event.listens_for(Session, 'after_commit')
+def _publish_after_commit(session):
+    pending = session.info.pop('pending_events', None)
+    if not pending:
+        return
+    for user_id, event_type, data in pending:
+        event_broker.publish(user_id, event_type, data)
+    if has_request_context():
+        # Summaries are recomputed once per request, after the handler is done writing
+        g.setdefault('changed_users', set()).update(user_id for user_id, _, _ in pending)
+
+@db.event.listens_for(Session, 'after_rollback')
+def _discard_after_rollback(session):
+    session.info.pop('pending_events', None)
+
+def rebuild_rollups(user_id=None):
+    """Recompute rollups from raw transactions (backfill and repair)"""
+    if user_id is None and shard_engines():
+        for engine in shard_engines():
+            db.session.info['shard'] = engine
+            rebuild_rollups_on_shard()
+        return
+    route_to_user(user_id)
+    rebuild_rollups_on_shard(user_id)
+
+def rebuild_rollups_on_shard(user_id=None):
+    rollups = MonthlyRollup.__table__
+    month = db.func.strftime('%Y-%m', Transaction.date)
+    delete = rollups.delete()
+    source = db.select(
+        Transaction.user_id,
+        month,
+        Transaction.type,
+        Transaction.category_id,
+        db.func.sum(Transaction.amount),
+        db.func.count()
+    ).group_by(Transaction.user_id, month, Transaction.type, Transaction.category_id)
+    if user_id is not None:
+        delete = delete.where(rollups.c.user_id == user_id)
+        source = source.where(Transaction.user_id == user_id)
+    db.session.execute(delete)
+    db.session.execute(rollups.insert().from_select(
+        ['user_id', 'month', 'type', 'category_id', 'total', 'count'], source
+    ))
+    users = User.__table__
+    bump = users.update().values(data_version=users.c.data_version + 1)
+    if user_id is not None:
+        bump = bump.where(users.c.id == user_id)
+    db.session.execute(bump)
+    db.session.commit()
+
+
+@bp.cli.command('upgrade-db')
+def upgrade_db_command():
+    """Apply pending schema migrations to the main database and every shard"""
+    for engine in [db.engine] + shard_engines():
+        applied = upgrade(engine)
+        name = engine.url.database
+        print(f"[OK] {name}: applied migrations {applied}" if applied else f"[OK] {name} is up to date")
+
+@bp.cli.command('rebuild-search-index')
+def rebuild_search_index_command():
+    """Re-index every transaction description for full-text search"""
+    scanned = 0
+    users = User.__table__
+    for engine in data_engines():
+        db.session.info['shard'] = engine
+        connection = db.session.connection()
+        connection.exec_driver_sql(search.CREATE_SQL)
+        scanned += search.rebuild(connection)
+        db.session.execute(users.update().values(data_version=users.c.data_version + 1))
+        db.session.commit()
+    print(f"[OK] Search index rebuilt from {scanned} transactions")
+
+@bp.cli.command('rebuild-rollups')
+@click.option('--user-id', type=int, default=None, help='Only rebuild this user\'s rollups')
+def rebuild_rollups_command(user_id):
+    """Recompute monthly rollups from the transaction table"""
+    rebuild_rollups(user_id)
+    print("[OK] Rollups rebuilt")
+
+@bp.cli.command('rebalance-shards')
+@click.option('--from-count', type=int, required=True,
+              help='SHARD_COUNT the data was laid out for; 0 moves it out of the main database')
+def rebalance_shards_command(from_count):
+    """Move every user to the shard SHARD_COUNT assigns them. Stop the app first."""
+    count = current_app.config['SHARD_COUNT']
+    if not count:
+        raise click.ClickException('SHARD_COUNT is 0; set it to the new number of shards')
+    users = User.__table__
+    if from_count:
+        sources = [(n, shard_engine(n)) for n in range(max(from_count, count))]
+    else:
+        sources = [(None, db.engine)]
+    moved = copied = 0
+    for source_shard, source_engine in sources:
+        with source_engine.connect() as source:
+            user_ids = source.execute(db.select(users.c.id).order_by(users.c.id)).scalars().all()
+            for user_id in user_ids:
+                target_shard = sharding.shard_for(user_id, count)
+                if target_shard == source_shard:
+                    continue
+                with shard_engine(target_shard).connect() as target:
+                    lock_for_migration(target)
+                    lock_for_migration(source)
+                    copied += sharding.move_user(db.metadata, source, target, user_id,
+                                                 keep_user_row=source_shard is None)
+                    # Rows were renumbered, so sync clients have to start over
+                    version = target.execute(db.select(users.c.data_version).where(users.c.id == user_id)).scalar()
+                    log_change(target, user_id, version, 'reset')
+                    target.commit()
+                    source.commit()
+                moved += 1
+        if source_shard is not None and source_shard >= count:
+            source_engine.dispose()
+    print(f"[OK] Moved {moved} users ({copied} rows) onto {count} shards")
+
+@bp.cli.command('prune-change-log')
+@click.option('--days', type=int, default=90, help='Keep this many days of changes')
+def prune_change_log_command(days):
+    """Drop old change-log entries; clients that last synced before them download a fresh snapshot"""
+    log = ChangeLog.__table__
+    cutoff = datetime.now() - timedelta(days=days)
+    pruned = 0
+    for engine in data_engines():
+        db.session.info['shard'] = engine
+        newest = db.session.execute(db.select(log.c.user_id, db.func.max(log.c.version)).where(
+            log.c.created_at < cutoff
+        ).group_by(log.c.user_id)).all()
+        pruned += db.session.execute(log.delete().where(log.c.created_at < cutoff)).rowcount
+        for user_id, version in newest:
+            log_change(db.session.connection(), user_id, version, 'reset')
+        db.session.commit()
+    print(f"[OK] Pruned {pruned} change-log entries")
+
+@bp.cli.command('materialize-recurring')
+@click.option('--batch-size', type=int, default=None, help='Due rules read per query')
+def materialize_recurring_command(batch_size):
+    """Write the recurring transactions that have fallen due; run it from cron or set RECURRING_INTERVAL"""
+    written = materialize_due(batch_size=batch_size or RECURRING_BATCH_RULES)
+    print(f"[OK] Wrote {written} recurring transactions")
+
+@bp.cli.command('shard-stats')
+def shard_stats_command():
+    """Users, transactions and totals on every shard, and across all of them"""
+    users, transactions = User.__table__, Transaction.__table__
+    def total(kind):
+        return db.func.coalesce(db.func.sum(transactions.c.amount).filter(transactions.c.type == kind), 0)
+    per_shard = across_shards(db.select(
+        db.select(db.func.count()).select_from(users).scalar_subquery(),
+        db.func.count(transactions.c.id), total('income'), total('expense')
+    ))
+    print(f"{'shard':>6s} {'users':>8s} {'transactions':>13s} {'income':>15s} {'expense':>15s}")
+    for shard, [row] in enumerate(per_shard):
+        print(f"{shard:6d} {row[0]:8d} {row[1]:13d} {row[2]:15.2f} {row[3]:15.2f}")
+    sums = [sum(column) for column in zip(*(rows[0] for rows in per_shard))]
+    print(f"{'all':>6s} {sums[0]:8d} {sums[1]:13d} {sums[2]:15.2f} {sums[3]:15.2f}")
+
+# ==================== Helpers ====================
+MAX_ANALYTICS_MONTHS = 120
+MAX_ANALYTICS_WEEKS = 520
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
+MAX_COLUMNAR_PAGE_SIZE = 5000
+IMPORT_BATCH_SIZE = 20000
+IMPORT_COMMIT_ROWS = 100000
+MAX_IMPORT_ERRORS = 1000
+EXPORT_CHUNK_ROWS = 2000
+DEFAULT_SEARCH_RESULTS = 20
+MAX_SEARCH_RESULTS = 100
+MAX_SYNC_ENTRIES = 20000  # more changes than this since a client's version and it gets a fresh snapshot
+RECURRING_BATCH_RULES = 500
+DEFAULT_PROJECTION_MONTHS = 3
+MAX_PROJECTION_MONTHS = 24
+UPCOMING_OCCURRENCES = 10
+
+def data_version(user_id):
+    # A Core select, so that with sharding it reads the counter on the user's shard
+    users = User.__table__
+    return db.session.execute(db.select(users.c.data_version).where(users.c.id == user_id)).scalar()
+
+def read_session():
+    """Session on the read-only analytics pool; the main session when there is no separate pool"""
+    if 'analytics' not in db.engines:
+        return db.session
+    if 'read_session' not in g:
+        g.read_session = Session(db.engines['analytics'])
+    return g.read_session
+
+def close_read_session(exc):
+    read = g.pop('read_session', None)
+    if read is not None:
+        read.close()
+
+def category_ids(user_id, names):
+    """{name: id} for `names`, adding the ones the user does not have yet"""
+    names = set(names)
+    if not names:
+        return {}
+    categories = Category.__table__
+    db.session.execute(sqlite_insert(categories).on_conflict_do_nothing(index_elements=['user_id', 'name']),
+                       [{'user_id': user_id, 'name': name} for name in names])
+    return dict(db.session.execute(db.select(Category.name, Category.id).where(
+        Category.user_id == user_id, Category.name.in_(names)
+    )).all())
+
+def get_category(user_id, name):
+    """The user's Category called `name`, created if needed"""
+    if not isinstance(name, str) or not name.strip():
+        raise ValueError('category is required')
+    name = name.strip()
+    category = Category.query.filter_by(user_id=user_id, name=name).first()
+    if category is None:
+        # Through the upsert, so two requests adding the same new name don't collide
+        category = db.session.get(Category, category_ids(user_id, [name])[name])
+    return category
+
+def category_names(user_id, session=None):
+    """{id: name} of the user's categories, for labelling results grouped by category_id"""
+    return dict((session or read_session()).execute(
+        db.select(Category.id, Category.name).where(Category.user_id == user_id)
+    ).all())
+
+def month_bounds(when):
+    """Return the [start, end) datetimes of the calendar month containing `when`"""
+    start = when.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+    return start, start + relativedelta(months=1)
+
+def dashboard_summary(user_id, now=None):
+    """Compute the dashboard totals with a single SUM/CASE query over the monthly rollups.
+
+    The projected month totals add the recurring occurrences still due this month, expanded in memory.
+    """
+    now = now or datetime.now()
+    current_month = now.strftime('%Y-%m')
+    is_income = MonthlyRollup.type == 'income'
+    is_expense = MonthlyRollup.type == 'expense'
+    in_month = MonthlyRollup.month == current_month
+
+    def total(condition):
+        return db.func.coalesce(db.func.sum(db.case((condition, MonthlyRollup.total), else_=0)), 0)
+
+    total_income, total_expenses, month_income, month_expenses = read_session().query(
+        total(is_income),
+        total(is_expense),
+        total(db.and_(is_income, in_month)),
+        total(db.and_(is_expense, in_month))
+    ).filter(MonthlyRollup.user_id == user_id).one()
+
+    month_start, month_end = month_bounds(now)
+    pending = {'income': 0, 'expense': 0}
+    for rule, _ in pending_occurrences(recurring_rules(user_id, month_end), month_start, month_end):
+        pending[rule.type] += rule.amount
+
+    return {
+        'totalIncome': total_income,
+        'totalExpenses': total_expenses,
+        'balance': total_income - total_expenses,
+        'monthIncome': month_income,
+        'monthExpenses': month_expenses,
+        'savingsRate': round((month_income - month_expenses) / month_income * 100, 1) if month_income > 0 else 0,
+        'projectedMonthIncome': month_income + pending['income'],
+        'projectedMonthExpenses': month_expenses + pending['expense']
+    }
+
+def monthly_totals(user_id, months=12, now=None):
+    """Income/expense per calendar month, oldest first, read from the monthly rollups"""
+    current_start, _ = month_bounds(now or datetime.now())
+    window_start = current_start - relativedelta(months=months - 1)
+
+    rows = read_session().query(MonthlyRollup.month, MonthlyRollup.type, db.func.sum(MonthlyRollup.total)).filter(
+        MonthlyRollup.user_id == user_id,
+        MonthlyRollup.month >= window_start.strftime('%Y-%m'),
+        MonthlyRollup.month <= current_start.strftime('%Y-%m')
+    ).group_by(MonthlyRollup.month, MonthlyRollup.type).all()
+    totals = {(month, kind): amount for month, kind, amount in rows}
+
+    data = []
+    for i in range(months):
+        month_date = window_start + relativedelta(months=i)
+        month_str = month_date.strftime('%Y-%m')
+        data.append({
+            'month': month_date.strftime('%b'),
+            'period': month_str,
+            'income': totals.get((month_str, 'income'), 0),
+            'expenses': totals.get((month_str, 'expense'), 0)
+        })
+    return data
+
+def recurring_rules(user_id, before):
+    """The user's rules with an occurrence not yet written that falls before `before`"""
+    return read_session().query(RecurringRule).filter(
+        RecurringRule.user_id == user_id, RecurringRule.next_date < before
+    ).all()
+
+def pending_occurrences(rules, since, before):
+    """Yield (rule, date) for each occurrence in [since, before) not yet written as a transaction.
+
+    Occurrences are computed on the fly and never stored.
+    """
+    until = before - timedelta(microseconds=1)
+    for rule in rules:
+        first = max(rule.materialized, recurring.first_index_from(rule.start_date, rule.frequency, since))
+        for _, when in recurring.occurrences(rule.start_date, rule.frequency, first, until, rule.end_date):
+            yield rule, when
+
+def recurring_projection(user_id, months=DEFAULT_PROJECTION_MONTHS, now=None):
+    """Income/expense for the current month and the `months` - 1 after it: what is recorded so far
+    plus the recurring occurrences still to come"""
+    current_start, _ = month_bounds(now or datetime.now())
+    horizon = current_start + relativedelta(months=months)
+
+    rows = read_session().query(MonthlyRollup.month, MonthlyRollup.type, db.func.sum(MonthlyRollup.total)).filter(
+        MonthlyRollup.user_id == user_id,
+        MonthlyRollup.month >= current_start.strftime('%Y-%m'),
+        MonthlyRollup.month < horizon.strftime('%Y-%m')
+    ).group_by(MonthlyRollup.month, MonthlyRollup.type).all()
+    totals = {(month, kind): amount for month, kind, amount in rows}
+    for rule, when in pending_occurrences(recurring_rules(user_id, horizon), current_start, horizon):
+        key = (when.strftime('%Y-%m'), rule.type)
+        totals[key] = totals.get(key, 0) + rule.amount
+
+    data = []
+    for i in range(months):
+        month_date = current_start + relativedelta(months=i)
+        month_str = month_date.strftime('%Y-%m')
+        data.append({
+            'month': month_date.strftime('%b'),
+            'period': month_str,
+            'income': totals.get((month_str, 'income'), 0),
+            'expenses': totals.get((month_str, 'expense'), 0)
+        })
+    return data
+
+def upcoming_occurrences(user_id, limit=UPCOMING_OCCURRENCES):
+    """The next `limit` recurring occurrences not yet written as transactions, soonest first"""
+    rules = read_session().query(RecurringRule).filter(
+        RecurringRule.user_id == user_id, RecurringRule.next_date.is_not(None)
+    ).all()
+    # Each rule contributes at most `limit` dates and merge() only pulls what it needs
+    streams = [((when, rule.id, rule) for _, when in itertools.islice(recurring.occurrences(
+        rule.start_date, rule.frequency, rule.materialized, datetime.max, rule.end_date), limit)) for rule in rules]
+    return [{'rule_id': rule.id, 'date': when.strftime('%Y-%m-%d'), 'type': rule.type,
+             'category': rule.category.name, 'amount': rule.amount, 'description': rule.description}
+            for when, _, rule in itertools.islice(heapq.merge(*streams), limit)]
+
+def budget_progress(user_id, month=None):
+    """Budgets with spent/remaining/percentage, from one grouped spend query joined to the budgets.
+
+    With `month` only that month's budgets are returned; otherwise each budget
+    is measured against its own month.
+    """
+    spend = read_session().query(
+        MonthlyRollup.month, MonthlyRollup.category_id, db.func.sum(MonthlyRollup.total).label('spent')
+    ).filter(MonthlyRollup.user_id == user_id, MonthlyRollup.type == 'expense')
+    budgets = read_session().query(Budget).join(Budget.category).options(db.contains_eager(Budget.category)).filter(
+        Budget.user_id == user_id
+    )
+    if month:
+        spend = spend.filter(MonthlyRollup.month == month)
+        budgets = budgets.filter(Budget.month == month)
+    spend = spend.group_by(MonthlyRollup.month, MonthlyRollup.category_id).subquery()
+
+    rows = budgets.add_columns(db.func.coalesce(spend.c.spent, 0)).outerjoin(spend, db.and_(
+        spend.c.month == Budget.month, spend.c.category_id == Budget.category_id
+    )).order_by(Budget.month, Category.name).all()
+    return [dict(b.to_dict(), spent=spent, remaining=b.limit - spent,
+                 percentage=round(spent / b.limit * 100, 1) if b.limit > 0 else 0)
+            for b, spent in rows]
+
+def analytics_bundle(user_id, months=12, now=None, trend_categories=5, projection=DEFAULT_PROJECTION_MONTHS):
+    """Every analytics chart series in one payload, from a handful of grouped rollup queries,
+    plus `projection` months of recurring-rule projections"""
+    monthly = monthly_totals(user_id, months, now)
+    first_month, last_month = monthly[0]['period'], monthly[-1]['period']
+
+    names = category_names(user_id)
+    category_totals = read_session().query(
+        MonthlyRollup.type, MonthlyRollup.category_id, db.func.sum(MonthlyRollup.total)
+    ).filter(MonthlyRollup.user_id == user_id).group_by(MonthlyRollup.type, MonthlyRollup.category_id).order_by(
+        db.func.sum(MonthlyRollup.total).desc()
+    ).all()
+    expense_categories = [{'category': names[c], 'total': t} for kind, c, t in category_totals if kind == 'expense']
+    income_sources = [{'category': names[c], 'total': t} for kind, c, t in category_totals if kind == 'income']
+
+    # Per-category monthly spend for the busiest categories of the window
+    trend_rows = read_session().query(MonthlyRollup.category_id, MonthlyRollup.month, MonthlyRollup.total).filter(
+        MonthlyRollup.user_id == user_id,
+        MonthlyRollup.type == 'expense',
+        MonthlyRollup.month >= first_month,
+        MonthlyRollup.month <= last_month
+    ).all()
+    by_category = {}
+    for category, month, total in trend_rows:
+        by_category.setdefault(category, {})[month] = total
+    top = sorted(by_category, key=lambda c: sum(by_category[c].values()), reverse=True)[:trend_categories]
+    periods = [m['period'] for m in monthly]
+
+    return {
+        'monthly': monthly,
+        'expense_categories': expense_categories,
+        'income_sources': income_sources,
+        'category_trend': {
+            'months': periods,
+            'series': [{'category': names[c], 'data': [by_category[c].get(p, 0) for p in periods]} for c in top]
+        },
+        'budgets': budget_progress(user_id),
+        'goals': [goal.to_dict() for goal in read_session().query(SavingsGoal).filter_by(user_id=user_id)],
+        'projection': recurring_projection(user_id, projection, now),
+        'upcoming': upcoming_occurrences(user_id)
+    }
+
+def user_columns(user_id):
+    """The user's transactions as NumPy columns, reloaded only after a write"""
+    version, columns = column_store.get(user_id, data_version(user_id),
+                                        lambda: load_columns(read_session().connection(), user_id))
+    # The analytics pool may lag the primary; cached_response() must not file these under a newer version
+    if has_request_context():
+        g.read_version = version
+    return columns
+
+def analytics_insights(user_id, months=12, weeks=12, window=3, now=None):
+    today = np.datetime64((now or datetime.now()).date(), 'D').astype(np.int64)  # local, like stored dates
+    return insights(user_columns(user_id), int(today), months, weeks, window)
+
+def parse_date_arg(value, name):
+    try:
+        return datetime.strptime(value, '%Y-%m-%d')
+    except ValueError:
+        raise ValueError(f'{name} must be a YYYY-MM-DD date')
+
+def parse_amount_arg(value, name):
+    try:
+        return float(value)
+    except ValueError:
+        raise ValueError(f'{name} must be a number')
+
+def transaction_filters(user_id, args):
+    """Build the WHERE clause for the transaction list from query-string filters.
+
+    Supported: type, category, start_date / end_date (inclusive, YYYY-MM-DD),
+    min_amount / max_amount. Raises ValueError on malformed input.
+    """
+    conditions = [Transaction.user_id == user_id]
+    if args.get('type'):
+        conditions.append(Transaction.type == args['type'])
+    if args.get('category'):
+        conditions.append(Transaction.category_id == db.select(Category.id).where(
+            Category.user_id == user_id, Category.name == args['category']
+        ).scalar_subquery())
+    if args.get('start_date'):
+        conditions.append(Transaction.date >= parse_date_arg(args['start_date'], 'start_date'))
+    if args.get('end_date'):
+        end = parse_date_arg(args['end_date'], 'end_date') + timedelta(days=1)
+        conditions.append(Transaction.date < end)
+    if args.get('min_amount'):
+        conditions.append(Transaction.amount >= parse_amount_arg(args['min_amount'], 'min_amount'))
+    if args.get('max_amount'):
+        conditions.append(Transaction.amount <= parse_amount_arg(args['max_amount'], 'max_amount'))
+    return conditions
+
+def encode_cursor(date, tid):
+    """Opaque keyset cursor; `date` is a datetime or the ISO text SQLite stores"""
+    raw = f"{date.isoformat() if isinstance(date, datetime) else date}|{tid}"
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+def decode_cursor(cursor):
+    try:
+        date, tid = base64.urlsafe_b64decode(cursor.encode()).decode().split('|')
+        return datetime.fromisoformat(date), int(tid)
+    except (ValueError, UnicodeDecodeError):
+        raise ValueError('Invalid cursor')
+
+def page_conditions(user_id, args, max_limit):
+    """Page size and WHERE clause for one keyset page of the transaction list"""
+    limit = max(1, min(args.get('limit', DEFAULT_PAGE_SIZE, type=int), max_limit))
+    conditions = transaction_filters(user_id, args)
+    if args.get('cursor'):
+        conditions.append(db.tuple_(Transaction.date, Transaction.id) < decode_cursor(args['cursor']))
+    return limit, conditions
+
+def transaction_page(user_id, args):
+    """One keyset page of transactions, newest first, ordered by (date, id)"""
+    limit, conditions = page_conditions(user_id, args, MAX_PAGE_SIZE)
+
+    # Fetch one extra row to learn whether another page exists
+    rows = Transaction.query.filter(*conditions).order_by(
+        Transaction.date.desc(), Transaction.id.desc()
+    ).limit(limit + 1).all()
+    page = rows[:limit]
+    return {
+        'transactions': [t.to_dict() for t in page],
+        'next_cursor': encode_cursor(page[-1].date, page[-1].id) if len(rows) > limit else None
+    }
+
+def dictionary_encode(values):
+    """(codes, dictionary) with the dictionary in first-seen order"""
+    dictionary = list(dict.fromkeys(values))
+    index = {value: code for code, value in enumerate(dictionary)}
+    return list(map(index.__getitem__, values)), dictionary
+
+def transaction_columns(user_id, args):
+    """The same page as transaction_page() as parallel arrays, for ?format=columnar.
+
+    Selects plain columns instead of ORM objects and never builds a dict or date string per row.
+    `date` is seconds since 1970-01-01 of the stored wall-clock time (no timezone); `type` and
+    `category` are indexes into `types` and `categories`.
+    """
+    limit, conditions = page_conditions(user_id, args, MAX_COLUMNAR_PAGE_SIZE)
+    # A Core execute on the session's connection: plain tuples, no ORM result processing
+    rows = db.session.connection().execute(
+        db.select(
+            Transaction.id, Transaction.type, Transaction.category_id, Transaction.amount, Transaction.description,
+            db.cast(db.func.strftime('%s', Transaction.date), db.Integer),
+            db.type_coerce(Transaction.date, db.String)  # stored text, only needed for the cursor
+        ).where(*conditions).order_by(Transaction.date.desc(), Transaction.id.desc()).limit(limit + 1)
+    ).all()
+    more = len(rows) > limit
+    ids, types, categories, amounts, descriptions, dates, stored = zip(*rows[:limit]) if rows else ((),) * 7
+    type_codes, type_names = dictionary_encode(types)
+    category_codes, category_keys = dictionary_encode(categories)
+    names = category_names(user_id, db.session) if category_keys else {}
+    return {
+        'format': 'columnar',
+        'count': len(ids),
+        'id': list(ids),
+        'type': type_codes,
+        'types': type_names,
+        'category': category_codes,
+        'categories': [names[c] for c in category_keys],
+        'amount': list(amounts),
+        'description': list(descriptions),
+        'date': list(dates),
+        'next_cursor': encode_cursor(stored[-1], ids[-1]) if more else None
+    }
+
+def sqlite_datetime(value):
+    """Format a datetime exactly as SQLAlchemy's SQLite DateTime type stores it"""
+    return value.isoformat(' ', 'microseconds')
+
+def add_batch_to_rollups(user_id, rows):
+    """Fold (type, category_id, amount, sqlite date string) rows into the monthly rollups with one upsert"""
+    buckets = {}
+    for kind, category_id, amount, date in rows:
+        key = (date[:7], kind, category_id)
+        total, count = buckets.get(key, (0.0, 0))
+        buckets[key] = (total + amount, count + 1)
+
+    rollups = MonthlyRollup.__table__
+    stmt = sqlite_insert(rollups)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=['user_id', 'month', 'type', 'category_id'],
+        set_={'total': rollups.c.total + stmt.excluded.total, 'count': rollups.c.count + stmt.excluded.count}
+    )
+    db.session.execute(stmt, [
+        {'user_id': user_id, 'month': month, 'type': kind, 'category_id': category_id, 'total': total, 'count': count}
+        for (month, kind, category_id), (total, count) in buckets.items()
+    ])
+
+def import_rows(user_id, parsed_rows):
+    """Insert validated rows in executemany batches, committing every IMPORT_COMMIT_ROWS rows"""
+    report = {'imported': 0, 'failed': 0, 'errors': [], 'errors_truncated': False}
+    insert_sql = ('INSERT INTO "transaction" (user_id, type, category_id, amount, description, date) '
+                  'VALUES (?, ?, ?, ?, ?, ?)')
+    batch = []
+    pending = 0
+    imported_ids = []  # (first, last) id range of each batch since the last commit
+
+    def flush_batch():
+        # Raw executemany with pre-formatted dates skips SQLAlchemy's per-row bind processing;
+        # inserting in date order keeps the (user_id, date) index appends mostly sequential
+        ids = category_ids(user_id, {row[1] for row in batch})
+        values = sorted(
+            (sqlite_datetime(date), kind, ids[category], amount, description)
+            for kind, category, amount, description, date in batch
+        )
+        connection = db.session.connection()
+        connection.exec_driver_sql(insert_sql, [
+            (user_id, kind, category_id, amount, description, date)
+            for date, kind, category_id, amount, description in values
+        ])
+        # The write lock is held, so the batch took the consecutive ids ending at last_insert_rowid()
+        first_id = connection.exec_driver_sql('SELECT last_insert_rowid()').scalar() - len(values) + 1
+        imported_ids.append((first_id, first_id + len(values) - 1))
+        search.index_rows(connection, [
+            (first_id + i, user_id, description) for i, (_, _, _, _, description) in enumerate(values)
+        ])
+        add_batch_to_rollups(user_id, [(kind, category_id, amount, date)
+                                       for date, kind, category_id, amount, _ in values])
+        batch.clear()
+
+    def commit(count):
+        connection = db.session.connection()
+        version = bump_data_version(connection, user_id)
+        for first_id, last_id in imported_ids:
+            log_change(connection, user_id, version, 'transaction', first_id, last_id)
+        imported_ids.clear()
+        queue_event(db.session, user_id, 'transactions.imported', {'count': count, 'version': version})
+        db.session.commit()
+
+    for line, row, error in parsed_rows:
+        if error:
+            report['failed'] += 1
+            if len(report['errors']) < MAX_IMPORT_ERRORS:
+                report['errors'].append({'line': line, 'error': error})
+            else:
+                report['errors_truncated'] = True
+            continue
+        batch.append(row)
+        if len(batch) >= IMPORT_BATCH_SIZE:
+            pending += len(batch)
+            flush_batch()
+            if pending >= IMPORT_COMMIT_ROWS:
+                commit(pending)
+                report['imported'] += pending
+                pending = 0
+
+    if batch:
+        pending += len(batch)
+        flush_batch()
+    if pending:
+        commit(pending)
+        report['imported'] += pending
+    return report
+
+def export_csv_chunks(conditions):
+    """Yield CSV text for matching transactions, EXPORT_CHUNK_ROWS rows at a time.
+
+    Rows come straight off a server-side cursor as plain tuples (yield_per), and
+    SQLite formats the dates, so no ORM objects or dicts are built.
+    """
+    stmt = db.select(
+        Transaction.id,
+        db.func.strftime('%Y-%m-%d %H:%M', Transaction.date),
+        Transaction.type,
+        Category.name,
+        Transaction.amount,
+        Transaction.description
+    ).join(Transaction.category).where(*conditions).order_by(
+        Transaction.date.desc(), Transaction.id.desc()
+    ).execution_options(yield_per=EXPORT_CHUNK_ROWS)
+
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(['id', 'date', 'type', 'category', 'amount', 'description'])
+    yield buffer.getvalue()
+
+    for rows in db.session.execute(stmt).partitions():
+        buffer.seek(0)
+        buffer.truncate()
+        writer.writerows(rows)
+        yield buffer.getvalue()
+
+def report_period(data):
+    """Validate a report request; returns (kind, period, first month, last month)"""
+    kind = data.get('period', 'monthly')
+    if kind == 'monthly':
+        period = str(data.get('month') or datetime.now().strftime('%Y-%m'))
+        try:
+            if not PERIOD_PATTERNS[kind].match(period):
+                raise ValueError
+            datetime.strptime(period, '%Y-%m')
+        except ValueError:
+            raise ValueError('month must be YYYY-MM')
+        return kind, period, period, period
+    if kind == 'yearly':
+        period = str(data.get('year') or datetime.now().year)
+        if not PERIOD_PATTERNS[kind].match(period):
+            raise ValueError('year must be YYYY')
+        return kind, period, f'{period}-01', f'{period}-12'
+    raise ValueError("period must be 'monthly' or 'yearly'")
+
+def report_data(user, kind, period, first_month, last_month):
+    """Everything a report shows, aggregated from the rollups into plain picklable data"""
+    in_period = db.and_(MonthlyRollup.user_id == user.id,
+                        MonthlyRollup.month >= first_month, MonthlyRollup.month <= last_month)
+    names = category_names(user.id)
+    categories = read_session().query(
+        MonthlyRollup.type, MonthlyRollup.category_id,
+        db.func.sum(MonthlyRollup.total), db.func.sum(MonthlyRollup.count)
+    ).filter(in_period).group_by(MonthlyRollup.type, MonthlyRollup.category_id).order_by(
+        db.func.sum(MonthlyRollup.total).desc()
+    ).all()
+    by_type = {'income': [], 'expense': []}
+    for kind_, category_id, total, count in categories:
+        by_type.setdefault(kind_, []).append({'category': names[category_id], 'total': total, 'count': count})
+    income = sum(c['total'] for c in by_type['income'])
+    expenses = sum(c['total'] for c in by_type['expense'])
+
+    spent = dict(((month, category_id), total) for month, category_id, total in read_session().query(
+        MonthlyRollup.month, MonthlyRollup.category_id, MonthlyRollup.total
+    ).filter(in_period, MonthlyRollup.type == 'expense'))
+    budgets = []
+    for b in read_session().query(Budget).join(Budget.category).options(db.contains_eager(Budget.category)).filter(
+            Budget.user_id == user.id, Budget.month >= first_month, Budget.month <= last_month
+    ).order_by(Budget.month, Category.name):
+        amount = spent.get((b.month, b.category_id), 0)
+        budgets.append({'month': b.month, 'category': b.category.name, 'limit': b.limit, 'spent': amount,
+                        'percentage': round(amount / b.limit * 100, 1) if b.limit > 0 else 0})
+
+    title = (datetime.strptime(period, '%Y-%m').strftime('%B %Y') if kind == 'monthly' else period)
+    return {
+        'title': f'Financial Report - {title}',
+        'username': user.username,
+        'generated_at': datetime.now().strftime('%Y-%m-%d %H:%M'),
+        'totals': {'income': income, 'expenses': expenses,
+                   'savings_rate': round((income - expenses) / income * 100, 1) if income > 0 else 0},
+        'expense_categories': by_type['expense'],
+        'income_categories': by_type['income'],
+        'budgets': budgets,
+        'goals': [goal.to_dict() for goal in read_session().query(SavingsGoal).filter_by(user_id=user.id)]
+    }
+
+def report_job_response(job_id, status):
+    return {
+        'job_id': job_id,
+        'status': status,
+        'status_url': url_for('main.get_report_status', job_id=job_id),
+        'download_url': url_for('main.download_report', job_id=job_id)
+    }
+
+# ==================== Sharding ====================
+def shard_engines():
+    """Engines of the shard files in shard order; empty when sharding is off"""
+    return [shard_engine(n) for n in range(current_app.config['SHARD_COUNT'])]
+
+def data_engines():
+    """Every database holding user data: the shards, or just the main database"""
+    return shard_engines() or [db.engine]
+
+def shard_engine(shard):
+    """Engine of shard file number `shard`, which may lie past SHARD_COUNT when shrinking"""
+    key = sharding.shard_bind_key(shard)
+    if key in db.engines:
+        return db.engines[key]
+    url = make_url(sharding.shard_url(current_app.config['SHARD_DATABASE_URL'], shard))
+    if url.get_backend_name() == 'sqlite' and url.database and not os.path.isabs(url.database):
+        url = url.set(database=os.path.join(current_app.instance_path, url.database))
+    return create_engine(url)
+
+def shard_index(user_id):
+    count = current_app.config['SHARD_COUNT']
+    return sharding.shard_for(user_id, count) if count else 0
+
+def route_to_user(user_id):
+    """Point db.session's data statements at `user_id`'s shard (a no-op without sharding)"""
+    if current_app.config['SHARD_COUNT'] and user_id is not None:
+        db.session.info['shard'] = shard_engine(shard_index(user_id))
+
+def add_shard_user(user):
+    """Give `user` their row on their shard, which carries data_version; without sharding there is nothing to do"""
+    if not current_app.config['SHARD_COUNT']:
+        return
+    route_to_user(user.id)
+    users = User.__table__
+    db.session.execute(sqlite_insert(users).on_conflict_do_nothing(index_elements=['id']).values(
+        id=user.id, username=user.username, email=user.email, password='', created_at=user.created_at,
+        data_version=0
+    ))
+    db.session.commit()
+
+def across_shards(statement):
+    """Run a read-only Core statement on every data database at once; returns all rows, shard by shard"""
+    def run(engine):
+        with engine.connect() as conn:
+            return conn.execute(statement).all()
+    engines = data_engines()
+    with ThreadPoolExecutor(max_workers=len(engines)) as pool:
+        return list(pool.map(run, engines))
+
+# ==================== Writes ====================
+def perform_write(operation):
+    """Run a write operation and commit it; returns the operation's result.
+
+    With WRITE_BEHIND the operation is handed to the group-commit queue of the user's shard
+    and this returns once the batch holding it has committed. Otherwise it runs and commits
+    here. Operations use db.session, flush what they write and return plain data.
+    """
+    write_queues = current_app.extensions.get('write_queues')
+    if write_queues is None:
+        try:
+            result = operation()
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+        return result
+    result = write_queues[shard_index(session['user_id'])].submit(operation)
+    # The commit happened on the writer thread, outside this request
+    g.setdefault('changed_users', set()).add(session['user_id'])
+    return result
+
+def group_commit(app, shard=None):
+    """A write queue's batch runner: each operation in a savepoint, one commit for all of them"""
+    def run_batch(operations):
+        with app.app_context():
+            if shard is not None:
+                db.session.info['shard'] = shard_engine(shard)
+            try:
+                # An explicit BEGIN: pysqlite would otherwise let the first RELEASE commit on its own
+                db.session.connection().exec_driver_sql('BEGIN IMMEDIATE')
+                outcomes = []
+                for operation in operations:
+                    events = db.session.info.setdefault('pending_events', [])
+                    queued = len(events)
+                    try:
+                        with db.session.begin_nested():
+                            outcomes.append((operation(), None))
+                    except Exception as e:
+                        del events[queued:]  # nothing to announce for a write that was rolled back
+                        outcomes.append((None, e))
+                db.session.commit()
+                return outcomes
+            except Exception:
+                db.session.rollback()
+                raise
+            finally:
+                db.session.remove()
+    return run_batch
+
+def write_queue_stats():
+    totals = {'batches': 0, 'operations': 0, 'queued': 0}
+    for write_queue in current_app.extensions.get('write_queues', ()):
+        for key, value in write_queue.stats().items():
+            totals[key] += value
+    return totals
 
 # ==================== Authentication ====================
 def login_required(f):
@@ -91,24 +1140,70 @@ def login_required(f):
     def decorated_function(*args, **kwargs):
         if 'user_id' not in session:
             return jsonify({'error': 'Login required'}), 401
+        route_to_user(session['user_id'])
         return f(*args, **kwargs)
     return decorated_function
 
+def cached_response(f=None, daily=False):
+    """Serve a read route from the per-user response cache, with a strong ETag and 304 support.
+
+    Entries are tied to the user's data_version, so any write invalidates them; a route that read
+    its data at another version (see user_columns()) is not cached. Routes whose
+    output depends on today's date or month pass `daily=True`, which adds the date to the key;
+    the ETag is a hash of the body, so it changes whenever the new day's body does. Compressed
+    bodies are cached with the entry and carry the weak form of its ETag.
+    """
+    if f is None:
+        return partial(cached_response, daily=daily)
+
+    @wraps(f)
+    def decorated_function(*args, **kwargs):
+        user_id = session['user_id']
+        version = data_version(user_id)
+        key = (user_id, request.full_path)
+        if daily:
+            key += (datetime.now().date(),)
+        entry = response_cache.get(key, version)
+        if entry is None:
+            response = make_response(f(*args, **kwargs))
+            # A body built from data older (or newer) than `version` is served but never cached
+            read_version = g.pop('read_version', version)
+            if response.status_code != 200 or read_version != version:
+                return response
+            entry = response_cache.put(key, version, response.get_data(), response.mimetype)
+
+        varies = compressible(len(entry.body), entry.mimetype)
+        encoding = negotiate(request.headers.get('Accept-Encoding')) if varies else None
+        if request.if_none_match.contains_weak(entry.etag):
+            response = current_app.response_class(status=304)
+        elif encoding is None:
+            response = current_app.response_class(entry.body, mimetype=entry.mimetype)
+        else:
+            body = response_cache.variant(key, entry, encoding, lambda data: encode_body(data, encoding))
+            response = current_app.response_class(body, mimetype=entry.mimetype)
+            response.headers['Content-Encoding'] = encoding
+        if varies:
+            response.vary.add('Accept-Encoding')
+        response.set_etag(entry.etag, weak=encoding is not None)
+        response.headers['Cache-Control'] = 'private, no-cache'
+        return response
+    return decorated_function
+
 # ==================== Routes ====================
-@app.route('/')
+@bp.route('/')
 def index():
     if 'user_id' in session:
-        return redirect(url_for('dashboard_page'))
+        return redirect(url_for('main.dashboard_page'))
     return render_template('auth.html')
 
-@app.route('/dashboard')
+@bp.route('/dashboard')
 def dashboard_page():
     if 'user_id' not in session:
-        return redirect(url_for('index'))
+        return redirect(url_for('main.index'))
     return render_template('dashboard.html')
 
 # ==================== Auth API ====================
-@app.route('/api/auth/signup', methods=['POST'])
+@bp.route('/api/auth/signup', methods=['POST'])
 def signup():
     try:
         data = request.get_json()
@@ -131,6 +1226,7 @@ def signup():
         )
         db.session.add(user)
         db.session.commit()
+        add_shard_user(user)
         
         # Set session
         session['user_id'] = user.id
@@ -142,7 +1238,7 @@ def signup():
         print(f"[ERROR] Signup error: {e}")
         return jsonify({'error': f'Signup failed'}), 500
 
-@app.route('/api/auth/login', methods=['POST'])
+@bp.route('/api/auth/login', methods=['POST'])
 def login():
     try:
         data = request.get_json()
@@ -153,6 +1249,7 @@ def login():
         
         if not user or not check_password_hash(user.password, data['password']):
             return jsonify({'error': 'Invalid credentials'}), 401
+        add_shard_user(user)  # in case signup stopped between the two databases
         
         session['user_id'] = user.id
         session.permanent = True
@@ -162,12 +1259,12 @@ def login():
         print(f"[ERROR] Login error: {e}")
         return jsonify({'error': f'Login failed'}), 500
 
-@app.route('/api/auth/logout', methods=['POST'])
+@bp.route('/api/auth/logout', methods=['POST'])
 def logout():
     session.pop('user_id', None)
     return jsonify({'success': True}), 200
 
-@app.route('/api/auth/me', methods=['GET'])
+@bp.route('/api/auth/me', methods=['GET'])
 @login_required
 def get_current_user():
     user = User.query.get(session['user_id'])
@@ -180,165 +1277,769 @@ def get_current_user():
     }), 200
 
 # ==================== Dashboard API ====================
-@app.route('/api/transactions', methods=['GET'])
+@bp.route('/api/transactions', methods=['GET'])
 @login_required
+@cached_response
 def get_transactions():
-    transactions = Transaction.query.filter_by(user_id=session['user_id']).all()
-    return jsonify([t.to_dict() for t in transactions]), 200
+    """A page of transactions as row objects, or as parallel arrays with ?format=columnar"""
+    builders = {'rows': transaction_page, 'columnar': transaction_columns}
+    builder = builders.get(request.args.get('format', 'rows'))
+    if builder is None:
+        return jsonify({'error': "format must be 'rows' or 'columnar'"}), 400
+    try:
+        page = builder(session['user_id'], request.args)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    return jsonify(page), 200
+
+@bp.route('/api/transactions/search', methods=['GET'])
+@login_required
+@cached_response
+def search_transactions():
+    """Transactions whose description has every word of ?q= as a prefix, best match first"""
+    user_id = session['user_id']
+    match = search.match_expression(user_id, request.args.get('q', ''))
+    if match is None:
+        return jsonify({'error': 'q must contain at least one word'}), 400
+    limit = max(1, min(request.args.get('limit', DEFAULT_SEARCH_RESULTS, type=int), MAX_SEARCH_RESULTS))
+    offset = max(0, request.args.get('offset', 0, type=int))
+    try:
+        conditions = transaction_filters(user_id, request.args)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    index = db.table(search.TABLE, db.column('rowid'))
+    rank = db.func.bm25(db.literal_column(search.TABLE))
+    rows = read_session().execute(
+        db.select(Transaction, rank)
+        .join(index, index.c.rowid == Transaction.id)
+        .where(db.literal_column(search.TABLE).op('MATCH')(match), *conditions)
+        .order_by(rank, Transaction.date.desc(), Transaction.id.desc())
+        .limit(limit + 1).offset(offset)
+    ).all()
+    results = []
+    for transaction, score in rows[:limit]:
+        item = transaction.to_dict()
+        item['score'] = round(-score, 4)  # bm25() is lower-is-better
+        results.append(item)
+    return jsonify({
+        'results': results,
+        'next_offset': offset + limit if len(rows) > limit else None
+    }), 200
 
-@app.route('/api/transactions', methods=['POST'])
+def create_transaction(user_id, data):
+    transaction = Transaction(
+        user_id=user_id,
+        type=data['type'],
+        category=get_category(user_id, data['category']),
+        amount=float(data['amount']),
+        description=data.get('description', '')
+    )
+    db.session.add(transaction)
+    db.session.flush()
+    return transaction.to_dict()
+
+@bp.route('/api/transactions', methods=['POST'])
 @login_required
 def add_transaction():
     try:
-        data = request.get_json()
-        transaction = Transaction(
-            user_id=session['user_id'],
-            type=data['type'],
-            category=data['category'],
-            amount=float(data['amount']),
-            description=data.get('description', '')
-        )
-        db.session.add(transaction)
-        db.session.commit()
-        return jsonify(transaction.to_dict()), 201
+        return jsonify(perform_write(partial(create_transaction, session['user_id'], request.get_json()))), 201
+    except WriteQueueUnavailable as e:
+        return jsonify({'error': str(e)}), 503
     except Exception as e:
+        return jsonify({'error': str(e)}), 400
+
+@bp.route('/api/transactions/import', methods=['POST'])
+@login_required
+def import_transactions():
+    """Bulk-load transactions from a CSV or JSON Lines body (or multipart 'file' upload)"""
+    upload = request.files.get('file')
+    try:
+        if upload:
+            fmt = detect_format(request.args.get('format'), upload.content_type, upload.filename)
+        else:
+            fmt = detect_format(request.args.get('format'), request.content_type)
+    except ImportFormatError as e:
+        return jsonify({'error': str(e)}), 400
+
+    stream = io.TextIOWrapper(upload.stream if upload else request.stream, encoding='utf-8-sig', newline='')
+    try:
+        report = import_rows(session['user_id'], PARSERS[fmt](stream, datetime.now()))
+    except (ImportFormatError, UnicodeDecodeError) as e:
         db.session.rollback()
         return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        db.session.rollback()
+        print(f"[ERROR] Import error: {e}")
+        return jsonify({'error': 'Import failed'}), 500
+    return jsonify(report), 201
 
-@app.route('/api/budgets', methods=['GET'])
+@bp.route('/api/transactions/export.csv', methods=['GET'])
 @login_required
+def export_transactions():
+    """Stream the user's transactions as CSV, honouring the list endpoint's filters"""
+    try:
+        conditions = transaction_filters(session['user_id'], request.args)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    response = current_app.response_class(stream_with_context(export_csv_chunks(conditions)), mimetype='text/csv')
+    response.headers['Content-Disposition'] = 'attachment; filename=transactions.csv'
+    return response
+
+@bp.route('/api/budgets', methods=['GET'])
+@login_required
+@cached_response(daily=True)
 def get_budgets():
-    budgets = Budget.query.filter_by(user_id=session['user_id']).all()
-    return jsonify([b.to_dict() for b in budgets]), 200
+    """Budgets for ?month=YYYY-MM (default: current month) with spending progress"""
+    month = request.args.get('month') or datetime.now().strftime('%Y-%m')
+    try:
+        datetime.strptime(month, '%Y-%m')
+    except ValueError:
+        return jsonify({'error': 'month must be YYYY-MM'}), 400
+    return jsonify(budget_progress(session['user_id'], month)), 200
 
-@app.route('/api/budgets', methods=['POST'])
+def create_budget(user_id, data):
+    budget = Budget(
+        user_id=user_id,
+        category=get_category(user_id, data['category']),
+        limit=float(data['limit']),
+        month=data.get('month', datetime.now().strftime('%Y-%m'))
+    )
+    db.session.add(budget)
+    db.session.flush()
+    return budget.to_dict()
+
+@bp.route('/api/budgets', methods=['POST'])
 @login_required
 def add_budget():
     try:
-        data = request.get_json()
-        budget = Budget(
-            user_id=session['user_id'],
-            category=data['category'],
-            limit=float(data['limit']),
-            month=data.get('month', datetime.now().strftime('%Y-%m'))
-        )
-        db.session.add(budget)
-        db.session.commit()
-        return jsonify(budget.to_dict()), 201
+        return jsonify(perform_write(partial(create_budget, session['user_id'], request.get_json()))), 201
+    except WriteQueueUnavailable as e:
+        return jsonify({'error': str(e)}), 503
     except Exception as e:
-        db.session.rollback()
         return jsonify({'error': str(e)}), 400
 
-@app.route('/api/goals', methods=['GET'])
+@bp.route('/api/goals', methods=['GET'])
 @login_required
+@cached_response
 def get_goals():
     goals = SavingsGoal.query.filter_by(user_id=session['user_id']).all()
     return jsonify([g.to_dict() for g in goals]), 200
 
-@app.route('/api/goals', methods=['POST'])
+def create_goal(user_id, data):
+    goal = SavingsGoal(
+        user_id=user_id,
+        name=data['name'],
+        target=float(data['target']),
+        priority=data.get('priority', 'medium')
+    )
+    db.session.add(goal)
+    db.session.flush()
+    return goal.to_dict()
+
+@bp.route('/api/goals', methods=['POST'])
 @login_required
 def add_goal():
     try:
-        data = request.get_json()
-        goal = SavingsGoal(
-            user_id=session['user_id'],
-            name=data['name'],
-            target=float(data['target']),
-            priority=data.get('priority', 'medium')
-        )
-        db.session.add(goal)
-        db.session.commit()
-        return jsonify(goal.to_dict()), 201
+        return jsonify(perform_write(partial(create_goal, session['user_id'], request.get_json()))), 201
+    except WriteQueueUnavailable as e:
+        return jsonify({'error': str(e)}), 503
     except Exception as e:
-        db.session.rollback()
         return jsonify({'error': str(e)}), 400
 
-@app.route('/api/transactions/<int:tid>', methods=['DELETE'])
-@login_required
-def delete_transaction(tid):
-    transaction = Transaction.query.filter_by(id=tid, user_id=session['user_id']).first()
-    if not transaction:
+def delete_owned(model, user_id, row_id):
+    """Delete the user's row; False when there is no such row"""
+    row = model.query.filter_by(id=row_id, user_id=user_id).first()
+    if not row:
+        return False
+    db.session.delete(row)
+    db.session.flush()
+    return True
+
+def delete_response(model, row_id):
+    try:
+        deleted = perform_write(partial(delete_owned, model, session['user_id'], row_id))
+    except WriteQueueUnavailable as e:
+        return jsonify({'error': str(e)}), 503
+    if not deleted:
         return jsonify({'error': 'Not found'}), 404
-    db.session.delete(transaction)
-    db.session.commit()
     return jsonify({'success': True}), 200
 
-@app.route('/api/budgets/<int:bid>', methods=['DELETE'])
+@bp.route('/api/transactions/<int:tid>', methods=['DELETE'])
+@login_required
+def delete_transaction(tid):
+    return delete_response(Transaction, tid)
+
+@bp.route('/api/budgets/<int:bid>', methods=['DELETE'])
 @login_required
 def delete_budget(bid):
-    budget = Budget.query.filter_by(id=bid, user_id=session['user_id']).first()
-    if not budget:
-        return jsonify({'error': 'Not found'}), 404
-    db.session.delete(budget)
-    db.session.commit()
-    return jsonify({'success': True}), 200
+    return delete_response(Budget, bid)
 
-@app.route('/api/goals/<int:gid>', methods=['DELETE'])
+@bp.route('/api/goals/<int:gid>', methods=['DELETE'])
 @login_required
 def delete_goal(gid):
-    goal = SavingsGoal.query.filter_by(id=gid, user_id=session['user_id']).first()
-    if not goal:
+    return delete_response(SavingsGoal, gid)
+
+@bp.route('/api/cache/stats', methods=['GET'])
+@login_required
+def get_cache_stats():
+    return jsonify(response_cache.stats()), 200
+
+# ==================== Live Updates ====================
+@bp.after_app_request
+def publish_summaries(response):
+    """Push recomputed dashboard totals to open streams of users whose data this request changed"""
+    for user_id in g.pop('changed_users', ()):
+        if event_broker.has_subscribers(user_id):
+            event_broker.publish(user_id, 'summary', dashboard_summary(user_id))
+    return response
+
+@bp.route('/api/events', methods=['GET'])
+@login_required
+def stream_events():
+    """Server-Sent Events stream of the user's changes: deltas, then the recomputed summary"""
+    user_id = session['user_id']
+    heartbeat = current_app.config['EVENTS_HEARTBEAT']
+    sub = event_broker.subscribe(user_id)
+    seen = data_version(user_id)
+    db.session.close()  # don't hold a pooled connection for the life of the stream
+
+    def stream():
+        nonlocal seen
+        try:
+            yield format_sse('hello', {'version': seen}, retry=3000)
+            while True:
+                event = sub.get(heartbeat)
+                if event is not None:
+                    seen = max(seen, event.data.get('version', seen))
+                    yield format_sse(event.type, event.data, event.id)
+                    continue
+                if sub.dropped:
+                    # Fell too far behind; the client reloads everything and reconnects
+                    yield format_sse('resync', {'reason': 'dropped'})
+                    return
+                latest = data_version(user_id)
+                db.session.close()
+                if latest > seen:
+                    # Written through another worker process, whose events never reach this one
+                    seen = latest
+                    yield format_sse('resync', {'version': latest})
+                else:
+                    yield format_sse()
+        finally:
+            event_broker.unsubscribe(sub)
+
+    response = current_app.response_class(stream_with_context(stream()), mimetype='text/event-stream')
+    response.headers['Cache-Control'] = 'no-cache'
+    response.headers['X-Accel-Buffering'] = 'no'  # nginx: don't buffer the stream
+    return response
+
+@bp.route('/api/events/stats', methods=['GET'])
+@login_required
+def get_event_stats():
+    return jsonify(event_broker.stats()), 200
+
+# ==================== Sync ====================
+SYNC_MODELS = {'transaction': ('transactions', Transaction), 'budget': ('budgets', Budget),
+               'goal': ('goals', SavingsGoal)}
+
+def sync_changes(user_id, since):
+    """Rows written after version `since` and ids deleted since, or everything when the client must start over.
+
+    The change log only says which rows were touched; their current state is read from the tables,
+    so a row written many times since `since` is sent once.
+    """
+    read = read_session()
+    users, log = User.__table__, ChangeLog.__table__
+    version = read.execute(db.select(users.c.data_version).where(users.c.id == user_id)).scalar()
+    entries = []
+    if 0 < since <= version:
+        entries = read.execute(db.select(log.c.kind, log.c.first_id, log.c.last_id, log.c.deleted).where(
+            log.c.user_id == user_id, log.c.version > since
+        ).limit(MAX_SYNC_ENTRIES + 1)).all()
+    # Version 0 asks for a snapshot; a version the server never reached means the database was restored
+    reset = not 0 < since <= version or len(entries) > MAX_SYNC_ENTRIES or any(
+        kind == 'reset' for kind, _, _, _ in entries)
+    changes = {'version': version, 'reset': reset}
+    for kind, (name, model) in SYNC_MODELS.items():
+        query = read.query(model).filter(model.user_id == user_id).order_by(model.id)
+        if reset:
+            changes[name] = {'upserted': [row.to_dict() for row in query], 'deleted': []}
+            continue
+        ids, ranges, removed = set(), [], set()
+        for entry_kind, first_id, last_id, deleted in entries:
+            if entry_kind != kind:
+                continue
+            if deleted:
+                removed.add(first_id)
+            elif first_id == last_id:
+                ids.add(first_id)
+            else:
+                ranges.append(model.id.between(first_id, last_id))
+        # Deleted ids are looked up too: SQLite can hand a deleted row's id to a new row
+        touched = ranges + ([model.id.in_(ids | removed)] if ids or removed else [])
+        rows = query.filter(db.or_(*touched)).all() if touched else []
+        changes[name] = {'upserted': [row.to_dict() for row in rows],
+                         'deleted': sorted(removed - {row.id for row in rows})}
+    return changes
+
+@bp.route('/api/sync', methods=['GET'])
+@login_required
+@cached_response
+def get_sync():
+    """Transactions, budgets and goals changed since ?since=<version>; all of them for since=0"""
+    try:
+        since = int(request.args.get('since', 0))
+    except ValueError:
+        return jsonify({'error': 'since must be a version number'}), 400
+    return jsonify(sync_changes(session['user_id'], since)), 200
+
+# ==================== Recurring ====================
+def materialize_due(now=None, batch_size=RECURRING_BATCH_RULES):
+    """Write every recurring occurrence dated up to `now` as a transaction; returns how many were written.
+
+    Due rules are read `batch_size` at a time. Each user's occurrences go in through import_rows(),
+    which commits them together with the rules' advanced counters. A counter only advances from the
+    value it was read with, so schedulers in several worker processes never write an occurrence twice.
+    """
+    now = now or datetime.now()
+    rules = RecurringRule.__table__
+    written = 0
+    for engine in data_engines():
+        db.session.info['shard'] = engine
+        while True:
+            due = RecurringRule.query.filter(RecurringRule.next_date <= now).order_by(
+                RecurringRule.user_id, RecurringRule.id
+            ).limit(batch_size).all()
+            if not due:
+                break
+            for user_id, user_rules in itertools.groupby(due, key=lambda rule: rule.user_id):
+                rows = []
+                for rule in user_rules:
+                    dates = [when for _, when in recurring.occurrences(
+                        rule.start_date, rule.frequency, rule.materialized, now, rule.end_date)]
+                    count = rule.materialized + len(dates)
+                    advanced = db.session.execute(rules.update().where(
+                        rules.c.id == rule.id, rules.c.materialized == rule.materialized
+                    ).values(materialized=count, next_date=recurring.next_date(
+                        rule.start_date, rule.frequency, count, rule.end_date))).rowcount
+                    if advanced:
+                        rows += [(0, (rule.type, rule.category.name, rule.amount, rule.description, when), None)
+                                 for when in dates]
+                if rows:
+                    written += import_rows(user_id, rows)['imported']
+                else:
+                    db.session.commit()
+    return written
+
+def run_scheduler(app):
+    """The recurring scheduler's periodic job"""
+    def run():
+        with app.app_context():
+            try:
+                materialize_due()
+            finally:
+                db.session.remove()
+    return run
+
+@bp.route('/api/recurring', methods=['GET'])
+@login_required
+@cached_response
+def get_recurring_rules():
+    rules = RecurringRule.query.filter_by(user_id=session['user_id']).order_by(RecurringRule.id).all()
+    return jsonify([rule.to_dict() for rule in rules]), 200
+
+def create_recurring_rule(user_id, data):
+    if data.get('type') not in ('income', 'expense'):
+        raise ValueError("type must be 'income' or 'expense'")
+    if data.get('frequency') not in recurring.FREQUENCIES:
+        raise ValueError(f"frequency must be one of {', '.join(recurring.FREQUENCIES)}")
+    start = parse_date_arg(data['start_date'], 'start_date') if data.get('start_date') else datetime.combine(
+        datetime.now().date(), datetime.min.time())
+    end = parse_date_arg(data['end_date'], 'end_date') if data.get('end_date') else None
+    if end is not None and end < start:
+        raise ValueError('end_date is before start_date')
+    rule = RecurringRule(
+        user_id=user_id,
+        type=data['type'],
+        category=get_category(user_id, data['category']),
+        amount=float(data['amount']),
+        description=data.get('description', ''),
+        frequency=data['frequency'],
+        start_date=start,
+        end_date=end,
+        next_date=start
+    )
+    db.session.add(rule)
+    db.session.flush()
+    return rule.to_dict()
+
+@bp.route('/api/recurring', methods=['POST'])
+@login_required
+def add_recurring_rule():
+    """Add a rule; its occurrences become transactions as the scheduler finds them due"""
+    try:
+        return jsonify(perform_write(partial(create_recurring_rule, session['user_id'], request.get_json()))), 201
+    except WriteQueueUnavailable as e:
+        return jsonify({'error': str(e)}), 503
+    except Exception as e:
+        return jsonify({'error': str(e)}), 400
+
+@bp.route('/api/recurring/<int:rid>', methods=['DELETE'])
+@login_required
+def delete_recurring_rule(rid):
+    """Stop a rule; transactions it already wrote stay"""
+    return delete_response(RecurringRule, rid)
+
+# ==================== Reports ====================
+@bp.route('/api/reports', methods=['POST'])
+@login_required
+def create_report():
+    """Queue a monthly/yearly PDF report; cached renders are returned as already done"""
+    try:
+        kind, period, first_month, last_month = report_period(request.get_json(silent=True) or {})
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    user = db.session.get(User, session['user_id'])
+    job_id = job_id_for(kind, period, data_version(user.id))
+    reports_dir = current_app.config['REPORTS_DIR']
+    status = report_jobs.status(reports_dir, user.id, job_id)
+    if status != 'done':
+        report_jobs.submit(reports_dir, user.id, job_id, report_data(user, kind, period, first_month, last_month))
+        status = report_jobs.status(reports_dir, user.id, job_id)
+    return jsonify(report_job_response(job_id, status)), 200 if status == 'done' else 202
+
+@bp.route('/api/reports/<job_id>', methods=['GET'])
+@login_required
+def get_report_status(job_id):
+    status = None
+    if JOB_ID_PATTERN.match(job_id):
+        status = report_jobs.status(current_app.config['REPORTS_DIR'], session['user_id'], job_id)
+    if status is None:
         return jsonify({'error': 'Not found'}), 404
-    db.session.delete(goal)
-    db.session.commit()
-    return jsonify({'success': True}), 200
+    return jsonify(report_job_response(job_id, status)), 200
+
+@bp.route('/api/reports/<job_id>/download', methods=['GET'])
+@login_required
+def download_report(job_id):
+    if not JOB_ID_PATTERN.match(job_id):
+        return jsonify({'error': 'Not found'}), 404
+    path = report_jobs.path(current_app.config['REPORTS_DIR'], session['user_id'], job_id)
+    if not os.path.exists(path):
+        status = report_jobs.status(current_app.config['REPORTS_DIR'], session['user_id'], job_id)
+        if status in ('pending', 'failed'):
+            return jsonify(report_job_response(job_id, status)), 409
+        return jsonify({'error': 'Not found'}), 404
+    return send_file(path, mimetype='application/pdf', as_attachment=True, download_name=f'report-{job_id}.pdf')
 
 # ==================== Dashboard Data ====================
-@app.route('/api/dashboard', methods=['GET'])
+@bp.route('/api/dashboard', methods=['GET'])
 @login_required
+@cached_response(daily=True)
 def get_dashboard():
     """Get dashboard summary data"""
-    user_id = session['user_id']
-    
-    # Get all transactions for this user
-    transactions = Transaction.query.filter_by(user_id=user_id).all()
-    
-    total_income = sum(t.amount for t in transactions if t.type == 'income')
-    total_expenses = sum(t.amount for t in transactions if t.type == 'expense')
-    balance = total_income - total_expenses
-    
-    # Get this month's transactions
-    current_month = datetime.now().strftime('%Y-%m')
-    month_transactions = [t for t in transactions if t.date.strftime('%Y-%m') == current_month]
-    month_income = sum(t.amount for t in month_transactions if t.type == 'income')
-    month_expenses = sum(t.amount for t in month_transactions if t.type == 'expense')
-    
-    return jsonify({
-        'totalIncome': total_income,
-        'totalExpenses': total_expenses,
-        'balance': balance,
-        'monthIncome': month_income,
-        'monthExpenses': month_expenses,
-        'savingsRate': round((month_income - month_expenses) / month_income * 100, 1) if month_income > 0 else 0
-    }), 200
+    return jsonify(dashboard_summary(session['user_id'])), 200
 
-@app.route('/api/analytics/monthly', methods=['GET'])
+@bp.route('/api/analytics/monthly', methods=['GET'])
 @login_required
+@cached_response(daily=True)
 def get_monthly_analytics():
-    """Get 12-month analytics"""
-    user_id = session['user_id']
-    transactions = Transaction.query.filter_by(user_id=user_id).all()
-    
-    # Build 12-month data
-    data = []
-    
-    for i in range(11, -1, -1):
-        month_date = datetime.now() - timedelta(days=30*i)
-        month_str = month_date.strftime('%Y-%m')
-        month_label = month_date.strftime('%b')
-        
-        month_income = sum(t.amount for t in transactions 
-                          if t.type == 'income' and t.date.strftime('%Y-%m') == month_str)
-        month_expenses = sum(t.amount for t in transactions 
-                            if t.type == 'expense' and t.date.strftime('%Y-%m') == month_str)
-        
-        data.append({
-            'month': month_label,
-            'income': month_income,
-            'expenses': month_expenses
+    """Get income/expense totals for the last N calendar months (default 12)"""
+    months = request.args.get('months', 12, type=int)
+    months = max(1, min(months, MAX_ANALYTICS_MONTHS))
+    return jsonify(monthly_totals(session['user_id'], months)), 200
+
+@bp.route('/api/analytics/bundle', methods=['GET'])
+@login_required
+@cached_response(daily=True)
+def get_analytics_bundle():
+    """All analytics chart data in one response (?months=N, default 12; ?projection=N months ahead, default 3)"""
+    months = request.args.get('months', 12, type=int)
+    months = max(1, min(months, MAX_ANALYTICS_MONTHS))
+    projection = max(1, min(request.args.get('projection', DEFAULT_PROJECTION_MONTHS, type=int),
+                            MAX_PROJECTION_MONTHS))
+    return jsonify(analytics_bundle(session['user_id'], months, projection=projection)), 200
+
+@bp.route('/api/analytics/insights', methods=['GET'])
+@login_required
+@cached_response(daily=True)
+def get_analytics_insights():
+    """Rolling averages, weekly spend, category totals and expense percentiles (?months=, ?weeks=, ?window=)"""
+    months = max(1, min(request.args.get('months', 12, type=int), MAX_ANALYTICS_MONTHS))
+    weeks = max(1, min(request.args.get('weeks', 12, type=int), MAX_ANALYTICS_WEEKS))
+    window = max(1, min(request.args.get('window', 3, type=int), months))
+    return jsonify(analytics_insights(session['user_id'], months, weeks, window)), 200
+
+# ==================== Compression & Static Files ====================
+def compressible(size, mimetype):
+    config = current_app.config
+    return config['COMPRESS_ENABLED'] and size >= config['COMPRESS_MIN_SIZE'] and mimetype in COMPRESSIBLE_MIMETYPES
+
+def encode_body(data, encoding):
+    level = current_app.config['COMPRESS_BROTLI_QUALITY' if encoding == 'br' else 'COMPRESS_GZIP_LEVEL']
+    return compress(data, encoding, level)
+
+@bp.after_app_request
+def compress_response(response):
+    """Encode JSON/text bodies for clients that accept it; streams, files and cached routes are left alone"""
+    if (response.status_code != 200 or response.direct_passthrough or response.is_streamed
+            or 'Content-Encoding' in response.headers):
+        return response
+    data = response.get_data()
+    if not compressible(len(data), response.mimetype):
+        return response
+    response.vary.add('Accept-Encoding')
+    encoding = negotiate(request.headers.get('Accept-Encoding'))
+    if encoding is not None:
+        response.set_data(encode_body(data, encoding))
+        response.headers['Content-Encoding'] = encoding
+        etag, _ = response.get_etag()
+        if etag:
+            # As nginx does: the encoded body keeps its ETag, weakened, so If-None-Match still matches
+            response.set_etag(etag, weak=True)
+    return response
+
+def serve_static(filename):
+    """Replaces Flask's static view. Fingerprinted build output is cached for a year and served from
+    its precompressed siblings; everything else revalidates (ETag / Last-Modified) on every use."""
+    static_folder = current_app.static_folder
+    if filename.startswith(assets.DIST_DIR + '/'):
+        path = safe_join(static_folder, filename)
+        offered = [e for e, suffix in FILE_SUFFIXES.items() if path and os.path.isfile(path + suffix)]
+        encoding = negotiate(request.headers.get('Accept-Encoding'), offered)
+        if encoding is None:
+            response = current_app.send_static_file(filename)
+        else:
+            response = send_from_directory(static_folder, filename + FILE_SUFFIXES[encoding],
+                                           mimetype=mimetypes.guess_type(filename)[0])
+            response.headers['Content-Encoding'] = encoding
+        if offered:
+            response.vary.add('Accept-Encoding')
+        max_age = current_app.config['STATIC_IMMUTABLE_MAX_AGE']
+        response.headers['Cache-Control'] = f'public, max-age={max_age}, immutable'
+        return response
+
+    response = current_app.send_static_file(filename)
+    response.headers['Cache-Control'] = 'no-cache'
+    if response.mimetype in COMPRESSIBLE_MIMETYPES:
+        response.vary.add('Accept-Encoding')
+        if response.status_code == 200:
+            # Read the file into memory so compress_response can encode it
+            response.direct_passthrough = False
+            response.make_sequence()
+    return response
+
+def asset_url(filename):
+    """URL of a static file, pointing at its fingerprinted build when `flask build-assets` has run"""
+    return url_for('static', filename=current_app.extensions['assets'].get(filename, filename))
+
+@bp.app_context_processor
+def inject_asset_url():
+    return {'asset_url': asset_url}
+
+@bp.cli.command('build-assets')
+def build_assets_command():
+    """Write minified, content-hashed, precompressed copies of static/css and static/js to static/dist"""
+    manifest = assets.build(current_app.static_folder)
+    current_app.extensions['assets'] = manifest
+    print(f"[OK] Built {len(manifest)} assets into static/{assets.DIST_DIR}")
+
+# ==================== Metrics ====================
+registry = metrics.Registry()
+REQUEST_COUNT = registry.counter('http_requests_total', 'Requests handled', ('endpoint', 'method', 'status'))
+REQUEST_LATENCY = registry.histogram('http_request_duration_seconds', 'Time to build the response',
+                                     ('endpoint', 'method'))
+REQUEST_QUERIES = registry.histogram('http_request_db_queries', 'SQL statements executed per request',
+                                     ('endpoint',), metrics.QUERY_COUNT_BUCKETS)
+REQUEST_DB_TIME = registry.histogram('http_request_db_seconds', 'Time spent in SQL statements per request',
+                                     ('endpoint',))
+registry.callback('response_cache_entries', 'Entries in the response cache', lambda: response_cache.stats()['entries'])
+registry.callback('response_cache_bytes', 'Bytes held by the response cache', lambda: response_cache.stats()['bytes'])
+registry.callback('response_cache_hits_total', 'Response cache hits', lambda: response_cache.stats()['hits'], 'counter')
+registry.callback('response_cache_misses_total', 'Response cache misses', lambda: response_cache.stats()['misses'],
+                  'counter')
+registry.callback('event_stream_subscribers', 'Open /api/events streams', lambda: event_broker.stats()['subscribers'])
+registry.callback('event_stream_dropped_total', 'Streams dropped for falling behind',
+                  lambda: event_broker.stats()['dropped'], 'counter')
+registry.callback('group_commit_batches_total', 'Transactions committed by the write-behind queue',
+                  lambda: write_queue_stats()['batches'], 'counter')
+registry.callback('group_commit_operations_total', 'Writes committed by the write-behind queue',
+                  lambda: write_queue_stats()['operations'], 'counter')
+
+def start_request_metrics():
+    g.metrics_start = time.perf_counter()
+    g.db_queries = 0
+    g.db_seconds = 0.0
+
+def record_request_metrics(response):
+    start = g.pop('metrics_start', None)
+    if start is not None:
+        endpoint = request.endpoint or 'unmatched'
+        REQUEST_LATENCY.observe((endpoint, request.method), time.perf_counter() - start)
+        REQUEST_QUERIES.observe((endpoint,), g.db_queries)
+        REQUEST_DB_TIME.observe((endpoint,), g.db_seconds)
+        REQUEST_COUNT.inc((endpoint, request.method, str(response.status_code)))
+    return response
+
+# The start time lives on the statement's execution context, so a statement that raises
+# leaves nothing behind on the pooled connection
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    context._metrics_start = time.perf_counter()
+
+def record_query(context):
+    start = context.__dict__.pop('_metrics_start', None)
+    if start is not None and has_request_context() and 'metrics_start' in g:
+        g.db_queries += 1
+        g.db_seconds += time.perf_counter() - start
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    record_query(context)
+
+def _handle_error(exception_context):
+    # after_cursor_execute does not run for a statement that raises; count it here
+    if exception_context.execution_context is not None:
+        record_query(exception_context.execution_context)
+
+def metrics_endpoint():
+    """Prometheus scrape target (this process's counters)"""
+    return current_app.response_class(registry.render(), content_type=metrics.CONTENT_TYPE)
+
+def init_metrics(app):
+    """Install the request and SQL timing hooks; only called when METRICS_ENABLED is set"""
+    app.before_request(start_request_metrics)
+    # Registered before the blueprint so it runs after the blueprint's after_request hooks
+    app.after_request(record_request_metrics)
+    app.add_url_rule('/metrics', 'metrics', metrics_endpoint)
+    with app.app_context():
+        for engine in db.engines.values():
+            db.event.listen(engine, 'before_cursor_execute', _before_cursor_execute)
+            db.event.listen(engine, 'after_cursor_execute', _after_cursor_execute)
+            db.event.listen(engine, 'handle_error', _handle_error)
+
+# ==================== App Factory ====================
+def load_secret_key(path):
+    """Read the shared session key from `path`, creating it once if it does not exist yet"""
+    try:
+        return read_secret_key(path)
+    except FileNotFoundError:
+        pass
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    key = os.urandom(32)
+    tmp_path = f'{path}.{os.getpid()}.tmp'
+    with open(tmp_path, 'wb') as f:
+        f.write(key)
+    try:
+        os.link(tmp_path, path)  # atomic and fails if another worker won the race
+    except FileExistsError:
+        pass
+    except OSError:
+        # No hard links on this filesystem (some container volumes, SMB/FAT mounts)
+        create_exclusive(path, key)
+    finally:
+        os.remove(tmp_path)
+    return read_secret_key(path)
+
+def create_exclusive(path, data):
+    """Write `data` to `path` unless the file already exists; of several racing writers, the first wins"""
+    try:
+        fd = os.open(path, os.O_CREAT | os.O_EXCL | os.O_WRONLY, 0o600)
+    except FileExistsError:
+        return
+    with os.fdopen(fd, 'wb') as f:
+        f.write(data)
+
+def read_secret_key(path, wait=5.0):
+    # create_exclusive() makes the file before writing it; give its writer a moment
+    deadline = time.monotonic() + wait
+    while True:
+        with open(path, 'rb') as f:
+            key = f.read()
+        if key or time.monotonic() > deadline:
+            return key
+        time.sleep(0.01)
+
+def shard_urls(config, count=None):
+    template = config['SHARD_DATABASE_URL']
+    return [sharding.shard_url(template, n) for n in range(config['SHARD_COUNT'] if count is None else count)]
+
+def create_app(config=None):
+    """Build the Flask app. `config` (a mapping or settings object) overrides Config and the settings file."""
+    app = Flask(__name__)
+    app.config.from_object(Config)
+    app.config.from_envvar('FINANCE_DASHBOARD_SETTINGS', silent=True)
+    if isinstance(config, dict):
+        app.config.update(config)
+    elif config is not None:
+        app.config.from_object(config)
+
+    if not app.config['SECRET_KEY']:
+        app.config['SECRET_KEY'] = load_secret_key(
+            app.config['SECRET_KEY_FILE'] or os.path.join(app.instance_path, 'secret_key')
+        )
+    if not app.config['REPORTS_DIR']:
+        app.config['REPORTS_DIR'] = os.path.join(app.instance_path, 'reports')
+
+    database_uri = app.config['SQLALCHEMY_DATABASE_URI']
+    app.config.setdefault('SQLALCHEMY_ENGINE_OPTIONS', engine_options(database_uri, app.config))
+    if app.config['SHARD_COUNT']:
+        # Reads go to each user's shard through db.session; there is no separate analytics pool
+        app.config.setdefault('SQLALCHEMY_BINDS', {
+            sharding.shard_bind_key(n): dict(engine_options(url, app.config), url=url)
+            for n, url in enumerate(shard_urls(app.config))
         })
-    
-    return jsonify(data), 200
+    elif not is_memory_sqlite(database_uri):
+        analytics_uri = app.config['ANALYTICS_DATABASE_URL'] or database_uri
+        app.config.setdefault('SQLALCHEMY_BINDS', {'analytics': dict(
+            engine_options(analytics_uri, app.config, 'ANALYTICS_POOL_SIZE'), url=analytics_uri
+        )})
+
+    db.init_app(app)
+    app.view_functions['static'] = serve_static
+    app.extensions['assets'] = assets.load_manifest(app.static_folder)
+    if app.config['METRICS_ENABLED']:
+        init_metrics(app)
+    app.register_blueprint(bp)
+    app.teardown_appcontext(close_read_session)
+
+    response_cache.max_bytes = app.config['RESPONSE_CACHE_MAX_BYTES']
+    report_jobs.max_workers = app.config['REPORT_WORKERS']
+    column_store.max_users = app.config['ANALYTICS_CACHE_USERS']
+    event_broker.max_queue = app.config['EVENTS_QUEUE_SIZE']
+
+    if app.config['WRITE_BEHIND']:
+        # One writer per shard: SQLite serializes writes per file anyway
+        app.extensions['write_queues'] = []
+        for shard in range(app.config['SHARD_COUNT']) or [None]:
+            write_queue = WriteQueue(app.config['WRITE_BATCH_SIZE'], app.config['WRITE_BATCH_DELAY'] / 1000,
+                                     app.config['WRITE_TIMEOUT'])
+            write_queue.start(group_commit(app, shard))
+            app.extensions['write_queues'].append(write_queue)
+
+    if app.config['RECURRING_INTERVAL']:
+        scheduler = recurring.Scheduler(app.config['RECURRING_INTERVAL'])
+        scheduler.start(run_scheduler(app))
+        app.extensions['recurring_scheduler'] = scheduler
+
+    with app.app_context():
+        install_sqlite_pragmas(db.engine, sqlite_pragmas(app.config))
+        if 'analytics' in db.engines:
+            install_sqlite_pragmas(db.engines['analytics'], sqlite_pragmas(app.config, read_only=True))
+        for engine in shard_engines():
+            install_sqlite_pragmas(engine, sqlite_pragmas(app.config))
+        # Create tables, or migrate an existing database in place; never drops data
+        if app.config['AUTO_MIGRATE']:
+            for engine in [db.engine] + shard_engines():
+                init_db(db, engine)
+            print("[OK] Database initialized")
+    return app
+
+# The default app for `flask --app app`, wsgi.py and scripts that import it. Under
+# `python app.py` the report pool's spawned workers re-run this file as __mp_main__;
+# they only need reports.render_job, not a second app migrating the live database.
+if __name__ != '__mp_main__':
+    app = create_app()
 
 if __name__ == '__main__':
-    app.run(debug=False, port=5000)
+    # Development server only; see wsgi.py for multi-process serving
+    app.run(debug=False, port=5000, threaded=True)
@@ -0,0 +1,125 @@
+"""Build step for the static files: minified, content-hashed, precompressed copies.
+
+    flask build-assets
+
+For every file under static/css and static/js this writes
+``static/dist/<dir>/<name>.<hash>.<ext>`` plus ``.gz`` (and ``.br`` when the
+brotli package is installed) siblings, and ``static/dist/manifest.json``
+mapping the source path to the built one. Templates link through
+``asset_url()``, which falls back to the unbuilt file when there is no
+manifest, so development needs no build. Built files never change under a
+given name, so they are served with a one-year immutable Cache-Control.
+
+Minification is deliberately conservative (no JS parser): comments,
+indentation and blank lines go, everything inside a line stays.
+"""
+import hashlib
+import json
+import os
+import re
+import shutil
+
+from compression import FILE_SUFFIXES, available_encodings, compress
+
+SOURCE_DIRS = ('css', 'js')
+DIST_DIR = 'dist'
+MANIFEST = 'manifest.json'
+HASH_LENGTH = 10
+
+
+def minify_css(text):
+    text = re.sub(r'/\*.*?\*/', '', text, flags=re.S)
+    text = re.sub(r'\s+', ' ', text)
+    # Spaces before ':' can matter in selectors (`a :hover`), so only strip after it
+    text = re.sub(r'\s*([{};,>])\s*', r'\1', text)
+    text = re.sub(r':\s+', ':', text)
+    return text.replace(';}', '}').strip() + '\n'
+
+
+def _template_open(line, inside):
+    """Whether a JS template literal is still open after `line`, given whether one was open before it"""
+    quote = None
+    i = 0
+    while i < len(line):
+        ch = line[i]
+        if ch == '\\':
+            i += 2
+            continue
+        if inside:
+            if ch == '`':
+                inside = False
+        elif quote:
+            if ch == quote:
+                quote = None
+        elif ch in '\'"':
+            quote = ch
+        elif ch == '`':
+            inside = True
+        elif line.startswith('//', i):
+            break
+        i += 1
+    return inside
+
+
+def minify_js(text):
+    out = []
+    in_template = in_comment = False
+    for line in text.splitlines():
+        if in_template:
+            out.append(line)  # literal text, kept byte for byte
+            in_template = _template_open(line, True)
+            continue
+        stripped = line.strip()
+        if in_comment:
+            in_comment = '*/' not in stripped
+            continue
+        if stripped.startswith('/*'):
+            in_comment = '*/' not in stripped
+            continue
+        if not stripped or stripped.startswith('//'):
+            continue
+        out.append(stripped)
+        in_template = _template_open(stripped, False)
+    return '\n'.join(out) + '\n'
+
+
+MINIFIERS = {'.css': minify_css, '.js': minify_js}
+
+
+def build(static_folder):
+    """Rebuild static/dist from scratch; returns the manifest"""
+    dist = os.path.join(static_folder, DIST_DIR)
+    shutil.rmtree(dist, ignore_errors=True)
+    manifest = {}
+    for source_dir in SOURCE_DIRS:
+        for root, _, files in os.walk(os.path.join(static_folder, source_dir)):
+            for name in sorted(files):
+                source = os.path.join(root, name)
+                rel = os.path.relpath(source, static_folder).replace(os.sep, '/')
+                stem, ext = os.path.splitext(rel)
+                with open(source, 'rb') as f:
+                    data = f.read()
+                if ext in MINIFIERS:
+                    data = MINIFIERS[ext](data.decode('utf-8')).encode('utf-8')
+                built = f'{DIST_DIR}/{stem}.{hashlib.sha256(data).hexdigest()[:HASH_LENGTH]}{ext}'
+                target = os.path.join(static_folder, built)
+                os.makedirs(os.path.dirname(target), exist_ok=True)
+                with open(target, 'wb') as f:
+                    f.write(data)
+                for encoding in available_encodings():
+                    with open(target + FILE_SUFFIXES[encoding], 'wb') as f:
+                        f.write(compress(data, encoding, 9 if encoding == 'gzip' else 11))
+                manifest[rel] = built
+    os.makedirs(dist, exist_ok=True)
+    with open(os.path.join(dist, MANIFEST), 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    return manifest
+
+
+def load_manifest(static_folder):
+    """The last build's {source path: built path}, or {} when nothing has been built"""
+    try:
+        with open(os.path.join(static_folder, DIST_DIR, MANIFEST), encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
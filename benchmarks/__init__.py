@@ -0,0 +1,7 @@
+"""Benchmarks for the Finance Dashboard.
+
+``datagen`` seeds a database with deterministic synthetic users and
+transactions, ``suite`` drives every route through the Flask test client and
+compares the results against the baselines in ``benchmarks/baselines``. The
+``bench_*.py`` scripts are focused before/after measurements of single changes.
+"""
@@ -0,0 +1,88 @@
+"""NumPy column analytics vs. the original per-month Python loops of get_monthly_analytics.
+
+    python benchmarks/bench_analytics.py --rows 200000
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+CATEGORIES = ['Food', 'Transportation', 'Entertainment', 'Utilities', 'Rent', 'Health', 'Shopping', 'Salary']
+
+
+def legacy_monthly(transactions, now):
+    """The pre-rollup endpoint: two scans of every ORM row for each of 12 months"""
+    data = []
+    for i in range(11, -1, -1):
+        month_date = now - timedelta(days=30 * i)
+        month_str = month_date.strftime('%Y-%m')
+        data.append({
+            'month': month_date.strftime('%b'),
+            'income': sum(t.amount for t in transactions if t.type == 'income' and t.date.strftime('%Y-%m') == month_str),
+            'expenses': sum(t.amount for t in transactions if t.type == 'expense' and t.date.strftime('%Y-%m') == month_str),
+        })
+    return data
+
+
+def timed(fn, repeat):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, default=200000)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ['DATABASE_URL'] = 'sqlite:///' + os.path.join(tmp, 'bench.db')
+        from app import (app, db, column_store, User, Transaction, analytics_insights, import_rows,
+                         load_columns)
+
+        with app.app_context():
+            user = User(username='bench', email='bench@example.com', password='x')
+            db.session.add(user)
+            db.session.commit()
+            rng = random.Random(1)
+            now = datetime.now()
+            rows = ((0, (('income' if rng.random() < 0.2 else 'expense'), rng.choice(CATEGORIES),
+                         round(rng.uniform(1, 500), 2), '', now - timedelta(minutes=rng.randint(0, 3 * 365 * 1440))),
+                     None) for _ in range(args.rows))
+            import_rows(user.id, rows)
+
+            def legacy():
+                legacy_monthly(Transaction.query.filter_by(user_id=user.id).all(), now)
+                db.session.expunge_all()
+
+            results = [
+                ('legacy loops (ORM load + 24 scans)', timed(legacy, args.repeat)),
+                ('column load (SQL -> arrays)', timed(lambda: load_columns(db.session.connection(), user.id),
+                                                      args.repeat)),
+            ]
+            analytics_insights(user.id, now=now)  # warm the column cache
+            results.append(('insights, cached columns', timed(lambda: analytics_insights(user.id, now=now),
+                                                               args.repeat)))
+
+            def cold():
+                column_store.clear()
+                analytics_insights(user.id, now=now)
+            results.append(('insights, cold cache', timed(cold, args.repeat)))
+
+    baseline = results[0][1]
+    print(f'{args.rows:,} transactions, best of {args.repeat}')
+    for name, seconds in results:
+        print(f'  {name:38s} {seconds * 1000:10.1f} ms  {baseline / seconds:8.1f}x')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,132 @@
+"""Database size and grouped-query time before and after migration 5 (category strings -> category ids).
+
+    python benchmarks/bench_categories.py --users 200 --transactions 5000
+
+Builds a database in the pre-migration shape (category names on every
+transaction, budget and rollup row) from benchmarks.datagen's rows, measures it,
+runs migration 5 and measures again. Sizes come from SQLite's dbstat after
+VACUUM; query times are the best of --repeat passes over every user, fetching
+the rows and dictionary-encoding the category key like the analytics code does.
+"""
+import argparse
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import time
+from datetime import date
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import migrations
+from benchmarks.datagen import user_transactions
+from sqlalchemy import create_engine
+
+SCHEMA = """
+CREATE TABLE user (id INTEGER PRIMARY KEY, username VARCHAR(80), email VARCHAR(120), password VARCHAR(200),
+                   created_at DATETIME, data_version INTEGER NOT NULL DEFAULT 0);
+CREATE TABLE "transaction" (id INTEGER PRIMARY KEY, user_id INTEGER NOT NULL, type VARCHAR(50) NOT NULL,
+                            category VARCHAR(100) NOT NULL, amount FLOAT NOT NULL,
+                            description VARCHAR(500), date DATETIME NOT NULL);
+CREATE TABLE budget (id INTEGER PRIMARY KEY, user_id INTEGER NOT NULL, category VARCHAR(100) NOT NULL,
+                     "limit" FLOAT NOT NULL, month VARCHAR(7) NOT NULL);
+CREATE TABLE savings_goal (id INTEGER PRIMARY KEY, user_id INTEGER NOT NULL, name VARCHAR(200) NOT NULL,
+                           target FLOAT NOT NULL, current FLOAT, deadline DATETIME, priority VARCHAR(50));
+CREATE TABLE monthly_rollup (user_id INTEGER NOT NULL, month VARCHAR(7) NOT NULL, type VARCHAR(50) NOT NULL,
+                             category VARCHAR(100) NOT NULL, total FLOAT NOT NULL, count INTEGER NOT NULL,
+                             PRIMARY KEY (user_id, month, type, category));
+"""
+
+# (label, query on string categories, query on category ids), all per user
+QUERIES = [
+    ('rollup category totals', 'SELECT type, category, SUM(total) FROM monthly_rollup '
+                               'WHERE user_id = ? GROUP BY type, category',
+     'SELECT type, category_id, SUM(total) FROM monthly_rollup WHERE user_id = ? GROUP BY type, category_id'),
+    ('column load + encode', 'SELECT amount, date, category FROM "transaction" WHERE user_id = ?',
+     'SELECT amount, date, category_id FROM "transaction" WHERE user_id = ?'),
+]
+# Objects whose size changes, as named by SQLite's dbstat table
+OBJECTS = ['transaction', 'ix_transaction_user_type_category_date', 'budget', 'monthly_rollup',
+           'sqlite_autoindex_monthly_rollup_1', 'category', 'sqlite_autoindex_category_1']
+
+
+def sizes_mib(path):
+    """{object name: MiB} after VACUUM, plus the whole file under 'total'"""
+    conn = sqlite3.connect(path)
+    conn.execute('VACUUM')
+    sizes = {name: size / 2 ** 20 for name, size in conn.execute('SELECT name, SUM(pgsize) FROM dbstat GROUP BY name')}
+    conn.close()
+    sizes['total'] = os.path.getsize(path) / 2 ** 20
+    return sizes
+
+
+def best_query_ms(path, sql, users, repeat):
+    conn = sqlite3.connect(path)
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for user_id in range(1, users + 1):
+            lookup = {}
+            for row in conn.execute(sql, (user_id,)):
+                lookup.setdefault(row[-1], len(lookup))
+        best = min(best, time.perf_counter() - start)
+    conn.close()
+    return best / users * 1000
+
+
+def populate(conn, users, transactions):
+    today = date.today()
+    for user_id in range(1, users + 1):
+        conn.execute('INSERT INTO user (id, username, email, password) VALUES (?, ?, ?, ?)',
+                     (user_id, f'bench{user_id}', f'bench{user_id}@example.com', 'x'))
+        rows = user_transactions(random.Random(user_id), transactions, today, 730)
+        conn.executemany('INSERT INTO "transaction" (user_id, type, category, amount, description, date) '
+                         'VALUES (?, ?, ?, ?, ?, ?)',
+                         ((user_id, kind, category, amount, description, str(when))
+                          for kind, category, amount, description, when in rows))
+        conn.executemany('INSERT INTO budget (user_id, category, "limit", month) VALUES (?, ?, ?, ?)',
+                         [(user_id, c, 300.0, today.strftime('%Y-%m')) for c in ('Food', 'Shopping', 'Rent')])
+    conn.execute("""
+        INSERT INTO monthly_rollup SELECT user_id, strftime('%Y-%m', date), type, category, SUM(amount), COUNT(*)
+        FROM "transaction" GROUP BY 1, 2, 3, 4
+    """)
+    for name, table, columns in migrations.USER_INDEXES:
+        conn.execute(migrations.create_index_sql(name, table, columns))
+    conn.execute('PRAGMA user_version = 4')
+    conn.commit()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--users', type=int, default=200)
+    parser.add_argument('--transactions', type=int, default=5000, help='per user')
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'bench.db')
+        conn = sqlite3.connect(path)
+        conn.executescript(SCHEMA)
+        populate(conn, args.users, args.transactions)
+        conn.close()
+        before = sizes_mib(path)
+        before_ms = [best_query_ms(path, sql, args.users, args.repeat) for _, sql, _ in QUERIES]
+
+        start = time.perf_counter()
+        applied = migrations.upgrade(create_engine(f'sqlite:///{path}'))
+        elapsed = time.perf_counter() - start
+        after = sizes_mib(path)
+        after_ms = [best_query_ms(path, sql, args.users, args.repeat) for _, _, sql in QUERIES]
+
+    print(f'{args.users * args.transactions:,d} transactions; migrations {applied} took {elapsed:.1f}s')
+    print(f"{'MiB':40s} {'strings':>9s} {'ids':>9s}")
+    for name in OBJECTS + ['total']:
+        print(f"{name:40s} {before.get(name, 0):9.2f} {after.get(name, 0):9.2f}")
+    print(f"{'ms per user':40s} {'strings':>9s} {'ids':>9s}")
+    for (label, _, _), then, now in zip(QUERIES, before_ms, after_ms):
+        print(f'{label:40s} {then:9.3f} {now:9.3f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,88 @@
+"""Payload size and server CPU of /api/transactions pages: row objects vs. ?format=columnar.
+
+    python benchmarks/bench_columnar.py --rows 100000
+
+Both formats return the same keyset page. The response cache and compression
+are off, so every request builds and serializes its page; gzip sizes are what
+the same body costs on the wire with COMPRESS_ENABLED. CPU is the process time to
+fetch the first N rows through the Flask test client, best of --repeat runs.
+"""
+import argparse
+import gzip
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+CATEGORIES = ['Food', 'Transportation', 'Entertainment', 'Utilities', 'Rent', 'Health', 'Shopping', 'Salary']
+DESCRIPTIONS = ['', 'Groceries', 'Coffee', 'Monthly bill', 'Cinema with friends']
+
+
+def page_urls(client, fmt, limit):
+    """URLs of the first `limit` rows in pages the format allows (the row format caps pages at 500)"""
+    page_size = limit if fmt == 'columnar' else min(limit, 500)
+    urls, cursor = [], ''
+    for _ in range(limit // page_size):
+        urls.append(f'/api/transactions?limit={page_size}&format={fmt}' + (f'&cursor={cursor}' if cursor else ''))
+        cursor = client.get(urls[-1]).get_json()['next_cursor']
+    return urls
+
+
+def cpu_per_fetch(client, urls, repeat):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.process_time()
+        for url in urls:
+            client.get(url).close()
+        best = min(best, time.process_time() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, default=100000)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ.update(DATABASE_URL='sqlite:///' + os.path.join(tmp, 'bench.db'), RESPONSE_CACHE_MAX_BYTES='0',
+                          COMPRESS_ENABLED='0', METRICS_ENABLED='0')
+        from app import app, db, User, import_rows
+
+        with app.app_context():
+            user = User(username='bench', email='bench@example.com', password='x')
+            db.session.add(user)
+            db.session.commit()
+            rng = random.Random(1)
+            now = datetime.now()
+            import_rows(user.id, ((0, (('income' if rng.random() < 0.2 else 'expense'), rng.choice(CATEGORIES),
+                                       round(rng.uniform(1, 500), 2), rng.choice(DESCRIPTIONS),
+                                       now - timedelta(minutes=rng.randint(0, 3 * 365 * 1440))), None)
+                                  for _ in range(args.rows)))
+            user_id = user.id
+
+        client = app.test_client()
+        with client.session_transaction() as sess:
+            sess['user_id'] = user_id
+
+        print(f'{args.rows} transactions; first N rows: bytes, gzip bytes and server CPU ms')
+        print(f"{'rows':>6s} {'row fmt':>10s} {'columnar':>10s} {'row gzip':>9s} {'col gzip':>9s} "
+              f"{'row ms':>8s} {'col ms':>8s}")
+        for limit in (50, 500, 5000):
+            sizes, cpu = {}, {}
+            for fmt in ('rows', 'columnar'):
+                urls = page_urls(client, fmt, limit)
+                bodies = [client.get(url).get_data() for url in urls]
+                sizes[fmt] = (sum(map(len, bodies)), sum(len(gzip.compress(b)) for b in bodies))
+                cpu[fmt] = cpu_per_fetch(client, urls, args.repeat) * 1000
+            note = f'  (row format: {limit // 500} pages)' if limit > 500 else ''
+            print(f"{limit:6d} {sizes['rows'][0]:10,d} {sizes['columnar'][0]:10,d} {sizes['rows'][1]:9,d} "
+                  f"{sizes['columnar'][1]:9,d} {cpu['rows']:8.2f} {cpu['columnar']:8.2f}{note}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,109 @@
+"""Concurrent read/write throughput on an on-disk SQLite database, SQLite defaults vs. the tuned settings.
+
+    python benchmarks/bench_concurrency.py --readers 8 --writers 4 --seconds 10
+
+Each configuration runs in its own process (settings are read at import time)
+against a freshly seeded database. Readers page through /api/transactions with
+varying filters so the response cache rarely hits; writers POST transactions.
+"""
+import argparse
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+CONFIGS = {
+    # SQLite/pysqlite out of the box: rollback journal, synchronous=FULL, 5s pysqlite timeout, SQLAlchemy's pool size
+    'defaults': {'SQLITE_JOURNAL_MODE': 'DELETE', 'SQLITE_SYNCHRONOUS': 'FULL', 'SQLITE_BUSY_TIMEOUT': '',
+                 'SQLITE_CACHE_SIZE': '', 'SQLITE_MMAP_SIZE': '', 'SQLITE_TEMP_STORE': '',
+                 'DB_POOL_SIZE': '5', 'ANALYTICS_POOL_SIZE': '5'},
+    'tuned': {},
+}
+CATEGORIES = ['Food', 'Transportation', 'Entertainment', 'Utilities', 'Rent', 'Health', 'Shopping', 'Salary']
+
+
+def run_worker(args):
+    from app import app, db, User, import_rows
+
+    with app.app_context():
+        rng = random.Random(1)
+        now = datetime.now()
+        for n in range(args.users):
+            user = User(username=f'bench{n}', email=f'bench{n}@example.com', password='x')
+            db.session.add(user)
+            db.session.commit()
+            import_rows(user.id, ((0, (rng.choice(['income', 'expense']), rng.choice(CATEGORIES),
+                                       round(rng.uniform(1, 500), 2), '',
+                                       now - timedelta(minutes=rng.randint(0, 365 * 1440))), None)
+                                  for _ in range(args.rows)))
+
+    counts = {'reads': 0, 'writes': 0, 'errors': 0}
+    lock = threading.Lock()
+    stop = time.perf_counter() + args.seconds
+
+    def client_for(n):
+        client = app.test_client()
+        with client.session_transaction() as sess:
+            sess['user_id'] = n + 1
+        return client
+
+    def reader(n):
+        client, rng = client_for(n % args.users), random.Random(n)
+        while time.perf_counter() < stop:
+            day = (now - timedelta(days=rng.randint(0, 365))).strftime('%Y-%m-%d')
+            ok = client.get(f'/api/transactions?limit=100&start_date={day}').status_code == 200
+            with lock:
+                counts['reads' if ok else 'errors'] += 1
+
+    def writer(n):
+        client, rng = client_for(n % args.users), random.Random(-n)
+        while time.perf_counter() < stop:
+            ok = client.post('/api/transactions', json={'type': 'expense', 'category': rng.choice(CATEGORIES),
+                                                        'amount': 12.5}).status_code == 201
+            with lock:
+                counts['writes' if ok else 'errors'] += 1
+
+    threads = [threading.Thread(target=reader, args=(n,)) for n in range(args.readers)]
+    threads += [threading.Thread(target=writer, args=(n,)) for n in range(args.writers)]
+    start = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - start
+    print(json.dumps({k: v / elapsed for k, v in counts.items()}))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--readers', type=int, default=8)
+    parser.add_argument('--writers', type=int, default=4)
+    parser.add_argument('--users', type=int, default=4)
+    parser.add_argument('--rows', type=int, default=20000, help='seeded transactions per user')
+    parser.add_argument('--seconds', type=float, default=10)
+    parser.add_argument('--worker', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        return run_worker(args)
+
+    print(f'{args.readers} readers + {args.writers} writers over {args.users} users, {args.seconds:g}s each')
+    for name, overrides in CONFIGS.items():
+        with tempfile.TemporaryDirectory() as tmp:
+            env = dict(os.environ, DATABASE_URL='sqlite:///' + os.path.join(tmp, 'bench.db'), **overrides)
+            out = subprocess.run([sys.executable, __file__, '--worker'] + sys.argv[1:], env=env,
+                                 capture_output=True, text=True, check=True).stdout
+            rates = json.loads(out.strip().splitlines()[-1])
+        print(f"  {name:9s} reads {rates['reads']:8.1f}/s   writes {rates['writes']:8.1f}/s   "
+              f"errors {rates['errors']:6.1f}/s")
+
+
+if __name__ == '__main__':
+    main()
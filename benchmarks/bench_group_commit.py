@@ -0,0 +1,111 @@
+"""Write throughput under many concurrent clients, a commit per request vs. the write-behind queue.
+
+    python benchmarks/bench_group_commit.py --clients 128 --seconds 10
+
+Each configuration runs in its own process (settings are read at import time)
+against a freshly seeded on-disk database. Every client loops over POST
+/api/transactions, POST /api/budgets and DELETE of a transaction it added, so
+inserts and deletes both go through the writer. A request only counts once it
+has been acknowledged, i.e. once its write is committed.
+"""
+import argparse
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+CONFIGS = {
+    'per request': {'WRITE_BEHIND': '0'},
+    'write-behind': {'WRITE_BEHIND': '1'},
+}
+CATEGORIES = ['Food', 'Transportation', 'Entertainment', 'Utilities', 'Rent', 'Health', 'Shopping']
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))] if ordered else 0.0
+
+
+def run_worker(args):
+    from app import app
+    from benchmarks.datagen import generate
+
+    with app.app_context():
+        user_ids = generate(args.users, args.rows)
+
+    counts = {'writes': 0, 'errors': 0}
+    latencies = []
+    lock = threading.Lock()
+    stop = time.perf_counter() + args.seconds
+
+    def client(n):
+        own, rng = app.test_client(), random.Random(n)
+        with own.session_transaction() as sess:
+            sess['user_id'] = user_ids[n % len(user_ids)]
+        added = []
+        while time.perf_counter() < stop:
+            began = time.perf_counter()
+            step = rng.random()
+            if step < 0.2 and added:
+                ok = own.delete(f'/api/transactions/{added.pop()}').status_code == 200
+            elif step < 0.3:
+                ok = own.post('/api/budgets', json={'category': rng.choice(CATEGORIES), 'limit': 250,
+                                                    'month': time.strftime('%Y-%m')}).status_code == 201
+            else:
+                response = own.post('/api/transactions', json={'type': 'expense', 'category': rng.choice(CATEGORIES),
+                                                               'amount': 12.5, 'description': 'bench write'})
+                ok = response.status_code == 201
+                if ok:
+                    added.append(response.get_json()['id'])
+            with lock:
+                counts['writes' if ok else 'errors'] += 1
+                latencies.append((time.perf_counter() - began) * 1000)
+
+    threads = [threading.Thread(target=client, args=(n,)) for n in range(args.clients)]
+    start = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - start
+    write_queue = app.extensions.get('write_queue')
+    batches = write_queue.stats()['batches'] if write_queue else counts['writes'] + counts['errors']
+    print(json.dumps({'writes': counts['writes'] / elapsed, 'errors': counts['errors'] / elapsed,
+                      'p50': percentile(latencies, 50), 'p95': percentile(latencies, 95),
+                      'per_commit': (counts['writes'] + counts['errors']) / max(batches, 1)}))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--clients', type=int, default=128)
+    parser.add_argument('--users', type=int, default=32)
+    parser.add_argument('--rows', type=int, default=1000, help='seeded transactions per user')
+    parser.add_argument('--seconds', type=float, default=10)
+    parser.add_argument('--synchronous', default='NORMAL', help='SQLITE_SYNCHRONOUS for both runs (FULL fsyncs every commit)')
+    parser.add_argument('--worker', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        return run_worker(args)
+
+    print(f'{args.clients} clients over {args.users} users, synchronous={args.synchronous}, {args.seconds:g}s each')
+    for name, overrides in CONFIGS.items():
+        with tempfile.TemporaryDirectory() as tmp:
+            env = dict(os.environ, DATABASE_URL='sqlite:///' + os.path.join(tmp, 'bench.db'),
+                       SQLITE_SYNCHRONOUS=args.synchronous, RESPONSE_CACHE_MAX_BYTES='0', METRICS_ENABLED='0',
+                       DB_POOL_SIZE=str(args.clients), **overrides)
+            out = subprocess.run([sys.executable, __file__, '--worker'] + sys.argv[1:], env=env,
+                                 capture_output=True, text=True, check=True).stdout
+            rates = json.loads(out.strip().splitlines()[-1])
+        print(f"  {name:12s} writes {rates['writes']:8.1f}/s   errors {rates['errors']:6.1f}/s   "
+              f"p50 {rates['p50']:7.1f} ms   p95 {rates['p95']:7.1f} ms   {rates['per_commit']:5.1f} writes/commit")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,58 @@
+"""Throughput of POST /api/transactions/import into a fresh on-disk SQLite database.
+
+    python benchmarks/bench_import.py --rows 500000 --format csv
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+CATEGORIES = ['Food', 'Transportation', 'Entertainment', 'Utilities', 'Rent', 'Health', 'Shopping', 'Salary']
+
+
+def generate(rows, fmt, seed=1):
+    rng = random.Random(seed)
+    out = ['type,category,amount,description,date'] if fmt == 'csv' else []
+    for _ in range(rows):
+        kind = 'income' if rng.random() < 0.2 else 'expense'
+        category = rng.choice(CATEGORIES)
+        amount = round(rng.uniform(1, 500), 2)
+        date = f'20{rng.randint(20, 25)}-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d} 12:00'
+        if fmt == 'csv':
+            out.append(f'{kind},{category},{amount},imported,{date}')
+        else:
+            out.append(json.dumps({'type': kind, 'category': category, 'amount': amount,
+                                   'description': 'imported', 'date': date}))
+    return ('\n'.join(out) + '\n').encode()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, default=500000)
+    parser.add_argument('--format', choices=['csv', 'jsonl'], default='csv')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ['DATABASE_URL'] = 'sqlite:///' + os.path.join(tmp, 'bench.db')
+        from app import app
+
+        client = app.test_client()
+        client.post('/api/auth/signup', json={'username': 'bench', 'email': 'bench@example.com', 'password': 'pw'})
+        body = generate(args.rows, args.format)
+
+        start = time.perf_counter()
+        response = client.post(f'/api/transactions/import?format={args.format}', data=body)
+        elapsed = time.perf_counter() - start
+        report = response.get_json()
+
+    print(f"Imported {report['imported']:,} rows ({len(body) / 1e6:.1f} MB {args.format}) in {elapsed:.2f}s "
+          f"-> {report['imported'] / elapsed:,.0f} rows/sec, {report['failed']} failed")
+
+
+if __name__ == '__main__':
+    main()
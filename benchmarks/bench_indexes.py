@@ -0,0 +1,112 @@
+"""Full-scan vs. composite-index timings for the hot per-user queries.
+
+Builds a throwaway SQLite database with the app's transaction/budget schema,
+fills it with synthetic rows spread over many users, times each query without
+indexes, applies the indexes from migrations.USER_INDEXES and times them again.
+
+    python benchmarks/bench_indexes.py --rows 1000000 --users 5000
+"""
+import argparse
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from migrations import USER_INDEXES, create_index_sql
+
+SCHEMA = """
+CREATE TABLE "transaction" (id INTEGER PRIMARY KEY, user_id INTEGER NOT NULL, type VARCHAR(50) NOT NULL,
+                            category VARCHAR(100) NOT NULL, amount FLOAT NOT NULL,
+                            description VARCHAR(500), date DATETIME NOT NULL);
+CREATE TABLE budget (id INTEGER PRIMARY KEY, user_id INTEGER NOT NULL, category VARCHAR(100) NOT NULL,
+                     "limit" FLOAT NOT NULL, month VARCHAR(7) NOT NULL);
+CREATE TABLE savings_goal (id INTEGER PRIMARY KEY, user_id INTEGER NOT NULL, name VARCHAR(200) NOT NULL,
+                           target FLOAT NOT NULL, current FLOAT, deadline DATETIME, priority VARCHAR(50));
+"""
+
+CATEGORIES = ['Food', 'Transportation', 'Entertainment', 'Utilities', 'Rent', 'Health', 'Shopping', 'Salary']
+
+QUERIES = {
+    'list transactions': 'SELECT * FROM "transaction" WHERE user_id = :uid ORDER BY date DESC, id DESC LIMIT 50',
+    'dashboard totals': 'SELECT type, SUM(amount) FROM "transaction" WHERE user_id = :uid GROUP BY type',
+    'month range': 'SELECT SUM(amount) FROM "transaction" WHERE user_id = :uid AND date >= :start AND date < :end',
+    'category spend': 'SELECT category, SUM(amount) FROM "transaction" '
+                      'WHERE user_id = :uid AND type = \'expense\' AND date >= :start GROUP BY category',
+    'budgets for month': 'SELECT * FROM budget WHERE user_id = :uid AND month = :month',
+}
+
+
+def populate(conn, rows, users, seed=1):
+    rng = random.Random(seed)
+    now = datetime(2025, 6, 1)
+    batch = []
+    for i in range(rows):
+        batch.append((
+            rng.randint(1, users),
+            'income' if rng.random() < 0.2 else 'expense',
+            rng.choice(CATEGORIES),
+            round(rng.uniform(1, 500), 2),
+            '',
+            (now - timedelta(minutes=rng.randint(0, 60 * 24 * 730))).strftime('%Y-%m-%d %H:%M:%S.000000'),
+        ))
+        if len(batch) == 50000:
+            conn.executemany('INSERT INTO "transaction" (user_id, type, category, amount, description, date) '
+                             'VALUES (?, ?, ?, ?, ?, ?)', batch)
+            batch.clear()
+    if batch:
+        conn.executemany('INSERT INTO "transaction" (user_id, type, category, amount, description, date) '
+                         'VALUES (?, ?, ?, ?, ?, ?)', batch)
+    conn.executemany('INSERT INTO budget (user_id, category, "limit", month) VALUES (?, ?, ?, ?)',
+                     [(u, c, 500.0, '2025-05') for u in range(1, users + 1) for c in CATEGORIES[:4]])
+    conn.commit()
+
+
+def time_queries(conn, users, repeat):
+    rng = random.Random(7)
+    params = [{'uid': rng.randint(1, users), 'start': '2025-05-01', 'end': '2025-06-01', 'month': '2025-05'}
+              for _ in range(repeat)]
+    results = {}
+    for name, sql in QUERIES.items():
+        start = time.perf_counter()
+        for p in params:
+            conn.execute(sql, p).fetchall()
+        results[name] = (time.perf_counter() - start) / repeat * 1000
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, default=1000000)
+    parser.add_argument('--users', type=int, default=5000)
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        conn = sqlite3.connect(os.path.join(tmp, 'bench.db'))
+        conn.executescript(SCHEMA)
+
+        start = time.perf_counter()
+        populate(conn, args.rows, args.users)
+        print(f"Inserted {args.rows:,} transactions for {args.users:,} users in {time.perf_counter() - start:.1f}s")
+
+        before = time_queries(conn, args.users, args.repeat)
+        start = time.perf_counter()
+        for name, table, columns in USER_INDEXES:
+            conn.execute(create_index_sql(name, table, columns))
+        conn.execute('ANALYZE')
+        print(f"Built indexes in {time.perf_counter() - start:.1f}s")
+        after = time_queries(conn, args.users, args.repeat)
+        conn.close()
+
+    print(f"\n{'query':<20} {'scan (ms)':>12} {'index (ms)':>12} {'speedup':>10}")
+    for name in QUERIES:
+        print(f"{name:<20} {before[name]:>12.2f} {after[name]:>12.3f} {before[name] / after[name]:>9.0f}x")
+
+
+if __name__ == '__main__':
+    main()
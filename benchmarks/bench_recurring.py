@@ -0,0 +1,88 @@
+"""Storage and projection cost of recurring rules vs. pre-generating their ten years of rows.
+
+    python benchmarks/bench_recurring.py --users 50 --years 10
+
+Every user gets a daily, a weekly and a monthly rule running --years from the
+start of this month. "pre-generated" writes every occurrence as a transaction
+up front, the way a rule-less design has to; "rules" stores one row per rule.
+Projection times are for /api/analytics/bundle?projection=12 through the test
+client, the last column for one scheduler pass that writes a day of occurrences
+for every user.
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+RULES = [('expense', 'Coffee', 4.5, 'daily'), ('expense', 'Groceries', 80, 'weekly'), ('income', 'Salary', 2800, 'monthly')]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--users', type=int, default=50)
+    parser.add_argument('--years', type=int, default=10)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'bench.db')
+        os.environ.update(DATABASE_URL='sqlite:///' + path, RESPONSE_CACHE_MAX_BYTES='0', METRICS_ENABLED='0')
+        import recurring
+        from app import app, db, import_rows, materialize_due
+        from benchmarks.datagen import generate
+
+        start = datetime.now().replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+        end = start.replace(year=start.year + args.years) - timedelta(days=1)
+        with app.app_context():
+            pregenerated, ruled = generate(args.users, 0, prefix='pre'), generate(args.users, 0, prefix='rule')
+            db.session.execute(db.text('DELETE FROM recurring_rule'))  # datagen's own rules
+            db.session.commit()
+
+            began = time.perf_counter()
+            for user_id in pregenerated:
+                import_rows(user_id, ((0, (kind, category, amount, '', when), None)
+                                      for kind, category, amount, frequency in RULES
+                                      for _, when in recurring.occurrences(start, frequency, 0, end)))
+            pregenerate_s = time.perf_counter() - began
+
+        def client_for(user_id):
+            client = app.test_client()
+            with client.session_transaction() as sess:
+                sess['user_id'] = user_id
+            return client
+
+        for user_id in ruled:
+            client = client_for(user_id)
+            for kind, category, amount, frequency in RULES:
+                assert client.post('/api/recurring', json={
+                    'type': kind, 'category': category, 'amount': amount, 'frequency': frequency,
+                    'start_date': f'{start:%Y-%m-%d}', 'end_date': f'{end:%Y-%m-%d}'}).status_code == 201
+
+        def bundle_ms(user_ids):
+            clients = [client_for(user_id) for user_id in user_ids]
+            began = time.perf_counter()
+            for client in clients:
+                assert client.get('/api/analytics/bundle?projection=12').status_code == 200
+            return (time.perf_counter() - began) * 1000 / len(clients)
+
+        results = {'pre-generated': bundle_ms(pregenerated), 'rules': bundle_ms(ruled)}
+        with app.app_context():
+            counts = {name: db.session.execute(db.text(sql)).scalar() for name, sql in (
+                ('pre-generated', 'SELECT COUNT(*) FROM "transaction"'),
+                ('rules', 'SELECT COUNT(*) FROM recurring_rule'))}
+            began = time.perf_counter()
+            written = materialize_due(start)
+            pass_ms = (time.perf_counter() - began) * 1000
+
+    print(f'{args.users} users x {len(RULES)} rules over {args.years} years (pre-generating took {pregenerate_s:.1f}s)')
+    print(f"{'':14s} {'rows':>10s} {'bundle ms':>10s}")
+    for name, ms in results.items():
+        print(f'{name:14s} {counts[name]:10,d} {ms:10.1f}')
+    print(f'scheduler pass: {written} occurrences written in {pass_ms:.1f} ms')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,77 @@
+"""Latency of GET /api/transactions/search over millions of synthetic transactions.
+
+    python benchmarks/bench_search.py --users 200 --transactions 10000
+
+Data comes from benchmarks.datagen, so it is indexed through import_rows like a
+real import. The response cache is off, so every request runs its FTS5 query;
+times are wall clock through the Flask test client, for users picked at random.
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+QUERIES = [
+    ('word', 'q=lunch'),
+    ('prefix', 'q=co'),
+    ('two prefixes', 'q=train+tic'),
+    ('category filter', 'q=gro&category=Food'),
+    ('date filter', 'q=rent&start_date={start}&end_date={end}'),
+    ('second page', 'q=coffee&offset=20'),
+]
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--users', type=int, default=200)
+    parser.add_argument('--transactions', type=int, default=10000, help='per user')
+    parser.add_argument('--requests', type=int, default=200, help='per query')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ.update(DATABASE_URL='sqlite:///' + os.path.join(tmp, 'bench.db'), RESPONSE_CACHE_MAX_BYTES='0',
+                          COMPRESS_ENABLED='0', METRICS_ENABLED='0')
+        from app import app
+        from benchmarks.datagen import generate
+
+        start = time.perf_counter()
+        with app.app_context():
+            user_ids = generate(args.users, args.transactions)
+        elapsed = time.perf_counter() - start
+        rows = args.users * args.transactions
+        print(f'{rows:,d} transactions for {args.users} users generated and indexed in {elapsed:.1f}s '
+              f'({rows / elapsed:,.0f} rows/s)')
+
+        rng = random.Random(1)
+        clients = {}
+        for user_id in user_ids:
+            clients[user_id] = app.test_client()
+            with clients[user_id].session_transaction() as sess:
+                sess['user_id'] = user_id
+        today = time.strftime('%Y-%m-%d')
+        year_ago = time.strftime('%Y-%m-%d', time.localtime(time.time() - 365 * 86400))
+
+        print(f"{'query':16s} {'results':>8s} {'p50 ms':>8s} {'p95 ms':>8s}")
+        for name, query in QUERIES:
+            url = '/api/transactions/search?' + query.format(start=year_ago, end=today)
+            times, results = [], 0
+            for _ in range(args.requests):
+                client = clients[rng.choice(user_ids)]
+                began = time.perf_counter()
+                response = client.get(url)
+                times.append((time.perf_counter() - began) * 1000)
+                results += len(response.get_json()['results'])
+            print(f'{name:16s} {results / args.requests:8.1f} {percentile(times, 50):8.2f} {percentile(times, 95):8.2f}')
+
+
+if __name__ == '__main__':
+    main()
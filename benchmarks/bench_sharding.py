@@ -0,0 +1,114 @@
+"""Other users' write latency while one user runs bulk imports, one database file vs. SHARD_COUNT shards.
+
+    python benchmarks/bench_sharding.py --shards 4 --writers 16 --seconds 10
+
+Each configuration runs in its own process (settings are read at import time)
+against fresh on-disk databases. One client keeps POSTing a large CSV to
+/api/transactions/import, which holds SQLite's write lock for the length of
+each commit; the writers POST single transactions as different users. With one
+file every writer queues behind the import; with shards only the importer's
+shard mates do.
+"""
+import argparse
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+CATEGORIES = ['Food', 'Transportation', 'Entertainment', 'Utilities', 'Rent', 'Health', 'Shopping']
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))] if ordered else 0.0
+
+
+def csv_body(rows, rng):
+    lines = ['date,type,category,amount,description']
+    for _ in range(rows):
+        lines.append(f'2024-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d},expense,'
+                     f'{rng.choice(CATEGORIES)},{rng.uniform(1, 200):.2f},bulk import row')
+    return '\n'.join(lines).encode()
+
+
+def run_worker(args):
+    from app import app
+    from benchmarks.datagen import generate
+
+    with app.app_context():
+        user_ids = generate(args.writers + 1, 0)
+
+    def client_for(user_id):
+        client = app.test_client()
+        with client.session_transaction() as sess:
+            sess['user_id'] = user_id
+        return client
+
+    counts = {'writes': 0, 'errors': 0, 'imported': 0}
+    latencies = []
+    lock = threading.Lock()
+    stop = time.perf_counter() + args.seconds
+
+    def importer():
+        client, body = client_for(user_ids[0]), csv_body(args.import_rows, random.Random(0))
+        while time.perf_counter() < stop:
+            response = client.post('/api/transactions/import?format=csv', data=body, content_type='text/csv')
+            with lock:
+                counts['imported'] += response.get_json().get('imported', 0)
+
+    def writer(user_id):
+        client, rng = client_for(user_id), random.Random(user_id)
+        while time.perf_counter() < stop:
+            began = time.perf_counter()
+            ok = client.post('/api/transactions', json={'type': 'expense', 'category': rng.choice(CATEGORIES),
+                                                        'amount': 12.5}).status_code == 201
+            with lock:
+                counts['writes' if ok else 'errors'] += 1
+                latencies.append((time.perf_counter() - began) * 1000)
+
+    threads = [threading.Thread(target=importer)]
+    threads += [threading.Thread(target=writer, args=(user_id,)) for user_id in user_ids[1:]]
+    start = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - start
+    print(json.dumps({'writes': counts['writes'] / elapsed, 'errors': counts['errors'] / elapsed,
+                      'imported': counts['imported'] / elapsed,
+                      'p50': percentile(latencies, 50), 'p95': percentile(latencies, 95)}))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--shards', type=int, default=4)
+    parser.add_argument('--writers', type=int, default=16, help='users writing single transactions')
+    parser.add_argument('--import-rows', type=int, default=100000, help='rows per import request')
+    parser.add_argument('--seconds', type=float, default=10)
+    parser.add_argument('--worker', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        return run_worker(args)
+
+    print(f'1 importer ({args.import_rows:,d} rows per request) + {args.writers} writers, {args.seconds:g}s each')
+    for name, shards in (('one file', 0), (f'{args.shards} shards', args.shards)):
+        with tempfile.TemporaryDirectory() as tmp:
+            env = dict(os.environ, DATABASE_URL='sqlite:///' + os.path.join(tmp, 'bench.db'),
+                       SHARD_COUNT=str(shards), SHARD_DATABASE_URL='sqlite:///' + os.path.join(tmp, 'shard-{shard}.db'),
+                       RESPONSE_CACHE_MAX_BYTES='0', METRICS_ENABLED='0', SQLITE_BUSY_TIMEOUT='30000')
+            out = subprocess.run([sys.executable, __file__, '--worker'] + sys.argv[1:], env=env,
+                                 capture_output=True, text=True, check=True).stdout
+            rates = json.loads(out.strip().splitlines()[-1])
+        print(f"  {name:10s} writes {rates['writes']:7.1f}/s   errors {rates['errors']:5.1f}/s   "
+              f"p50 {rates['p50']:7.1f} ms   p95 {rates['p95']:7.1f} ms   imported {rates['imported']:9,.0f} rows/s")
+
+
+if __name__ == '__main__':
+    main()
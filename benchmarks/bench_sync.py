@@ -0,0 +1,67 @@
+"""Bytes a returning dashboard downloads for its lists: full lists vs. a delta from GET /api/sync.
+
+    python benchmarks/bench_sync.py --transactions 50000 --changes 5
+
+One user with --transactions rows from benchmarks.datagen. "full lists" pages
+through every transaction plus budgets and goals, as a client without a replica
+must; "snapshot" is the one-time /api/sync?since=0 a new replica starts from;
+"delta" is the sync after --changes writes made elsewhere since the replica's version.
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--transactions', type=int, default=50000)
+    parser.add_argument('--changes', type=int, default=5)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ.update(DATABASE_URL='sqlite:///' + os.path.join(tmp, 'bench.db'), RESPONSE_CACHE_MAX_BYTES='0',
+                          METRICS_ENABLED='0')
+        from app import app
+        from benchmarks.datagen import generate
+
+        with app.app_context():
+            [user_id] = generate(1, args.transactions)
+        client = app.test_client()
+        with client.session_transaction() as sess:
+            sess['user_id'] = user_id
+
+        def fetch(*paths):
+            """(raw bytes, gzip bytes, ms) for GETting every path"""
+            raw = compressed = 0
+            start = time.perf_counter()
+            for path in paths:
+                raw += len(client.get(path).get_data())
+                compressed += len(client.get(path, headers={'Accept-Encoding': 'gzip'}).get_data())
+            return raw, compressed, (time.perf_counter() - start) * 1000 / 2
+
+        pages, cursor = ['/api/transactions?limit=500'], ''
+        while True:
+            cursor = client.get(pages[-1]).get_json()['next_cursor']
+            if not cursor:
+                break
+            pages.append(f'/api/transactions?limit=500&cursor={cursor}')
+        results = {'full lists': fetch(*pages, '/api/budgets', '/api/goals'),
+                   'snapshot': fetch('/api/sync?since=0')}
+        version = client.get('/api/sync?since=0').get_json()['version']
+        for n in range(args.changes):
+            client.post('/api/transactions', json={'type': 'expense', 'category': 'Food', 'amount': n + 1,
+                                                   'description': 'changed elsewhere'})
+        results['delta'] = fetch(f'/api/sync?since={version}')
+
+    print(f'{args.transactions:,d} transactions, {args.changes} changes since the replica\'s version')
+    print(f"{'':12s} {'bytes':>12s} {'gzip bytes':>12s} {'ms':>9s}")
+    for name, (raw, compressed, ms) in results.items():
+        print(f'{name:12s} {raw:12,d} {compressed:12,d} {ms:9.1f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,185 @@
+"""Deterministic synthetic users, transactions, budgets and goals for benchmarks.
+
+    python -m benchmarks.datagen --users 50 --transactions 10000 --database sqlite:///bench.db
+
+Each user draws from their own ``random.Random`` seeded with (seed, user number), so the data for
+user N is the same at every scale and only depends on the seed and ``today``.
+Dates are spread over the last ``days`` days with more discretionary spending on
+weekends and in December; rent and salaries land on fixed days of the month.
+Transactions go in through ``import_rows`` (executemany batches that keep the
+monthly rollups and data versions current); users, budgets, goals and recurring
+rules (salary, rent and a subscription, starting next month) are bulk inserted
+with one statement each.
+"""
+import argparse
+import math
+import os
+import random
+import sys
+from datetime import date, datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+SCALES = {
+    'tiny': (2, 200),
+    'small': (10, 2_000),
+    'medium': (50, 10_000),
+    'large': (200, 50_000),
+}
+PASSWORD = 'bench'
+
+# name: (relative frequency, median amount, lognormal sigma, descriptions)
+EXPENSES = {
+    'Food': (34, 18, 0.7, ['Groceries', 'Coffee', 'Lunch', 'Takeaway', 'Restaurant', '']),
+    'Transportation': (16, 12, 0.8, ['Bus pass', 'Fuel', 'Taxi', 'Train ticket', '']),
+    'Shopping': (13, 45, 0.9, ['Clothes', 'Electronics', 'Books', 'Gifts', '']),
+    'Entertainment': (10, 25, 0.8, ['Cinema', 'Concert', 'Streaming', 'Games', '']),
+    'Utilities': (8, 85, 0.4, ['Electricity', 'Water', 'Internet', 'Phone']),
+    'Health': (6, 55, 0.9, ['Pharmacy', 'Dentist', 'Gym', '']),
+    'Rent': (3, 1200, 0.05, ['Rent']),
+    'Other': (10, 30, 1.0, ['', 'Misc']),
+}
+INCOME = {
+    'Salary': (70, 2800, 0.05, ['Monthly salary']),
+    'Freelance': (20, 450, 0.6, ['Client invoice', 'Consulting', '']),
+    'Investments': (10, 120, 0.9, ['Dividends', 'Interest']),
+}
+INCOME_SHARE = 0.1
+DISCRETIONARY = ('Food', 'Shopping', 'Entertainment')
+WEEKEND_BOOST, DECEMBER_BOOST = 1.5, 1.8
+FIXED_DAY = {'Rent': (1,), 'Salary': (1, 15)}
+GOALS = ['Emergency fund', 'Vacation', 'New laptop', 'House deposit', 'Car', 'Wedding']
+# (type, category, median amount, description, frequency)
+RECURRING = [
+    ('income', 'Salary', 2800, 'Monthly salary', 'monthly'),
+    ('expense', 'Rent', 1200, 'Rent', 'monthly'),
+    ('expense', 'Entertainment', 12, 'Streaming', 'monthly'),
+]
+
+
+def day_weight(category, day):
+    """Relative likelihood of a transaction in `category` on `day`"""
+    weight = 1.0
+    if category in DISCRETIONARY and day.weekday() >= 5:
+        weight *= WEEKEND_BOOST
+    if category == 'Shopping' and day.month == 12:
+        weight *= DECEMBER_BOOST
+    return weight
+
+
+def pick_date(rng, category, today, days):
+    """A datetime in the last `days` days, shaped by day_weight() through rejection sampling"""
+    peak = (WEEKEND_BOOST if category in DISCRETIONARY else 1) * (DECEMBER_BOOST if category == 'Shopping' else 1)
+    while True:
+        day = today - timedelta(days=rng.randrange(days))
+        if category in FIXED_DAY:
+            day = day.replace(day=rng.choice(FIXED_DAY[category]))
+            if not 0 <= (today - day).days < days:
+                continue
+        if rng.random() * peak < day_weight(category, day):
+            break
+    return datetime(day.year, day.month, day.day, rng.randint(7, 22), rng.randrange(60), rng.randrange(60))
+
+
+def user_transactions(rng, count, today, days):
+    """Yield `count` (type, category, amount, description, date) rows for one user"""
+    scale = rng.lognormvariate(0, 0.3)  # some users simply spend and earn more
+    tables = {}
+    for kind, table in (('expense', EXPENSES), ('income', INCOME)):
+        names = list(table)
+        tables[kind] = (table, names, [table[n][0] * rng.uniform(0.5, 1.5) for n in names])
+    for _ in range(count):
+        kind = 'income' if rng.random() < INCOME_SHARE else 'expense'
+        table, names, weights = tables[kind]
+        category = rng.choices(names, weights)[0]
+        _, median, sigma, descriptions = table[category]
+        amount = round(rng.lognormvariate(math.log(median), sigma) * scale, 2)
+        yield kind, category, amount, rng.choice(descriptions), pick_date(rng, category, today, days)
+
+
+def generate(users, transactions, seed=0, today=None, days=730, prefix='bench'):
+    """Create `users` users with `transactions` transactions each; returns their ids in order.
+
+    Needs an app context. Every user's password is PASSWORD.
+    """
+    from werkzeug.security import generate_password_hash
+    from app import db, add_shard_user, category_ids, import_rows, Budget, RecurringRule, SavingsGoal, User
+
+    today = today or date.today()
+    month = today.strftime('%Y-%m')
+    next_month = datetime(today.year + today.month // 12, today.month % 12 + 1, 1)
+    password = generate_password_hash(PASSWORD)  # hashing is deliberately slow; do it once
+    created = datetime(today.year, today.month, today.day) - timedelta(days=days)
+    db.session.execute(User.__table__.insert(), [
+        {'username': f'{prefix}{n}', 'email': f'{prefix}{n}@example.com', 'password': password,
+         'created_at': created, 'data_version': 0}
+        for n in range(users)
+    ])
+    db.session.commit()
+    accounts = {user.username: user for user in User.query.filter(User.username.like(f'{prefix}%'))}
+    user_ids = [accounts[f'{prefix}{n}'].id for n in range(users)]
+
+    for n, user_id in enumerate(user_ids):
+        add_shard_user(accounts[f'{prefix}{n}'])  # with SHARD_COUNT set, also routes db.session to the user's shard
+        budgets, goals = [], []
+        rng = random.Random(f'{seed}:{n}')
+        spent = {}
+
+        def rows():
+            for row in user_transactions(rng, transactions, today, days):
+                if row[0] == 'expense':
+                    spent[row[1]] = spent.get(row[1], 0) + row[2]
+                yield 0, row, None
+        import_rows(user_id, rows())
+
+        # Budgets for the biggest categories, set around the user's average month
+        months = days / 30.4
+        top = sorted(spent.items(), key=lambda item: -item[1])[:5]
+        ids = category_ids(user_id, [category for category, _ in top])
+        for category, total in top:
+            budgets.append({'user_id': user_id, 'category_id': ids[category], 'month': month,
+                            'limit': round(total / months * rng.uniform(0.8, 1.3), -1) or 10.0})
+        for name in rng.sample(GOALS, 3):
+            target = round(rng.uniform(1_000, 20_000), -2)
+            goals.append({'user_id': user_id, 'name': name, 'target': target,
+                          'current': round(target * rng.random(), 2),
+                          'deadline': datetime(today.year + rng.randint(1, 3), rng.randint(1, 12), 1),
+                          'priority': rng.choice(['low', 'medium', 'high'])})
+        ids = category_ids(user_id, [category for _, category, _, _, _ in RECURRING])
+        rules = [{'user_id': user_id, 'type': kind, 'category_id': ids[category],
+                  'amount': round(median * rng.uniform(0.8, 1.2), 2), 'description': description,
+                  'frequency': frequency, 'start_date': next_month, 'materialized': 0, 'next_date': next_month}
+                 for kind, category, median, description, frequency in RECURRING]
+        if budgets:
+            db.session.execute(Budget.__table__.insert(), budgets)
+        db.session.execute(SavingsGoal.__table__.insert(), goals)
+        db.session.execute(RecurringRule.__table__.insert(), rules)
+        db.session.commit()
+    db.session.info.pop('shard', None)
+    return user_ids
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--scale', choices=SCALES, default='small')
+    parser.add_argument('--users', type=int, help='overrides --scale')
+    parser.add_argument('--transactions', type=int, help='per user; overrides --scale')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--today', type=date.fromisoformat, help='anchor date (YYYY-MM-DD), default today')
+    parser.add_argument('--database', required=True, help='SQLAlchemy URL of the database to fill')
+    args = parser.parse_args()
+
+    os.environ.setdefault('DATABASE_URL', args.database)  # app.py builds its default app on import
+    from app import create_app, db
+
+    users, transactions = SCALES[args.scale]
+    users, transactions = args.users or users, args.transactions or transactions
+    app = create_app({'SQLALCHEMY_DATABASE_URI': args.database})
+    with app.app_context():
+        generate(users, transactions, args.seed, args.today)
+        db.session.remove()
+    print(f'{users} users x {transactions} transactions written to {args.database}')
+
+
+if __name__ == '__main__':
+    main()
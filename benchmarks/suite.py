@@ -0,0 +1,438 @@
+"""Drive every route through the Flask test client on generated data and catch regressions.
+
+    python -m benchmarks.suite --scale small --output results.json
+    python -m benchmarks.suite --scale small --baseline benchmarks/baselines/small.json
+    python -m benchmarks.suite --scale small --save-baseline benchmarks/baselines/small.json
+
+A fresh on-disk database is filled by ``benchmarks.datagen``, then each scenario
+sends ``--requests`` requests (after ``--warmup`` discarded ones) spread over the
+generated users, from ``--concurrency`` threads. Cached GET routes run twice:
+warm, and "cold" with the response and column caches cleared before every
+request. Per scenario the suite reports p50/p95/p99 latency, throughput and the
+peak Python allocation of one traced request; the process's peak RSS goes in the
+metadata. Setup work (creating the rows a DELETE removes, building an import
+body) happens before the clock starts.
+
+With ``--baseline`` the run is compared against a stored result: a scenario
+regresses when p50/p95 latency or peak allocation grows (or, with several client
+threads, throughput drops) by more than ``--tolerance`` and by more than a small
+absolute floor, so sub-millisecond jitter on a busy machine is not a failure. Regressions or
+failed requests make the exit status 1. Baselines are machine-specific; record
+them with ``--save-baseline`` on the machine that runs the comparison.
+"""
+import argparse
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+import itertools
+import json
+import os
+import platform
+import random
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+from datetime import date, datetime, timedelta
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks import datagen  # noqa: E402
+
+Scenario = namedtuple('Scenario', ['name', 'endpoint', 'run', 'prepare', 'cold', 'max_requests'])
+
+REPORT_USERS = 5
+IMPORT_ROWS = 100
+# Metric: (direction that is worse, absolute change ignored as noise). Throughput is only checked
+# for concurrent runs; with one client thread it is just the inverse of the mean latency.
+CHECKS = {
+    'p50_ms': (1, 1.0),
+    'p95_ms': (1, 2.0),
+    'throughput_rps': (-1, 5.0),
+    'peak_alloc_kib': (1, 256),
+}
+SCALE_KEYS = ('users', 'transactions', 'seed', 'concurrency')
+
+
+def scenario(name, endpoint, run, prepare=None, cold=False, max_requests=None):
+    """`endpoint` is the view function's name, without the blueprint prefix"""
+    return Scenario(name, endpoint, run, prepare, cold, max_requests)
+
+
+class Bench:
+    """The app under test, its generated users and per-thread logged-in test clients"""
+
+    def __init__(self, app, user_ids, today):
+        self.app, self.user_ids, self.today = app, user_ids, today
+        self.reports = []
+        self._local = threading.local()
+        self._names = itertools.count()
+        self._versions = {}
+
+    def client(self, n=None):
+        """A test client logged in as user `n` (modulo the user count), reused within a thread;
+        with no `n`, a fresh anonymous one"""
+        if n is None:
+            return self.app.test_client()
+        clients = self._local.__dict__.setdefault('clients', {})
+        user_id = self.user_ids[n % len(self.user_ids)]
+        if user_id not in clients:
+            clients[user_id] = self.login(user_id)
+        return clients[user_id]
+
+    def login(self, user_id):
+        client = self.app.test_client()
+        with client.session_transaction() as sess:
+            sess['user_id'] = user_id
+        return client
+
+    def unique(self, prefix):
+        return f'{prefix}{next(self._names)}'
+
+    def created(self, n, path, body):
+        """POST `body` as user `n` and return the new row's id, for DELETE scenarios"""
+        response = self.client(n).post(path, json=body)
+        assert response.status_code == 201, response.get_data(as_text=True)
+        return response.get_json()['id']
+
+    def sync_version(self, n):
+        """User `n`'s current data version, as a synced client would send it"""
+        user_id = self.user_ids[n % len(self.user_ids)]
+        if user_id not in self._versions:
+            self._versions[user_id] = self.client(n).get('/api/sync?since=0').get_json()['version']
+        return self._versions[user_id]
+
+    def import_body(self, n):
+        lines = ['type,category,amount,description,date']
+        rows = datagen.user_transactions(random.Random(f'import:{n}'), IMPORT_ROWS, self.today, 365)
+        lines += [f'{kind},{category},{amount},{description},{when:%Y-%m-%d %H:%M}'
+                  for kind, category, amount, description, when in rows]
+        return '\n'.join(lines) + '\n'
+
+    def prepare_reports(self):
+        """Render one monthly report for each of the first few users, so status and downloads have a file"""
+        for n in range(min(REPORT_USERS, len(self.user_ids))):
+            job = self.client(n).post('/api/reports', json={'period': 'monthly'}).get_json()
+            deadline = time.time() + 120
+            while job['status'] == 'pending' and time.time() < deadline:
+                time.sleep(0.05)
+                job = self.client(n).get(job['status_url']).get_json()
+            if job['status'] != 'done':
+                raise RuntimeError(f'report for user {n} did not render: {job}')
+            self.reports.append(job)
+
+
+def first_frame(response):
+    next(iter(response.response))
+    return response
+
+
+def scenarios(bench):
+    """Every route, reads first so writes don't invalidate what the read scenarios measure"""
+    today = bench.today
+    since = (today - timedelta(days=90)).isoformat()
+    month = today.strftime('%Y-%m')
+    items = [
+        scenario('page: auth', 'index', lambda n, _: bench.client().get('/')),
+        scenario('page: dashboard', 'dashboard_page', lambda n, _: bench.client(n).get('/dashboard')),
+        scenario('auth: me', 'get_current_user', lambda n, _: bench.client(n).get('/api/auth/me')),
+        scenario('transactions: next page', 'get_transactions',
+                 lambda n, cursor: bench.client(n).get(f'/api/transactions?limit=50&cursor={cursor}'),
+                 prepare=lambda n: bench.client(n).get('/api/transactions?limit=50').get_json()['next_cursor']),
+        scenario('transactions: export csv', 'export_transactions',
+                 lambda n, _: bench.client(n).get(f'/api/transactions/export.csv?start_date={since}')),
+        scenario('events: first frame', 'stream_events',
+                 lambda n, _: first_frame(bench.client(n).get('/api/events', buffered=False))),
+        scenario('sync: up to date', 'get_sync', lambda n, version: bench.client(n).get(f'/api/sync?since={version}'),
+                 prepare=bench.sync_version),
+        scenario('events: stats', 'get_event_stats', lambda n, _: bench.client(n).get('/api/events/stats')),
+        scenario('cache: stats', 'get_cache_stats', lambda n, _: bench.client(n).get('/api/cache/stats')),
+        scenario('metrics', 'metrics', lambda n, _: bench.client().get('/metrics')),
+        scenario('reports: create (cached)', 'create_report',
+                 lambda n, _: bench.client(n % len(bench.reports)).post('/api/reports', json={'period': 'monthly'})),
+        scenario('reports: status', 'get_report_status',
+                 lambda n, _: bench.client(n % len(bench.reports)).get(
+                     bench.reports[n % len(bench.reports)]['status_url'])),
+        scenario('reports: download', 'download_report',
+                 lambda n, _: bench.client(n % len(bench.reports)).get(
+                     bench.reports[n % len(bench.reports)]['download_url'])),
+    ]
+    cached = [
+        ('transactions: first page', 'get_transactions', '/api/transactions?limit=50'),
+        ('transactions: columnar page', 'get_transactions', '/api/transactions?limit=500&format=columnar'),
+        ('transactions: filtered', 'get_transactions',
+         f'/api/transactions?type=expense&category=Food&start_date={since}'),
+        ('transactions: search', 'search_transactions', '/api/transactions/search?q=co'),
+        ('budgets', 'get_budgets', f'/api/budgets?month={month}'),
+        ('goals', 'get_goals', '/api/goals'),
+        ('recurring', 'get_recurring_rules', '/api/recurring'),
+        ('sync: snapshot', 'get_sync', '/api/sync?since=0'),
+        ('dashboard', 'get_dashboard', '/api/dashboard'),
+        ('analytics: monthly', 'get_monthly_analytics', '/api/analytics/monthly?months=12'),
+        ('analytics: bundle', 'get_analytics_bundle', '/api/analytics/bundle?months=12'),
+        ('analytics: insights', 'get_analytics_insights', '/api/analytics/insights?months=12&weeks=12'),
+    ]
+    for name, endpoint, path in cached:
+        for cold in (False, True):
+            items.append(scenario(name + (' [cold]' if cold else ''), endpoint,
+                                  lambda n, _, path=path: bench.client(n).get(path), cold=cold))
+
+    items += [
+        # Password hashing dominates these; a handful of requests is plenty
+        scenario('auth: signup', 'signup', lambda n, name: bench.client().post('/api/auth/signup', json={
+            'username': name, 'email': f'{name}@example.com', 'password': 'pw'}),
+            prepare=lambda n: bench.unique('signup'), max_requests=10),
+        scenario('auth: login', 'login', lambda n, _: bench.client().post('/api/auth/login', json={
+            'username': f'bench{n % len(bench.user_ids)}', 'password': datagen.PASSWORD}), max_requests=10),
+        scenario('auth: logout', 'logout', lambda n, client: client.post('/api/auth/logout'),
+                 prepare=lambda n: bench.login(bench.user_ids[n % len(bench.user_ids)])),
+        scenario('transactions: create', 'add_transaction', lambda n, _: bench.client(n).post(
+            '/api/transactions', json={'type': 'expense', 'category': 'Food', 'amount': 12.5,
+                                       'description': 'Lunch'})),
+        scenario('transactions: delete', 'delete_transaction',
+                 lambda n, tid: bench.client(n).delete(f'/api/transactions/{tid}'),
+                 prepare=lambda n: bench.created(n, '/api/transactions',
+                                                 {'type': 'expense', 'category': 'Other', 'amount': 1})),
+        scenario(f'transactions: import {IMPORT_ROWS} rows', 'import_transactions',
+                 lambda n, body: bench.client(n).post('/api/transactions/import', data=body,
+                                                      content_type='text/csv'),
+                 prepare=bench.import_body, max_requests=20),
+        scenario('budgets: create', 'add_budget', lambda n, _: bench.client(n).post(
+            '/api/budgets', json={'category': 'Travel', 'limit': 300, 'month': month})),
+        scenario('budgets: delete', 'delete_budget',
+                 lambda n, bid: bench.client(n).delete(f'/api/budgets/{bid}'),
+                 prepare=lambda n: bench.created(n, '/api/budgets', {'category': 'Gifts', 'limit': 50})),
+        scenario('goals: create', 'add_goal', lambda n, _: bench.client(n).post(
+            '/api/goals', json={'name': 'Bike', 'target': 800})),
+        scenario('goals: delete', 'delete_goal',
+                 lambda n, gid: bench.client(n).delete(f'/api/goals/{gid}'),
+                 prepare=lambda n: bench.created(n, '/api/goals', {'name': 'Temp', 'target': 10})),
+        scenario('recurring: create', 'add_recurring_rule', lambda n, _: bench.client(n).post(
+            '/api/recurring', json={'type': 'expense', 'category': 'Utilities', 'amount': 40,
+                                    'frequency': 'monthly', 'start_date': str(today + timedelta(days=30))})),
+        scenario('recurring: delete', 'delete_recurring_rule',
+                 lambda n, rid: bench.client(n).delete(f'/api/recurring/{rid}'),
+                 prepare=lambda n: bench.created(n, '/api/recurring', {
+                     'type': 'expense', 'category': 'Gym', 'amount': 30, 'frequency': 'weekly',
+                     'start_date': str(today + timedelta(days=30))})),
+    ]
+    return items
+
+
+def percentile(ordered, q):
+    """Linear-interpolated percentile of an already sorted list"""
+    if not ordered:
+        return 0.0
+    pos = (len(ordered) - 1) * q / 100
+    low = int(pos)
+    high = min(low + 1, len(ordered) - 1)
+    return ordered[low] + (ordered[high] - ordered[low]) * (pos - low)
+
+
+def clear_caches():
+    from app import column_store, response_cache
+    response_cache.clear()
+    column_store.clear()
+
+
+def measure(scenario, requests, warmup, concurrency):
+    count = requests if scenario.max_requests is None else min(requests, scenario.max_requests)
+    warmup = 0 if scenario.cold else min(warmup, count)
+    total = warmup + count + 1  # the last one is traced for memory
+    args = [scenario.prepare(n) if scenario.prepare else None for n in range(total)]
+
+    def one(n):
+        if scenario.cold:
+            clear_caches()
+        start = time.perf_counter()
+        response = scenario.run(n, args[n])
+        elapsed = time.perf_counter() - start
+        response.close()
+        return elapsed, response.status_code
+
+    for n in range(warmup):
+        one(n)
+    start = time.perf_counter()
+    if concurrency > 1:
+        with ThreadPoolExecutor(concurrency) as pool:
+            samples = list(pool.map(one, range(warmup, warmup + count)))
+    else:
+        samples = [one(n) for n in range(warmup, warmup + count)]
+    wall = time.perf_counter() - start
+
+    tracemalloc.start()
+    try:
+        one(total - 1)
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+    latencies = sorted(elapsed * 1000 for elapsed, _ in samples)
+    return {
+        'endpoint': scenario.endpoint,
+        'requests': count,
+        'errors': sum(1 for _, status in samples if status >= 400),
+        'p50_ms': round(percentile(latencies, 50), 3),
+        'p95_ms': round(percentile(latencies, 95), 3),
+        'p99_ms': round(percentile(latencies, 99), 3),
+        'mean_ms': round(sum(latencies) / len(latencies), 3),
+        'max_ms': round(latencies[-1], 3),
+        'throughput_rps': round(count / wall, 1),
+        'peak_alloc_kib': round(peak / 1024, 1),
+    }
+
+
+def run_suite(app, user_ids, today, requests=50, warmup=None, concurrency=1, only=()):
+    """Run every (or every `only`-matching) scenario; returns {'results': ..., 'uncovered': [...]}.
+
+    `warmup` defaults to one untimed request per user, so warm scenarios start with filled caches.
+    """
+    bench = Bench(app, user_ids, today)
+    warmup = len(user_ids) if warmup is None else warmup
+    items = [s for s in scenarios(bench) if not only or any(o in s.name for o in only)]
+    if any('report' in s.endpoint for s in items):
+        bench.prepare_reports()
+
+    results = {}
+    for item in items:
+        results[item.name] = measure(item, requests, warmup, concurrency)
+        if item.cold:
+            clear_caches()
+    endpoints = {rule.endpoint.rpartition('.')[2] for rule in app.url_map.iter_rules()} - {'static'}
+    uncovered = sorted(endpoints - {s.endpoint for s in scenarios(bench)})
+    return {'results': results, 'uncovered': uncovered}
+
+
+def peak_rss_mib():
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(peak / (1024 * 1024 if sys.platform == 'darwin' else 1024), 1)  # bytes on macOS, KiB on Linux
+
+
+def compare(current, baseline, tolerance=0.5):
+    """Regressions of `current` against `baseline` as human-readable lines; [] means none.
+
+    Raises ValueError when the two runs used different data scales or concurrency.
+    """
+    mismatched = [k for k in SCALE_KEYS if current['meta'].get(k) != baseline['meta'].get(k)]
+    if mismatched:
+        raise ValueError('baseline was recorded with different ' + ', '.join(
+            f"{k} ({baseline['meta'].get(k)} vs {current['meta'].get(k)})" for k in mismatched))
+
+    regressions = []
+    for name, now in current['results'].items():
+        then = baseline['results'].get(name)
+        if then is None:
+            continue
+        if now['errors'] > then['errors']:
+            regressions.append(f"{name}: {now['errors']} failed requests (baseline {then['errors']})")
+        for metric, (worse, floor) in CHECKS.items():
+            before, after = then.get(metric), now.get(metric)
+            if not before or after is None or (metric == 'throughput_rps' and current['meta']['concurrency'] == 1):
+                continue
+            change = (after - before) * worse
+            if change > floor and change > before * tolerance:
+                regressions.append(f'{name}: {metric} {before:g} -> {after:g} ({(after - before) / before:+.0%})')
+    return regressions
+
+
+def print_results(run):
+    print(f"{'scenario':38s} {'p50 ms':>9s} {'p95 ms':>9s} {'p99 ms':>9s} {'req/s':>9s} {'peak KiB':>9s} {'err':>4s}")
+    for name, r in run['results'].items():
+        print(f"{name:38s} {r['p50_ms']:9.2f} {r['p95_ms']:9.2f} {r['p99_ms']:9.2f} "
+              f"{r['throughput_rps']:9.1f} {r['peak_alloc_kib']:9.1f} {r['errors']:4d}")
+    meta = run['meta']
+    print(f"peak RSS {meta['max_rss_mib']} MiB; data generated in {meta['generate_seconds']}s")
+    if run['uncovered']:
+        print('[WARN] routes without a scenario: ' + ', '.join(run['uncovered']))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--scale', choices=datagen.SCALES, default='small')
+    parser.add_argument('--users', type=int, help='overrides --scale')
+    parser.add_argument('--transactions', type=int, help='per user; overrides --scale')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--today', type=date.fromisoformat, help='anchor date for generated data, default today')
+    parser.add_argument('--requests', type=int, default=50, help='timed requests per scenario')
+    parser.add_argument('--warmup', type=int, help='untimed requests before each warm scenario (default: one per user)')
+    parser.add_argument('--concurrency', type=int, default=1, help='client threads per scenario')
+    parser.add_argument('--only', action='append', default=[], help='run scenarios whose name contains this')
+    parser.add_argument('--output', help='write the results as JSON here')
+    parser.add_argument('--baseline', help='compare against this stored result')
+    parser.add_argument('--save-baseline', help='write the results here as the new baseline')
+    parser.add_argument('--tolerance', type=float, default=0.5, help='allowed relative slowdown (0.5 = 50%%)')
+    args = parser.parse_args()
+
+    os.environ.setdefault('DATABASE_URL', 'sqlite://')  # keep app.py's import-time default app off instance/
+    from app import create_app, db, report_jobs
+
+    users, transactions = datagen.SCALES[args.scale]
+    users, transactions = args.users or users, args.transactions or transactions
+    today = args.today or date.today()
+    with tempfile.TemporaryDirectory() as tmp:
+        app = create_app({
+            'SQLALCHEMY_DATABASE_URI': 'sqlite:///' + os.path.join(tmp, 'bench.db'),
+            'SECRET_KEY': 'bench',
+            'REPORTS_DIR': os.path.join(tmp, 'reports'),
+            'METRICS_ENABLED': True,
+        })
+        try:
+            with app.app_context():
+                start = time.perf_counter()
+                user_ids = datagen.generate(users, transactions, args.seed, today)
+                generate_seconds = round(time.perf_counter() - start, 2)
+                db.session.remove()
+            print(f'{users} users x {transactions} transactions, {args.requests} requests per scenario, '
+                  f'concurrency {args.concurrency}')
+            run = run_suite(app, user_ids, today, args.requests, args.warmup, args.concurrency, args.only)
+        finally:
+            report_jobs.shutdown()
+            with app.app_context():
+                for engine in db.engines.values():
+                    engine.dispose()
+
+    run['meta'] = {
+        'scale': args.scale, 'users': users, 'transactions': transactions, 'seed': args.seed,
+        'today': today.isoformat(), 'requests': args.requests, 'concurrency': args.concurrency,
+        'generate_seconds': generate_seconds, 'max_rss_mib': peak_rss_mib(),
+        'python': platform.python_version(), 'sqlite': sqlite3.sqlite_version, 'platform': platform.platform(),
+        'recorded_at': datetime.now().isoformat(timespec='seconds'),
+    }
+    print_results(run)
+
+    for path in filter(None, (args.output, args.save_baseline)):
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(run, f, indent=2, sort_keys=True)
+            f.write('\n')
+        print(f'[OK] results written to {path}')
+
+    failed = sum(r['errors'] for r in run['results'].values())
+    if failed:
+        print(f'[ERROR] {failed} requests failed')
+    regressions = []
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as f:
+            baseline = json.load(f)
+        try:
+            regressions = compare(run, baseline, args.tolerance)
+        except ValueError as e:
+            print(f'[ERROR] {e}')
+            return 2
+        for line in regressions:
+            print(f'[REGRESSION] {line}')
+        if not regressions:
+            print(f'[OK] no regressions against {args.baseline} (tolerance {args.tolerance:.0%})')
+    return 1 if failed or regressions else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
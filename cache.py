@@ -0,0 +1,89 @@
+"""In-process, size-bounded LRU cache for per-user API responses.
+
+Entries are keyed by (user_id, request path + query string) and remember the
+user's data version they were rendered at. A write bumps the version, which
+turns every older entry for that user into a miss without having to find it.
+Compressed copies of a body are made once per entry and count against the
+same byte budget.
+"""
+from collections import OrderedDict, namedtuple
+import hashlib
+import threading
+
+CachedResponse = namedtuple('CachedResponse', ['version', 'body', 'mimetype', 'etag', 'variants'])
+
+
+def entry_size(entry):
+    return len(entry.body) + sum(len(data) for data in entry.variants.values())
+
+
+class ResponseCache:
+    def __init__(self, max_bytes=64 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, version):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry.version != version:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry
+
+    def put(self, key, version, body, mimetype):
+        entry = CachedResponse(version, body, mimetype, hashlib.sha1(body).hexdigest(), {})
+        if len(body) > self.max_bytes:
+            return entry
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self.size -= entry_size(old)
+            self._entries[key] = entry
+            self.size += len(body)
+            self._evict()
+        return entry
+
+    def _evict(self):
+        while self.size > self.max_bytes and self._entries:
+            _, evicted = self._entries.popitem(last=False)
+            self.size -= entry_size(evicted)
+            self.evictions += 1
+
+    def variant(self, key, entry, encoding, encode):
+        """`entry.body` run through `encode`, computed on first use and kept with the entry"""
+        data = entry.variants.get(encoding)
+        if data is not None:
+            return data
+        data = encode(entry.body)
+        with self._lock:
+            if encoding not in entry.variants:
+                entry.variants[encoding] = data
+                if self._entries.get(key) is entry:
+                    self.size += len(data)
+                    self._evict()
+        return data
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.size = 0
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'entries': len(self._entries),
+                'bytes': self.size,
+                'max_bytes': self.max_bytes,
+                'hit_rate': round(self.hits / lookups, 3) if lookups else 0
+            }
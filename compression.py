@@ -0,0 +1,59 @@
+"""Content negotiation and encoders for gzip / Brotli response compression.
+
+Brotli is optional: without the ``brotli`` package only gzip is offered.
+"""
+import gzip
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+COMPRESSIBLE_MIMETYPES = frozenset([
+    'application/json', 'text/html', 'text/css', 'text/javascript', 'application/javascript',
+    'text/plain', 'text/csv', 'image/svg+xml',
+])
+# Suffix of precompressed files written by the asset build, per encoding
+FILE_SUFFIXES = {'br': '.br', 'gzip': '.gz'}
+
+
+def available_encodings():
+    """Encodings this process can produce, best first"""
+    return ('br', 'gzip') if brotli is not None else ('gzip',)
+
+
+def negotiate(accept_encoding, offered=None):
+    """Pick an encoding from an Accept-Encoding header, or None for identity.
+
+    Among codings the client accepts with q > 0, the first of `offered`
+    (default: available_encodings()) wins; the client's q-values only rule out
+    codings, since every browser that sends ``br`` prefers it anyway.
+    """
+    if not accept_encoding:
+        return None
+    accepted = {}
+    for part in accept_encoding.split(','):
+        name, _, params = part.strip().partition(';')
+        q = 1.0
+        params = params.strip()
+        if params.startswith('q='):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        accepted[name.strip().lower()] = q
+    wildcard = accepted.get('*', 0)
+    for encoding in (offered if offered is not None else available_encodings()):
+        if accepted.get(encoding, wildcard) > 0:
+            return encoding
+    return None
+
+
+def compress(data, encoding, level=None):
+    """Encode bytes; `level` is gzip's 1-9 or Brotli's quality 0-11"""
+    if encoding == 'gzip':
+        # mtime=0 keeps the output byte-identical for identical input
+        return gzip.compress(data, compresslevel=6 if level is None else level, mtime=0)
+    if encoding == 'br':
+        return brotli.compress(data, quality=4 if level is None else level)
+    raise ValueError(f'unsupported encoding: {encoding}')
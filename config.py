@@ -0,0 +1,70 @@
+"""Default settings for create_app(), read from the environment.
+
+Override them with a Python settings file named by FINANCE_DASHBOARD_SETTINGS,
+or by passing a mapping (or an object with upper-case attributes) to
+``create_app(config)``. Later sources win.
+"""
+import os
+
+
+class Config:
+    SQLALCHEMY_DATABASE_URI = os.environ.get('DATABASE_URL', 'sqlite:///finance.db')
+    SQLALCHEMY_TRACK_MODIFICATIONS = False
+    # Run pending migrations while the app is created; turn off if deploys run `flask upgrade-db` instead
+    AUTO_MIGRATE = os.environ.get('AUTO_MIGRATE', '1') not in ('0', 'false', 'no')
+
+    # Sessions must be signed with the same key in every worker. Without SECRET_KEY one is generated
+    # once and kept in SECRET_KEY_FILE (default: instance/secret_key).
+    SECRET_KEY = os.environ.get('SECRET_KEY')
+    SECRET_KEY_FILE = os.environ.get('SECRET_KEY_FILE')
+    PERMANENT_SESSION_LIFETIME = 24 * 60 * 60  # 24 hours
+
+    # Read-only analytics queries go to their own pool; point this at a replica or leave it on the main file
+    ANALYTICS_DATABASE_URL = os.environ.get('ANALYTICS_DATABASE_URL')
+    DB_POOL_SIZE = int(os.environ.get('DB_POOL_SIZE', 10))
+    ANALYTICS_POOL_SIZE = int(os.environ.get('ANALYTICS_POOL_SIZE', 10))
+    DB_MAX_OVERFLOW = int(os.environ.get('DB_MAX_OVERFLOW', 10))
+    DB_POOL_TIMEOUT = int(os.environ.get('DB_POOL_TIMEOUT', 30))
+    SQLITE_JOURNAL_MODE = os.environ.get('SQLITE_JOURNAL_MODE', 'WAL')
+    SQLITE_SYNCHRONOUS = os.environ.get('SQLITE_SYNCHRONOUS', 'NORMAL')
+    SQLITE_BUSY_TIMEOUT = os.environ.get('SQLITE_BUSY_TIMEOUT', 5000)  # ms
+    SQLITE_CACHE_SIZE = os.environ.get('SQLITE_CACHE_SIZE', -64000)  # negative = KiB
+    SQLITE_MMAP_SIZE = os.environ.get('SQLITE_MMAP_SIZE', 256 * 1024 * 1024)
+    SQLITE_TEMP_STORE = os.environ.get('SQLITE_TEMP_STORE', 'MEMORY')
+
+    # Sharding: with SHARD_COUNT > 0 user data is spread over that many files by user id (see sharding.py).
+    # Accounts stay in DATABASE_URL. After changing the count, run `flask rebalance-shards`.
+    SHARD_COUNT = int(os.environ.get('SHARD_COUNT', 0))
+    SHARD_DATABASE_URL = os.environ.get('SHARD_DATABASE_URL', 'sqlite:///shard-{shard}.db')
+
+    # Write-behind: one writer thread commits the writes of many requests per transaction (group commit).
+    # A batch closes at WRITE_BATCH_SIZE operations or WRITE_BATCH_DELAY ms after its first one.
+    WRITE_BEHIND = os.environ.get('WRITE_BEHIND', '0') not in ('0', 'false', 'no')
+    WRITE_BATCH_SIZE = int(os.environ.get('WRITE_BATCH_SIZE', 64))
+    WRITE_BATCH_DELAY = float(os.environ.get('WRITE_BATCH_DELAY', 2))
+    # Seconds a write request waits for its batch to commit before giving up with a 503
+    WRITE_TIMEOUT = float(os.environ.get('WRITE_TIMEOUT', 30))
+
+    # Recurring transactions: every RECURRING_INTERVAL seconds each process writes the occurrences that
+    # have fallen due. 0 leaves it to `flask materialize-recurring`, run from cron.
+    RECURRING_INTERVAL = float(os.environ.get('RECURRING_INTERVAL', 0))
+
+    RESPONSE_CACHE_MAX_BYTES = int(os.environ.get('RESPONSE_CACHE_MAX_BYTES', 64 * 1024 * 1024))
+    REPORTS_DIR = os.environ.get('REPORTS_DIR')  # default: instance/reports
+    REPORT_WORKERS = int(os.environ.get('REPORT_WORKERS', 2))
+    ANALYTICS_CACHE_USERS = int(os.environ.get('ANALYTICS_CACHE_USERS', 256))
+
+    # Request latency / SQL counters and the /metrics endpoint; off removes every hook
+    METRICS_ENABLED = os.environ.get('METRICS_ENABLED', '1') not in ('0', 'false', 'no')
+
+    # gzip/Brotli for JSON, HTML, CSS and JS bodies of at least COMPRESS_MIN_SIZE bytes (Brotli needs `brotli`)
+    COMPRESS_ENABLED = os.environ.get('COMPRESS_ENABLED', '1') not in ('0', 'false', 'no')
+    COMPRESS_MIN_SIZE = int(os.environ.get('COMPRESS_MIN_SIZE', 1024))
+    COMPRESS_GZIP_LEVEL = int(os.environ.get('COMPRESS_GZIP_LEVEL', 6))
+    COMPRESS_BROTLI_QUALITY = int(os.environ.get('COMPRESS_BROTLI_QUALITY', 4))
+    # Cache lifetime of fingerprinted files from `flask build-assets`; their names change with their content
+    STATIC_IMMUTABLE_MAX_AGE = int(os.environ.get('STATIC_IMMUTABLE_MAX_AGE', 365 * 24 * 60 * 60))
+
+    # Live updates: events buffered per open stream before it is dropped, and keep-alive interval (seconds)
+    EVENTS_QUEUE_SIZE = int(os.environ.get('EVENTS_QUEUE_SIZE', 256))
+    EVENTS_HEARTBEAT = float(os.environ.get('EVENTS_HEARTBEAT', 15))
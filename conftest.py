@@ -0,0 +1,40 @@
+import os
+
+# Keep the test run away from the real instance/finance.db; app.py reads this at import time
+os.environ.setdefault('DATABASE_URL', 'sqlite://')
+os.environ.setdefault('SECRET_KEY', 'test-secret')
+
+import pytest
+
+
+@pytest.fixture
+def ctx():
+    from app import app, column_store, db, response_cache
+    response_cache.clear()
+    column_store.clear()
+    with app.app_context():
+        # Only the models' own bind; the read-only 'analytics' bind has no tables
+        db.drop_all(bind_key=None)
+        db.create_all(bind_key=None)
+        yield
+        db.session.remove()
+
+
+@pytest.fixture
+def make_user(ctx):
+    from app import db, User
+
+    def make(name):
+        user = User(username=name, email=f'{name}@example.com', password='x')
+        db.session.add(user)
+        db.session.commit()
+        return user
+    return make
+
+
+@pytest.fixture
+def client(ctx):
+    from app import app
+    client = app.test_client()
+    client.post('/api/auth/signup', json={'username': 'tester', 'email': 'tester@example.com', 'password': 'pw'})
+    return client
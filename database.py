@@ -0,0 +1,69 @@
+"""SQLite engine tuning: connection pool options and per-connection pragmas.
+
+Pragmas are applied from a ``connect`` event, so every pooled connection gets
+them, including connections opened by worker threads. ``journal_mode=WAL`` lets
+readers run alongside the single writer, and ``busy_timeout`` makes a second
+writer wait for the lock instead of failing with "database is locked".
+"""
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
+
+# Config key -> pragma name. A value of None or '' leaves SQLite's default in place.
+PRAGMA_SETTINGS = (
+    ('SQLITE_JOURNAL_MODE', 'journal_mode'),
+    ('SQLITE_SYNCHRONOUS', 'synchronous'),
+    ('SQLITE_BUSY_TIMEOUT', 'busy_timeout'),
+    ('SQLITE_CACHE_SIZE', 'cache_size'),
+    ('SQLITE_MMAP_SIZE', 'mmap_size'),
+    ('SQLITE_TEMP_STORE', 'temp_store'),
+)
+
+
+def is_sqlite(uri):
+    return make_url(uri).get_backend_name() == 'sqlite'
+
+
+def is_memory_sqlite(uri):
+    url = make_url(uri)
+    return url.get_backend_name() == 'sqlite' and url.database in (None, '', ':memory:')
+
+
+def sqlite_pragmas(config, read_only=False):
+    pragmas = [(name, config.get(key)) for key, name in PRAGMA_SETTINGS if config.get(key) not in (None, '')]
+    if read_only:
+        pragmas.append(('query_only', 'ON'))
+    return pragmas
+
+
+def engine_options(uri, config, pool_size_key='DB_POOL_SIZE'):
+    """SQLAlchemy create_engine() options for `uri` built from the app config"""
+    if is_memory_sqlite(uri):
+        return {}  # Flask-SQLAlchemy pins in-memory databases to a single StaticPool connection
+    options = {
+        'pool_size': config[pool_size_key],
+        'max_overflow': config['DB_MAX_OVERFLOW'],
+        'pool_timeout': config['DB_POOL_TIMEOUT'],
+    }
+    if is_sqlite(uri) and config.get('SQLITE_BUSY_TIMEOUT') not in (None, ''):
+        # pysqlite's own busy handler; the busy_timeout pragma sets the same thing in milliseconds
+        options['connect_args'] = {'timeout': int(config['SQLITE_BUSY_TIMEOUT']) / 1000}
+    return options
+
+
+def install_sqlite_pragmas(engine, pragmas):
+    """Run `PRAGMA name=value` on every new DBAPI connection of `engine`"""
+    if engine.dialect.name != 'sqlite' or not pragmas:
+        return
+
+    @event.listens_for(engine, 'connect')
+    def set_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            for name, value in pragmas:
+                cursor.execute(f'PRAGMA {name}={value}')
+        finally:
+            cursor.close()
+
+
+def current_pragmas(connection, names):
+    return {name: connection.exec_driver_sql(f'PRAGMA {name}').scalar() for name in names}
@@ -0,0 +1,101 @@
+"""In-process publish/subscribe for the per-user Server-Sent Events stream.
+
+Every open ``/api/events`` stream owns a bounded queue. Publishing never
+blocks: if a subscriber's queue is full it is dropped on the spot, and its
+stream ends with a ``resync`` event so the browser reloads everything and
+reconnects. A slow tab therefore costs at most ``max_queue`` events of memory
+and never holds up the request that committed the write.
+"""
+from collections import namedtuple
+import itertools
+import json
+import queue
+import threading
+
+Event = namedtuple('Event', ['id', 'type', 'data'])
+
+
+def format_sse(event=None, data=None, event_id=None, retry=None):
+    """Encode one SSE frame; with no event or data this is a keep-alive comment"""
+    lines = []
+    if retry is not None:
+        lines.append(f'retry: {int(retry)}')
+    if event_id is not None:
+        lines.append(f'id: {event_id}')
+    if event is not None:
+        lines.append(f'event: {event}')
+    if data is not None:
+        lines.append('data: ' + json.dumps(data, separators=(',', ':')))
+    if not lines:
+        lines.append(': keep-alive')
+    return '\n'.join(lines) + '\n\n'
+
+
+class Subscription:
+    __slots__ = ('user_id', 'queue', 'dropped')
+
+    def __init__(self, user_id, max_queue):
+        self.user_id = user_id
+        self.queue = queue.Queue(max_queue)
+        self.dropped = False
+
+    def get(self, timeout):
+        """Next event, or None after `timeout` seconds without one"""
+        try:
+            return self.queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+
+class EventBroker:
+    def __init__(self, max_queue=256):
+        self.max_queue = max_queue
+        self._subscribers = {}
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+        self.dropped_total = 0
+
+    def subscribe(self, user_id):
+        sub = Subscription(user_id, self.max_queue)
+        with self._lock:
+            self._subscribers.setdefault(user_id, set()).add(sub)
+        return sub
+
+    def unsubscribe(self, sub):
+        with self._lock:
+            subs = self._subscribers.get(sub.user_id)
+            if subs is not None:
+                subs.discard(sub)
+                if not subs:
+                    del self._subscribers[sub.user_id]
+
+    def has_subscribers(self, user_id):
+        return user_id in self._subscribers
+
+    def publish(self, user_id, event_type, data):
+        """Queue an event for every stream of `user_id`; returns how many received it"""
+        with self._lock:
+            subs = list(self._subscribers.get(user_id, ()))
+        if not subs:
+            return 0
+        event = Event(next(self._ids), event_type, data)
+        delivered = 0
+        for sub in subs:
+            try:
+                sub.queue.put_nowait(event)
+                delivered += 1
+            except queue.Full:
+                sub.dropped = True
+                self.unsubscribe(sub)
+                with self._lock:
+                    self.dropped_total += 1
+        return delivered
+
+    def stats(self):
+        with self._lock:
+            return {
+                'users': len(self._subscribers),
+                'subscribers': sum(len(s) for s in self._subscribers.values()),
+                'dropped': self.dropped_total,
+                'max_queue': self.max_queue,
+            }
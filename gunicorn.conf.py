@@ -0,0 +1,15 @@
+"""Gunicorn settings, picked up automatically by `gunicorn wsgi:app` from this directory.
+
+Workers are separate processes (one per core by default) and each serves
+requests on a small thread pool, so slow I/O in one request does not hold up
+the rest of its worker.
+"""
+import multiprocessing
+import os
+
+bind = os.environ.get('BIND', '0.0.0.0:8000')
+workers = int(os.environ.get('WEB_CONCURRENCY', multiprocessing.cpu_count()))
+worker_class = 'gthread'
+threads = int(os.environ.get('WEB_THREADS', 4))
+timeout = int(os.environ.get('WEB_TIMEOUT', 60))
+accesslog = os.environ.get('ACCESS_LOG')  # '-' for stdout
@@ -0,0 +1,127 @@
+"""Streaming parsers for bulk transaction uploads (CSV and JSON Lines).
+
+Both parsers read a text stream line by line and yield ``(line_number, row,
+error)`` tuples, where exactly one of ``row`` / ``error`` is set. Nothing
+here touches the database; batching and inserts happen in app.py.
+"""
+import csv
+import json
+import math
+from datetime import datetime
+
+TRANSACTION_TYPES = ('income', 'expense')
+REQUIRED_FIELDS = ('type', 'category', 'amount')
+
+
+class ImportFormatError(ValueError):
+    """The upload as a whole cannot be parsed (bad header, unknown format)"""
+
+
+def text_field(value, name):
+    """`value` as a string ('' for missing); JSON Lines rows can hold numbers, lists or objects"""
+    if value is None:
+        return ''
+    if not isinstance(value, str):
+        raise ValueError(f'{name} must be a string')
+    return value
+
+
+def validate_fields(kind, category, amount, description, date, default_date):
+    """Turn one raw record into a (type, category, amount, description, date) tuple, or raise ValueError"""
+    kind = text_field(kind, 'type').strip().lower()
+    if kind not in TRANSACTION_TYPES:
+        raise ValueError("type must be 'income' or 'expense'")
+
+    category = text_field(category, 'category').strip()
+    if not category:
+        raise ValueError('category is required')
+    if len(category) > 100:
+        raise ValueError('category is longer than 100 characters')
+
+    try:
+        amount = float(amount)
+    except (TypeError, ValueError):
+        raise ValueError('amount must be a number')
+    if not math.isfinite(amount):
+        raise ValueError('amount must be finite')
+
+    description = text_field(description, 'description')
+    if len(description) > 500:
+        raise ValueError('description is longer than 500 characters')
+
+    if date:
+        try:
+            date = datetime.fromisoformat(str(date).strip())
+        except ValueError:
+            raise ValueError('date must be an ISO date, e.g. 2025-01-31 or 2025-01-31 14:30')
+        if date.tzinfo is not None:
+            # Dates are stored as naive local wall-clock time; an offset would end up in the text
+            date = date.astimezone().replace(tzinfo=None)
+    else:
+        date = default_date
+
+    return kind, category, amount, description, date
+
+
+def validate_row(raw, default_date):
+    return validate_fields(raw.get('type'), raw.get('category'), raw.get('amount'),
+                           raw.get('description'), raw.get('date'), default_date)
+
+
+def parse_csv(stream, default_date):
+    # csv.reader plus column positions avoids DictReader building a dict per row
+    reader = csv.reader(stream)
+    header = [name.strip().lower() for name in next(reader, [])]
+    missing = [f for f in REQUIRED_FIELDS if f not in header]
+    if missing:
+        raise ImportFormatError(f"CSV header is missing: {', '.join(missing)}")
+    columns = [header.index(f) if f in header else None for f in ('type', 'category', 'amount', 'description', 'date')]
+    width = len(header)
+
+    for record in reader:
+        if not record:
+            continue
+        if len(record) < width:
+            record += [''] * (width - len(record))
+        try:
+            fields = [record[i] if i is not None else None for i in columns]
+            yield reader.line_num, validate_fields(*fields, default_date), None
+        except ValueError as e:
+            yield reader.line_num, None, str(e)
+
+
+def parse_jsonl(stream, default_date):
+    for line_number, line in enumerate(stream, 1):
+        if not line.strip():
+            continue
+        try:
+            raw = json.loads(line)
+            if not isinstance(raw, dict):
+                raise ValueError('each line must be a JSON object')
+            yield line_number, validate_row(raw, default_date), None
+        except ValueError as e:
+            yield line_number, None, str(e)
+
+
+PARSERS = {'csv': parse_csv, 'jsonl': parse_jsonl}
+
+
+def detect_format(explicit, content_type, filename=None):
+    """Pick a parser from ?format=, the upload's file extension or its Content-Type"""
+    if explicit:
+        fmt = explicit.lower()
+    elif filename and '.' in filename:
+        fmt = filename.rsplit('.', 1)[1].lower()
+    else:
+        content_type = (content_type or '').split(';')[0].strip().lower()
+        fmt = {
+            'text/csv': 'csv',
+            'application/csv': 'csv',
+            'application/x-ndjson': 'jsonl',
+            'application/jsonl': 'jsonl',
+            'application/x-jsonlines': 'jsonl',
+        }.get(content_type)
+    fmt = {'ndjson': 'jsonl', 'jsonlines': 'jsonl'}.get(fmt, fmt)
+    if fmt not in PARSERS:
+        raise ImportFormatError('Unsupported import format; send CSV or JSON Lines')
+    return fmt
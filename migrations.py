@@ -0,0 +1,250 @@
+"""Versioned, non-destructive schema migrations for the SQLite database.
+
+The applied version is stored in SQLite's ``PRAGMA user_version``. A brand-new
+database is built straight from the models with ``create_all()`` and stamped
+with the latest version; an existing database runs every migration newer than
+its stamp, in order, inside one transaction. That transaction holds SQLite's
+write lock from the start, so several worker processes can boot against the
+same file at once.
+"""
+from sqlalchemy import inspect
+
+import search
+
+MIGRATIONS = []
+
+# (index name, table, columns) as created by migration 1; migration 5 moves the category ones to category_id
+USER_INDEXES = [
+    ('ix_transaction_user_date', 'transaction', ('user_id', 'date')),
+    ('ix_transaction_user_type_category_date', 'transaction', ('user_id', 'type', 'category', 'date')),
+    ('ix_budget_user_month_category', 'budget', ('user_id', 'month', 'category')),
+    ('ix_savings_goal_user', 'savings_goal', ('user_id',)),
+]
+
+# Indexes of the transaction and budget tables as rebuilt by migration 5
+REBUILT_INDEXES = [
+    ('ix_transaction_user_date', 'transaction', ('user_id', 'date')),
+    ('ix_transaction_user_type_category_date', 'transaction', ('user_id', 'type', 'category_id', 'date')),
+    ('ix_budget_user_month_category', 'budget', ('user_id', 'month', 'category_id')),
+]
+
+
+def migration(version, description):
+    """Register a migration function that receives a SQLAlchemy connection"""
+    def decorator(fn):
+        MIGRATIONS.append((version, description, fn))
+        MIGRATIONS.sort(key=lambda m: m[0])
+        return fn
+    return decorator
+
+
+def create_index_sql(name, table, columns):
+    cols = ', '.join(columns)
+    return f'CREATE INDEX IF NOT EXISTS {name} ON "{table}" ({cols})'
+
+
+def head_version():
+    return MIGRATIONS[-1][0] if MIGRATIONS else 0
+
+
+def current_version(conn):
+    return conn.exec_driver_sql('PRAGMA user_version').scalar()
+
+
+def stamp(conn, version):
+    conn.exec_driver_sql(f'PRAGMA user_version = {int(version)}')
+
+
+def apply_pending(conn):
+    """Run every migration newer than the database's stamp on `conn`; return the versions applied"""
+    applied = []
+    version = current_version(conn)
+    for target, description, fn in MIGRATIONS:
+        if target <= version:
+            continue
+        print(f"[MIGRATE] {target}: {description}")
+        fn(conn)
+        stamp(conn, target)
+        applied.append(target)
+    return applied
+
+
+def lock_for_migration(conn):
+    # Take SQLite's write lock up front so concurrently starting workers run the
+    # check-and-migrate one at a time; the later ones then find nothing to do
+    if conn.dialect.name == 'sqlite':
+        conn.exec_driver_sql('BEGIN IMMEDIATE')
+
+
+def upgrade(engine):
+    """Apply pending migrations and return the list of versions applied"""
+    with engine.connect() as conn:
+        lock_for_migration(conn)
+        applied = apply_pending(conn)
+        conn.commit()
+    return applied
+
+
+def init_db(db, engine=None):
+    """Create a fresh schema, or bring an existing one up to date without dropping data"""
+    with (engine or db.engine).connect() as conn:
+        lock_for_migration(conn)
+        if not inspect(conn).has_table('user'):
+            db.metadata.create_all(conn)
+            stamp(conn, head_version())
+            conn.commit()
+            return []
+        applied = apply_pending(conn)
+        # Tables introduced by models but not referenced by any migration
+        db.metadata.create_all(conn)
+        conn.commit()
+    return applied
+
+
+# ==================== Migrations ====================
+@migration(1, 'Composite indexes on user_id/date for transactions, budgets and goals')
+def add_user_indexes(conn):
+    for name, table, columns in USER_INDEXES:
+        conn.exec_driver_sql(create_index_sql(name, table, columns))
+
+
+@migration(2, 'Monthly rollup table, backfilled from existing transactions')
+def add_monthly_rollups(conn):
+    conn.exec_driver_sql("""
+        CREATE TABLE IF NOT EXISTS monthly_rollup (
+            user_id INTEGER NOT NULL REFERENCES user (id),
+            month VARCHAR(7) NOT NULL,
+            type VARCHAR(50) NOT NULL,
+            category VARCHAR(100) NOT NULL,
+            total FLOAT NOT NULL,
+            count INTEGER NOT NULL,
+            PRIMARY KEY (user_id, month, type, category)
+        )
+    """)
+    conn.exec_driver_sql("""
+        INSERT OR REPLACE INTO monthly_rollup (user_id, month, type, category, total, count)
+        SELECT user_id, strftime('%Y-%m', date), type, category, SUM(amount), COUNT(*)
+        FROM "transaction" GROUP BY 1, 2, 3, 4
+    """)
+
+
+@migration(3, 'Per-user data_version counter for response cache invalidation')
+def add_user_data_version(conn):
+    conn.exec_driver_sql('ALTER TABLE user ADD COLUMN data_version INTEGER NOT NULL DEFAULT 0')
+
+
+@migration(4, 'Full-text search index over transaction descriptions, backfilled')
+def add_transaction_search(conn):
+    conn.exec_driver_sql(search.CREATE_SQL)
+    search.rebuild(conn)
+
+
+@migration(5, 'Per-user category table; transactions, budgets and rollups refer to categories by id')
+def add_categories(conn):
+    conn.exec_driver_sql("""
+        CREATE TABLE category (
+            id INTEGER NOT NULL PRIMARY KEY,
+            user_id INTEGER NOT NULL REFERENCES user (id),
+            name VARCHAR(100) NOT NULL,
+            CONSTRAINT uq_category_user_name UNIQUE (user_id, name)
+        )
+    """)
+    conn.exec_driver_sql("""
+        INSERT INTO category (user_id, name)
+        SELECT user_id, COALESCE(category, '') FROM "transaction"
+        UNION SELECT user_id, COALESCE(category, '') FROM budget
+        ORDER BY 1, 2
+    """)
+    # SQLite cannot change a column in place: copy each table into its new shape, then swap the names.
+    # Transaction ids are kept, so the search index stays valid.
+    conn.exec_driver_sql("""
+        CREATE TABLE transaction_new (
+            id INTEGER NOT NULL PRIMARY KEY,
+            user_id INTEGER NOT NULL REFERENCES user (id),
+            type VARCHAR(50) NOT NULL,
+            category_id INTEGER NOT NULL REFERENCES category (id),
+            amount FLOAT NOT NULL,
+            description VARCHAR(500),
+            date DATETIME NOT NULL
+        )
+    """)
+    conn.exec_driver_sql("""
+        INSERT INTO transaction_new (id, user_id, type, category_id, amount, description, date)
+        SELECT t.id, t.user_id, t.type, c.id, t.amount, t.description, t.date
+        FROM "transaction" t JOIN category c ON c.user_id = t.user_id AND c.name = COALESCE(t.category, '')
+    """)
+    conn.exec_driver_sql("""
+        CREATE TABLE budget_new (
+            id INTEGER NOT NULL PRIMARY KEY,
+            user_id INTEGER NOT NULL REFERENCES user (id),
+            category_id INTEGER NOT NULL REFERENCES category (id),
+            "limit" FLOAT NOT NULL,
+            month VARCHAR(7) NOT NULL
+        )
+    """)
+    conn.exec_driver_sql("""
+        INSERT INTO budget_new (id, user_id, category_id, "limit", month)
+        SELECT b.id, b.user_id, c.id, b."limit", b.month
+        FROM budget b JOIN category c ON c.user_id = b.user_id AND c.name = COALESCE(b.category, '')
+    """)
+    for table in ('transaction', 'budget'):
+        conn.exec_driver_sql(f'DROP TABLE "{table}"')
+        conn.exec_driver_sql(f'ALTER TABLE {table}_new RENAME TO "{table}"')
+    for name, table, columns in REBUILT_INDEXES:
+        conn.exec_driver_sql(create_index_sql(name, table, columns))
+
+    conn.exec_driver_sql('DROP TABLE monthly_rollup')
+    conn.exec_driver_sql("""
+        CREATE TABLE monthly_rollup (
+            user_id INTEGER NOT NULL REFERENCES user (id),
+            month VARCHAR(7) NOT NULL,
+            type VARCHAR(50) NOT NULL,
+            category_id INTEGER NOT NULL REFERENCES category (id),
+            total FLOAT NOT NULL,
+            count INTEGER NOT NULL,
+            PRIMARY KEY (user_id, month, type, category_id)
+        )
+    """)
+    conn.exec_driver_sql("""
+        INSERT INTO monthly_rollup (user_id, month, type, category_id, total, count)
+        SELECT user_id, strftime('%Y-%m', date), type, category_id, SUM(amount), COUNT(*)
+        FROM "transaction" GROUP BY 1, 2, 3, 4
+    """)
+
+
+@migration(6, 'Per-user change log for delta sync')
+def add_change_log(conn):
+    conn.exec_driver_sql("""
+        CREATE TABLE IF NOT EXISTS change_log (
+            id INTEGER NOT NULL PRIMARY KEY,
+            user_id INTEGER NOT NULL REFERENCES user (id),
+            version INTEGER NOT NULL,
+            kind VARCHAR(20) NOT NULL,
+            first_id INTEGER,
+            last_id INTEGER,
+            deleted BOOLEAN NOT NULL,
+            created_at DATETIME NOT NULL
+        )
+    """)
+    conn.exec_driver_sql(create_index_sql('ix_change_log_user_version', 'change_log', ('user_id', 'version')))
+
+
+@migration(7, 'Recurring transaction rules')
+def add_recurring_rules(conn):
+    conn.exec_driver_sql("""
+        CREATE TABLE IF NOT EXISTS recurring_rule (
+            id INTEGER NOT NULL PRIMARY KEY,
+            user_id INTEGER NOT NULL REFERENCES user (id),
+            type VARCHAR(50) NOT NULL,
+            category_id INTEGER NOT NULL REFERENCES category (id),
+            amount FLOAT NOT NULL,
+            description VARCHAR(500),
+            frequency VARCHAR(10) NOT NULL,
+            start_date DATETIME NOT NULL,
+            end_date DATETIME,
+            materialized INTEGER NOT NULL,
+            next_date DATETIME
+        )
+    """)
+    conn.exec_driver_sql(create_index_sql('ix_recurring_rule_user', 'recurring_rule', ('user_id',)))
+    conn.exec_driver_sql(create_index_sql('ix_recurring_rule_next_date', 'recurring_rule', ('next_date',)))
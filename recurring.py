@@ -0,0 +1,102 @@
+"""Recurring transactions: date arithmetic for rules and the thread that runs the scheduler.
+
+A rule is one row, however long it runs: a start date, a frequency, an optional
+end date and the number of occurrences already written as transactions. The
+n-th occurrence is always computed from the start (``start + n * step``), never
+from the previous one, so a rule starting on the 31st lands on the last day of
+shorter months and goes back to the 31st afterwards.
+
+Due occurrences are written in batches by the scheduler; future ones are only
+ever expanded in memory, lazily, for projections. ``first_index_from()`` jumps
+straight to the first occurrence of a window, so projecting a month of a rule
+that began ten years ago does not walk those ten years.
+"""
+import threading
+from datetime import timedelta
+
+from dateutil.relativedelta import relativedelta
+
+# timedelta where it will do: multiplying and adding it is several times cheaper than relativedelta
+STEPS = {
+    'daily': timedelta(days=1),
+    'weekly': timedelta(weeks=1),
+    'monthly': relativedelta(months=1),
+    'yearly': relativedelta(years=1),
+}
+FREQUENCIES = tuple(STEPS)
+
+
+def occurrence(start, frequency, n):
+    """Date of occurrence number `n` (0 is `start`)"""
+    return start + STEPS[frequency] * n
+
+
+def first_index_from(start, frequency, when):
+    """Index of the first occurrence on or after `when`"""
+    if when <= start:
+        return 0
+    if frequency in ('daily', 'weekly'):
+        days = 1 if frequency == 'daily' else 7
+        n = (when - start).days // days
+    else:
+        n = (when.year - start.year) * 12 + when.month - start.month
+        if frequency == 'yearly':
+            n //= 12
+    # The estimate is at most one step off either way
+    while n > 0 and occurrence(start, frequency, n - 1) >= when:
+        n -= 1
+    while occurrence(start, frequency, n) < when:
+        n += 1
+    return n
+
+
+def occurrences(start, frequency, first, until, end=None):
+    """Yield (index, date) of occurrences from index `first` up to and including `until` and `end`"""
+    last = until if end is None else min(until, end)
+    n = first
+    while True:
+        when = occurrence(start, frequency, n)
+        if when > last:
+            return
+        yield n, when
+        n += 1
+
+
+def next_date(start, frequency, n, end=None):
+    """Date of occurrence `n`, or None once the rule has ended"""
+    when = occurrence(start, frequency, n)
+    return None if end is not None and when > end else when
+
+
+class Scheduler:
+    """Calls `run()` every `interval` seconds on a daemon thread until stopped"""
+
+    def __init__(self, interval):
+        self.interval = interval
+        self._stop = threading.Event()
+        self._thread = None
+        self.runs = 0
+
+    @property
+    def running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self, run):
+        if not self.running:
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._loop, args=(run,), name='recurring', daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        thread, self._thread = self._thread, None
+        if thread is not None:
+            self._stop.set()
+            thread.join()
+
+    def _loop(self, run):
+        while not self._stop.wait(self.interval):
+            try:
+                run()
+            except Exception as e:
+                print(f"[ERROR] Recurring transactions: {e}")
+            self.runs += 1
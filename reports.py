@@ -0,0 +1,174 @@
+"""PDF financial reports rendered with reportlab in a background process pool.
+
+The request thread gathers the (already aggregated) report data and hands a
+plain dict to ``render_report`` in a worker process. Finished files are cached
+on disk as ``<reports dir>/<user id>/<job id>.pdf`` where the job id encodes the
+period and the user's data version, so a repeat request for unchanged data is
+served straight from disk, by any worker process.
+
+Job state lives on disk too, so a status poll can land on any app process: a
+``<job id>.pending`` marker is created before the render is queued and removed
+once the PDF is in place; a failed render leaves ``<job id>.failed`` instead.
+A pending marker older than ``PENDING_TIMEOUT`` belongs to a render that died
+with its process and counts as failed.
+"""
+from concurrent.futures import ProcessPoolExecutor
+import glob
+import multiprocessing
+import os
+import re
+import time
+
+JOB_ID_PATTERN = re.compile(r'^(monthly|yearly)-(\d{4}(?:-\d{2})?)-v(\d+)$')
+# Periods exactly as they appear in job ids; strptime alone would also take '2025-1'
+PENDING_TIMEOUT = 10 * 60  # seconds
+PERIOD_PATTERNS = {'monthly': re.compile(r'^[0-9]{4}-[0-9]{2}$'), 'yearly': re.compile(r'^[0-9]{4}$')}
+
+
+def job_id_for(kind, period, version):
+    return f'{kind}-{period}-v{version}'
+
+
+def _money(value):
+    return f'${value:,.2f}'
+
+
+def render_job(data, path, pending, failed):
+    """render_report() plus the job's markers. Runs inside a worker process."""
+    try:
+        render_report(data, path)
+    except Exception as e:
+        print(f"[ERROR] Report render failed: {e}")
+        with open(failed, 'w') as f:
+            f.write(str(e))
+        raise
+    finally:
+        remove(pending)
+    return path
+
+
+def remove(path):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+def render_report(data, path):
+    """Write the report PDF to `path` atomically. Runs inside a worker process."""
+    from reportlab.lib import colors
+    from reportlab.lib.pagesizes import A4
+    from reportlab.lib.styles import getSampleStyleSheet
+    from reportlab.platypus import Paragraph, SimpleDocTemplate, Spacer, Table, TableStyle
+
+    styles = getSampleStyleSheet()
+    table_style = TableStyle([
+        ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#a8d8ea')),
+        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+        ('GRID', (0, 0), (-1, -1), 0.5, colors.HexColor('#cccccc')),
+        ('ALIGN', (1, 1), (-1, -1), 'RIGHT'),
+    ])
+
+    def table(header, rows):
+        if not rows:
+            return Paragraph('No data for this period.', styles['Italic'])
+        t = Table([header] + rows, hAlign='LEFT')
+        t.setStyle(table_style)
+        return t
+
+    totals = data['totals']
+    story = [
+        Paragraph(data['title'], styles['Title']),
+        Paragraph(f"{data['username']} &middot; generated {data['generated_at']}", styles['Normal']),
+        Spacer(1, 16),
+        Paragraph('Summary', styles['Heading2']),
+        table(['', 'Amount'], [
+            ['Income', _money(totals['income'])],
+            ['Expenses', _money(totals['expenses'])],
+            ['Net savings', _money(totals['income'] - totals['expenses'])],
+            ['Savings rate', f"{totals['savings_rate']}%"],
+        ]),
+        Spacer(1, 16),
+        Paragraph('Spending by category', styles['Heading2']),
+        table(['Category', 'Transactions', 'Amount'],
+              [[c['category'], str(c['count']), _money(c['total'])] for c in data['expense_categories']]),
+        Spacer(1, 16),
+        Paragraph('Income by source', styles['Heading2']),
+        table(['Source', 'Transactions', 'Amount'],
+              [[c['category'], str(c['count']), _money(c['total'])] for c in data['income_categories']]),
+        Spacer(1, 16),
+        Paragraph('Budgets vs. actual', styles['Heading2']),
+        table(['Month', 'Category', 'Limit', 'Spent', 'Used'],
+              [[b['month'], b['category'], _money(b['limit']), _money(b['spent']), f"{b['percentage']}%"]
+               for b in data['budgets']]),
+        Spacer(1, 16),
+        Paragraph('Savings goals', styles['Heading2']),
+        table(['Goal', 'Target', 'Saved', 'Progress'],
+              [[g['name'], _money(g['target']), _money(g['current'] or 0), f"{g['progress']}%"]
+               for g in data['goals']]),
+    ]
+
+    tmp_path = f'{path}.{os.getpid()}.tmp'
+    SimpleDocTemplate(tmp_path, pagesize=A4, title=data['title']).build(story)
+    os.replace(tmp_path, path)
+    return path
+
+
+class ReportJobs:
+    """Queues report renders on a lazily started process pool; their state is read back from disk"""
+
+    def __init__(self, max_workers=2):
+        self.max_workers = max_workers
+        self._executor = None
+
+    def _pool(self):
+        if self._executor is None:
+            # spawn: a worker imports this module to unpickle render_job and never builds the Flask
+            # app or its DB engine (run directly, app.py skips create_app() in __mp_main__)
+            self._executor = ProcessPoolExecutor(self.max_workers, mp_context=multiprocessing.get_context('spawn'))
+        return self._executor
+
+    def path(self, reports_dir, user_id, job_id, suffix='pdf'):
+        return os.path.join(reports_dir, str(user_id), f'{job_id}.{suffix}')
+
+    def submit(self, reports_dir, user_id, job_id, data):
+        path = self.path(reports_dir, user_id, job_id)
+        if os.path.exists(path):
+            return path
+        pending, failed = (self.path(reports_dir, user_id, job_id, suffix) for suffix in ('pending', 'failed'))
+        kind, period, _ = JOB_ID_PATTERN.match(job_id).groups()
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Older renders of the same period are stale once the data version moves on
+        for old in glob.glob(self.path(reports_dir, user_id, job_id_for(kind, period, '*'), '*')):
+            if old not in (path, pending):
+                remove(old)
+        try:
+            # Exclusive create: of several processes asked for the same report, one renders it
+            os.close(os.open(pending, os.O_CREAT | os.O_EXCL | os.O_WRONLY))
+        except FileExistsError:
+            if time.time() - os.path.getmtime(pending) < PENDING_TIMEOUT:
+                return path
+            os.utime(pending)  # a render that died with its process; start over
+        try:
+            self._pool().submit(render_job, data, path, pending, failed)
+        except Exception:
+            remove(pending)
+            raise
+        return path
+
+    def status(self, reports_dir, user_id, job_id):
+        """'done', 'pending', 'failed', or None for unknown jobs"""
+        if os.path.exists(self.path(reports_dir, user_id, job_id)):
+            return 'done'
+        if os.path.exists(self.path(reports_dir, user_id, job_id, 'failed')):
+            return 'failed'
+        try:
+            started = os.path.getmtime(self.path(reports_dir, user_id, job_id, 'pending'))
+        except FileNotFoundError:
+            return None
+        return 'pending' if time.time() - started < PENDING_TIMEOUT else 'failed'
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
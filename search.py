@@ -0,0 +1,79 @@
+"""Full-text search over transaction descriptions with SQLite FTS5.
+
+``transaction_search`` is a contentless FTS5 table keyed by the transaction
+id. Every word is indexed with its owner folded in (``u42xlunch`` for user
+42), so a user's query only ever touches that user's postings: a prefix query
+is a range scan over their own terms and bm25's document frequencies are
+per user. The trade-off is that SQL triggers cannot tokenize, so the index is
+kept in sync by the app's write paths (mapper events and ``import_rows``) and
+rebuilt from the transaction table by ``flask rebuild-search-index``.
+
+A contentless table can only forget a row when given the terms it was
+indexed with, which ``terms()`` recomputes from the description.
+"""
+import re
+
+TABLE = 'transaction_search'
+CREATE_SQL = (f"CREATE VIRTUAL TABLE IF NOT EXISTS {TABLE} USING fts5("
+              f"terms, content='', tokenize='unicode61 remove_diacritics 2')")
+DROP_SQL = f'DROP TABLE IF EXISTS {TABLE}'
+INSERT_SQL = f'INSERT INTO {TABLE} (rowid, terms) VALUES (?, ?)'
+DELETE_SQL = f"INSERT INTO {TABLE} ({TABLE}, rowid, terms) VALUES ('delete', ?, ?)"
+MAX_QUERY_WORDS = 16
+REBUILD_BATCH_ROWS = 20000
+
+# Letters and digits only: FTS5's unicode61 tokenizer splits on '_' and punctuation too
+WORD = re.compile(r'[^\W_]+')
+
+
+def words(text):
+    return WORD.findall(text.lower()) if text else []
+
+
+def terms(user_id, description):
+    """The indexed text for one transaction; '' when there is nothing to index"""
+    return ' '.join(f'u{user_id}x{word}' for word in words(description))
+
+
+def match_expression(user_id, query):
+    """FTS5 MATCH string requiring every word of `query` as a prefix, or None if it has no words"""
+    found = words(query)[:MAX_QUERY_WORDS]
+    if not found:
+        return None
+    return ' '.join(f'"u{user_id}x{word}"*' for word in found)
+
+
+def indexed_values(rows):
+    """(rowid, terms) pairs for (id, user_id, description) rows, skipping rows with no words"""
+    values = ((tid, terms(user_id, description)) for tid, user_id, description in rows)
+    return [(tid, text) for tid, text in values if text]
+
+
+def index_rows(conn, rows):
+    """Add (id, user_id, description) rows to the index"""
+    values = indexed_values(rows)
+    if values:
+        conn.exec_driver_sql(INSERT_SQL, values)
+
+
+def unindex_rows(conn, rows):
+    """Remove (id, user_id, description) rows, given the values they were indexed with"""
+    values = indexed_values(rows)
+    if values:
+        conn.exec_driver_sql(DELETE_SQL, values)
+
+
+def rebuild(conn):
+    """Re-index every transaction from scratch; returns the number of transactions scanned"""
+    conn.exec_driver_sql(f"INSERT INTO {TABLE} ({TABLE}) VALUES ('delete-all')")
+    scanned, last_id = 0, 0
+    while True:
+        rows = conn.exec_driver_sql(
+            'SELECT id, user_id, description FROM "transaction" WHERE id > ? ORDER BY id LIMIT ?',
+            (last_id, REBUILD_BATCH_ROWS)
+        ).all()
+        if not rows:
+            return scanned
+        index_rows(conn, rows)
+        scanned += len(rows)
+        last_id = rows[-1][0]
@@ -0,0 +1,123 @@
+"""Optional sharding of user data over several SQLite files.
+
+With ``SHARD_COUNT`` > 0 each user's categories, transactions, budgets, goals,
+rollups and search terms live in one of ``SHARD_COUNT`` database files, picked
+by a jump consistent hash of the user id. SQLite allows one writer per file, so
+a heavy import only holds up the users on its own shard. Accounts stay in the
+main database, which keeps usernames unique and login unchanged. Each shard
+also holds a copy of its users' rows, without the password, that carries their
+``data_version``: the counter is bumped in the same transaction as the data it
+describes, on the same file.
+
+Routing is done by ``ShardedSession.get_bind``. ORM statements on tables marked
+``info={'central': True}`` go to the main database. Everything else goes to the
+engine in ``session.info['shard']`` when one is set: the data models, Core
+statements (including those on the user table's version counter) and raw SQL.
+Requests set it from the logged-in user.
+
+The jump hash keeps users in place when shards are added: going from N to M
+shards moves about (M - N) / M of them, all onto the new files.
+``move_user()`` copies one user's rows to another database and deletes them
+from the old one; ``flask rebalance-shards`` runs it for every misplaced user.
+"""
+from flask_sqlalchemy.session import Session
+from sqlalchemy import func, select
+
+import search
+
+
+def jump_hash(key, buckets):
+    """Lamping & Veach's jump consistent hash of the integer `key` into range(buckets)"""
+    key &= 0xFFFFFFFFFFFFFFFF
+    b, j = -1, 0
+    while j < buckets:
+        b = j
+        key = (key * 2862933555777941757 + 1) & 0xFFFFFFFFFFFFFFFF
+        j = int((b + 1) * ((1 << 31) / ((key >> 33) + 1)))
+    return b
+
+
+def shard_for(user_id, shards):
+    return jump_hash(user_id, shards)
+
+
+def shard_bind_key(shard):
+    return f'shard{shard}'
+
+
+def shard_url(template, shard):
+    return template.format(shard=shard)
+
+
+def is_central(table):
+    return table.info.get('central', False)
+
+
+class ShardedSession(Session):
+    """Sends statements to ``info['shard']`` unless they are ORM statements on a central table"""
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        shard = self.info.get('shard')
+        if bind is None and shard is not None and (mapper is None or not is_central(mapper.local_table)):
+            return shard
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+
+def user_tables(metadata):
+    """Tables holding per-user rows, parents before children"""
+    return [table for table in metadata.sorted_tables if not is_central(table) and 'user_id' in table.c]
+
+
+def indexed_transactions(conn, metadata, user_id):
+    transactions = metadata.tables['transaction']
+    return conn.execute(select(transactions.c.id, transactions.c.user_id, transactions.c.description)
+                        .where(transactions.c.user_id == user_id)).all()
+
+
+def delete_user_rows(conn, metadata, user_id, keep_user_row=False):
+    """Remove a user's data from `conn`'s database, and their shard copy of the user row unless `keep_user_row`"""
+    search.unindex_rows(conn, indexed_transactions(conn, metadata, user_id))
+    for table in reversed(user_tables(metadata)):
+        conn.execute(table.delete().where(table.c.user_id == user_id))
+    if not keep_user_row:
+        users = metadata.tables['user']
+        conn.execute(users.delete().where(users.c.id == user_id))
+
+
+def move_user(metadata, source, target, user_id, keep_user_row=False):
+    """Copy a user's rows from `source` to `target` and delete them from `source`; returns rows copied.
+
+    Rows get fresh ids on the target (with foreign keys rewritten to match), since
+    each database numbers its rows on its own. Anything the user already has on
+    the target, such as a copy left by an interrupted move, is replaced. The caller
+    commits `target` before `source`, so a crash in between leaves the rows in both
+    places and a re-run finishes the move. `keep_user_row` leaves the source's
+    user row alone, for moves out of the main database.
+    """
+    users = metadata.tables['user']
+    user = source.execute(select(users).where(users.c.id == user_id)).mappings().one()
+    delete_user_rows(target, metadata, user_id)
+    # A new version, so nothing cached for the old row ids is served again
+    target.execute(users.insert().values(dict(user, password='', data_version=user['data_version'] + 1)))
+
+    copied, new_ids = 0, {}
+    for table in user_tables(metadata):
+        rows = [dict(row) for row in source.execute(select(table).where(table.c.user_id == user_id)).mappings()]
+        for column in table.c:
+            for key in column.foreign_keys:
+                mapping = new_ids.get(key.column.table.name)
+                if mapping is not None:
+                    for row in rows:
+                        row[column.name] = mapping[row[column.name]]
+        if 'id' in table.c and table.c.id.primary_key:
+            start = target.execute(select(func.max(table.c.id))).scalar() or 0
+            new_ids[table.name] = {}
+            for new_id, row in enumerate(rows, start + 1):
+                new_ids[table.name][row['id']] = row['id'] = new_id
+        if rows:
+            target.execute(table.insert(), rows)
+        copied += len(rows)
+    search.index_rows(target, indexed_transactions(target, metadata, user_id))
+
+    delete_user_rows(source, metadata, user_id, keep_user_row)
+    return copied
@@ -1,8 +1,10 @@
 // Initialize on load
 document.addEventListener('DOMContentLoaded', () => {
-    checkAuth();
+    currentUser = checkAuth();
+    replicaReady = initReplica();
     loadUserData();
     setupEventListeners();
+    connectLiveUpdates();
     updateDate();
     setInterval(updateDate, 60000);
 });
@@ -18,6 +20,7 @@ async function checkAuth() {
         }
         const user = await response.json();
         document.getElementById('userGreeting').textContent = `Welcome back, ${user.username}!`;
+        return user;
     } catch (err) {
         console.error('Auth error:', err);
         setTimeout(() => { window.location.href = '/'; }, 500);
@@ -26,6 +29,11 @@ async function checkAuth() {
 
 async function logout() {
     await fetch('/api/auth/logout', { method: 'POST' });
+    if (replica.db) {
+        // Don't leave this user's finances on a shared device
+        replica.db.close();
+        indexedDB.deleteDatabase(replica.db.name);
+    }
     window.location.href = '/';
 }
 
@@ -33,13 +41,110 @@ async function logout() {
 async function loadUserData() {
     await Promise.all([
         loadDashboard(),
-        loadTransactions(),
+        loadReplicatedLists(),
         loadBudgets(),
-        loadGoals(),
         loadAnalytics()
     ]);
 }
 
+// Local replica: transactions and goals (and budget rows) are kept in IndexedDB and patched from
+// /api/sync, so a returning visit downloads only what changed since its stored version instead of
+// the full lists. Without IndexedDB the lists come from the server as before.
+const REPLICA_STORES = ['transactions', 'budgets', 'goals'];
+const replica = { db: null, version: 0, transactions: new Map(), budgets: new Map(), goals: new Map() };
+let currentUser = null;
+let replicaReady = null;
+let replicaSync = Promise.resolve();
+let replicaSyncTimer = null;
+
+function idbRequest(request) {
+    return new Promise((resolve, reject) => {
+        request.onsuccess = () => resolve(request.result);
+        request.onerror = () => reject(request.error);
+    });
+}
+
+function idbDone(tx) {
+    return new Promise((resolve, reject) => {
+        tx.oncomplete = () => resolve();
+        tx.onerror = tx.onabort = () => reject(tx.error);
+    });
+}
+
+async function initReplica() {
+    if (!window.indexedDB) return false;
+    try {
+        const user = await currentUser;
+        const request = indexedDB.open(`finance-dashboard-${user.id}`, 1);
+        request.onupgradeneeded = () => {
+            for (const store of REPLICA_STORES) request.result.createObjectStore(store, { keyPath: 'id' });
+            request.result.createObjectStore('meta');
+        };
+        const db = await idbRequest(request);
+        const tx = db.transaction([...REPLICA_STORES, 'meta']);
+        const [version, ...lists] = await Promise.all([
+            idbRequest(tx.objectStore('meta').get('version')),
+            ...REPLICA_STORES.map(store => idbRequest(tx.objectStore(store).getAll()))
+        ]);
+        replica.version = version || 0;
+        REPLICA_STORES.forEach((store, i) => { replica[store] = new Map(lists[i].map(row => [row.id, row])); });
+        replica.db = db;
+        return true;
+    } catch (error) {
+        console.error('Local replica unavailable:', error);
+        return false;
+    }
+}
+
+async function applySync() {
+    const response = await fetch(`/api/sync?since=${replica.version}`);
+    const changes = await response.json();
+    if (!response.ok) throw new Error(changes.error);
+
+    const tx = replica.db.transaction([...REPLICA_STORES, 'meta'], 'readwrite');
+    for (const store of REPLICA_STORES) {
+        const objects = tx.objectStore(store);
+        if (changes.reset) {
+            objects.clear();
+            replica[store].clear();
+        }
+        for (const id of changes[store].deleted) {
+            objects.delete(id);
+            replica[store].delete(id);
+        }
+        for (const row of changes[store].upserted) {
+            objects.put(row);
+            replica[store].set(row.id, row);
+        }
+    }
+    tx.objectStore('meta').put(changes.version, 'version');
+    await idbDone(tx);
+    replica.version = changes.version;
+}
+
+function syncReplica() {
+    // One sync at a time, each starting from the version the previous one stored
+    replicaSync = replicaSync.catch(() => {}).then(applySync);
+    return replicaSync;
+}
+
+async function loadReplicatedLists() {
+    if (await replicaReady) {
+        try {
+            await syncReplica();
+        } catch (error) {
+            console.error('Error syncing local replica:', error);
+        }
+    }
+    await Promise.all([loadTransactions(), loadGoals()]);
+}
+
+function scheduleReplicaSync() {
+    // Coalesce bursts of change events into one sync request
+    clearTimeout(replicaSyncTimer);
+    replicaSyncTimer = setTimeout(loadReplicatedLists, 200);
+}
+
 // Tab switching
 function switchTab(tab) {
     document.querySelectorAll('.tab-content').forEach(el => el.classList.remove('active'));
@@ -55,16 +160,7 @@ async function loadDashboard() {
         const response = await fetch('/api/dashboard');
         const data = await response.json();
 
-        document.getElementById('totalIncome').textContent = formatCurrency(data.total_income);
-        document.getElementById('totalExpenses').textContent = formatCurrency(data.total_expenses);
-        document.getElementById('balance').textContent = formatCurrency(data.balance);
-        document.getElementById('savingsRate').textContent = (data.savings_rate || 0) + '%';
-
-        const balanceCard = document.querySelector('.summary-card.balance');
-        if (data.balance < 0) {
-            balanceCard.style.background = 'linear-gradient(135deg, #f5a5a5 0%, #e88e8e 100%)';
-        }
-
+        updateSummaryCards(data);
         updateExpenseChart(data.expense_breakdown);
         updateGoalsPreview(data.savings_goals);
         showBudgetAlerts(data.budget_alerts);
@@ -73,6 +169,16 @@ async function loadDashboard() {
     }
 }
 
+function updateSummaryCards(summary) {
+    document.getElementById('totalIncome').textContent = formatCurrency(summary.totalIncome);
+    document.getElementById('totalExpenses').textContent = formatCurrency(summary.totalExpenses);
+    document.getElementById('balance').textContent = formatCurrency(summary.balance);
+    document.getElementById('savingsRate').textContent = (summary.savingsRate || 0) + '%';
+
+    const balanceCard = document.querySelector('.summary-card.balance');
+    balanceCard.style.background = summary.balance < 0 ? 'linear-gradient(135deg, #f5a5a5 0%, #e88e8e 100%)' : '';
+}
+
 function showBudgetAlerts(alerts) {
     const container = document.getElementById('budgetAlerts');
     const alertsContainer = document.getElementById('budgetAlertsContainer');
@@ -139,11 +245,77 @@ function updateGoalsPreview(goals) {
 }
 
 // Transactions
-async function loadTransactions() {
+const TRANSACTION_PAGE_SIZE = 50;
+let transactionsCursor = null;
+let loadedTransactions = [];
+let replicaRowsShown = TRANSACTION_PAGE_SIZE;
+
+function transactionFilterParams() {
+    const params = new URLSearchParams();
+    const filters = {
+        type: 'filterType',
+        category: 'filterCategory',
+        start_date: 'filterStartDate',
+        end_date: 'filterEndDate',
+        min_amount: 'filterMinAmount',
+        max_amount: 'filterMaxAmount'
+    };
+    for (const [param, id] of Object.entries(filters)) {
+        const value = document.getElementById(id).value;
+        if (value) params.set(param, value);
+    }
+    return params;
+}
+
+// Epoch seconds of the stored wall-clock time -> 'YYYY-MM-DD HH:MM', as the row format sends it
+function formatEpochDate(seconds) {
+    return new Date(seconds * 1000).toISOString().slice(0, 16).replace('T', ' ');
+}
+
+// Turn a ?format=columnar page back into the row objects the rest of the dashboard uses
+function rowsFromColumns(page) {
+    return page.id.map((id, i) => ({
+        id,
+        type: page.types[page.type[i]],
+        category: page.categories[page.category[i]],
+        amount: page.amount[i],
+        description: page.description[i],
+        date: formatEpochDate(page.date[i])
+    }));
+}
+
+// Newest first, as the server pages them
+function replicaTransactions() {
+    return [...replica.transactions.values()].sort((a, b) => b.date.localeCompare(a.date) || b.id - a.id);
+}
+
+async function loadTransactions(append = false) {
+    if (replica.db && !transactionFilterParams().toString()) {
+        replicaRowsShown = append ? replicaRowsShown + TRANSACTION_PAGE_SIZE : TRANSACTION_PAGE_SIZE;
+        const transactions = replicaTransactions();
+        loadedTransactions = transactions.slice(0, replicaRowsShown);
+        displayTransactions(loadedTransactions);
+        document.getElementById('loadMoreTransactions').style.display =
+            transactions.length > replicaRowsShown ? 'block' : 'none';
+        return;
+    }
     try {
-        const response = await fetch('/api/transactions');
-        const transactions = await response.json();
-        displayTransactions(transactions);
+        const params = transactionFilterParams();
+        params.set('format', 'columnar');
+        if (append && transactionsCursor) params.set('cursor', transactionsCursor);
+
+        const response = await fetch('/api/transactions?' + params.toString());
+        const page = await response.json();
+        if (!response.ok) {
+            console.error('Error loading transactions:', page.error);
+            return;
+        }
+
+        const transactions = rowsFromColumns(page);
+        loadedTransactions = append ? loadedTransactions.concat(transactions) : transactions;
+        transactionsCursor = page.next_cursor;
+        displayTransactions(loadedTransactions);
+        document.getElementById('loadMoreTransactions').style.display = transactionsCursor ? 'block' : 'none';
     } catch (error) {
         console.error('Error loading transactions:', error);
     }
@@ -177,13 +349,17 @@ async function addTransaction(e) {
         category: document.getElementById('category').value,
         amount: document.getElementById('amount').value,
         description: document.getElementById('description').value,
-        date: document.getElementById('date').value,
-        is_recurring: document.getElementById('isRecurring').checked,
-        recurring_frequency: document.getElementById('recurringFrequency').value || null
+        date: document.getElementById('date').value
     };
+    // A recurring transaction is saved as a rule; the server writes each occurrence as it falls due
+    const isRecurring = document.getElementById('isRecurring').checked;
+    if (isRecurring) {
+        transaction.frequency = document.getElementById('recurringFrequency').value;
+        transaction.start_date = transaction.date;
+    }
 
     try {
-        const response = await fetch('/api/transactions', {
+        const response = await fetch(isRecurring ? '/api/recurring' : '/api/transactions', {
             method: 'POST',
             headers: { 'Content-Type': 'application/json' },
             body: JSON.stringify(transaction)
@@ -192,7 +368,7 @@ async function addTransaction(e) {
         if (response.ok) {
             document.getElementById('transactionForm').reset();
             document.getElementById('date').value = new Date().toISOString().split('T')[0];
-            loadUserData();
+            if (!liveUpdates) loadUserData();
         }
     } catch (error) {
         console.error('Error adding transaction:', error);
@@ -204,7 +380,7 @@ async function deleteTransaction(id) {
         try {
             const response = await fetch(`/api/transactions/${id}`, { method: 'DELETE' });
             if (response.ok) {
-                loadUserData();
+                if (!liveUpdates) loadUserData();
             }
         } catch (error) {
             console.error('Error deleting transaction:', error);
@@ -236,9 +412,9 @@ function displayBudgets(budgets) {
                 <div class="transaction-category">${budget.category}</div>
                 <div class="progress-container">
                     <div class="progress-bar">
-                        <div class="progress-fill" style="width: 50%"></div>
+                        <div class="progress-fill" style="width: ${Math.min(budget.percentage, 100)}%; ${budget.percentage > 100 ? 'background: #ef5350;' : ''}"></div>
                     </div>
-                    <div class="progress-text">Budget: ${formatCurrency(budget.limit)}</div>
+                    <div class="progress-text">${budget.percentage}% - ${formatCurrency(budget.spent)} / ${formatCurrency(budget.limit)} (${formatCurrency(budget.remaining)} left)</div>
                 </div>
             </div>
             <button class="btn-danger" onclick="deleteBudget(${budget.id})" style="padding: 8px 12px;">Delete</button>
@@ -264,7 +440,7 @@ async function addBudget(e) {
 
         if (response.ok) {
             document.getElementById('budgetForm').reset();
-            loadUserData();
+            if (!liveUpdates) loadUserData();
         }
     } catch (error) {
         console.error('Error adding budget:', error);
@@ -276,7 +452,7 @@ async function deleteBudget(id) {
         try {
             const response = await fetch(`/api/budgets/${id}`, { method: 'DELETE' });
             if (response.ok) {
-                loadUserData();
+                if (!liveUpdates) loadUserData();
             }
         } catch (error) {
             console.error('Error deleting budget:', error);
@@ -285,11 +461,18 @@ async function deleteBudget(id) {
 }
 
 // Goals
+let loadedGoals = [];
+
 async function loadGoals() {
+    if (replica.db) {
+        loadedGoals = [...replica.goals.values()].sort((a, b) => a.id - b.id);
+        displayGoals(loadedGoals);
+        return;
+    }
     try {
         const response = await fetch('/api/goals');
-        const goals = await response.json();
-        displayGoals(goals);
+        loadedGoals = await response.json();
+        displayGoals(loadedGoals);
     } catch (error) {
         console.error('Error loading goals:', error);
     }
@@ -348,7 +531,7 @@ async function addGoal(e) {
 
         if (response.ok) {
             document.getElementById('goalForm').reset();
-            loadUserData();
+            if (!liveUpdates) loadUserData();
         }
     } catch (error) {
         console.error('Error adding goal:', error);
@@ -373,7 +556,7 @@ async function addGoalAmount(id) {
 
         if (response.ok) {
             input.value = '';
-            loadUserData();
+            if (!liveUpdates) loadUserData();
         }
     } catch (error) {
         console.error('Error updating goal:', error);
@@ -385,7 +568,7 @@ async function deleteGoal(id) {
         try {
             const response = await fetch(`/api/goals/${id}`, { method: 'DELETE' });
             if (response.ok) {
-                loadUserData();
+                if (!liveUpdates) loadUserData();
             }
         } catch (error) {
             console.error('Error deleting goal:', error);
@@ -396,27 +579,18 @@ async function deleteGoal(id) {
 // Analytics
 async function loadAnalytics() {
     try {
-        const [transResponse, budgetResponse, goalsResponse, analyticsResponse] = await Promise.all([
-            fetch('/api/transactions'),
-            fetch('/api/budgets'),
-            fetch('/api/goals'),
-            fetch('/api/analytics/monthly')
-        ]);
-
-        const transactions = await transResponse.json();
-        const budgets = await budgetResponse.json();
-        const goals = await goalsResponse.json();
-        const monthlyData = await analyticsResponse.json();
-
-        updateTrendChart(monthlyData);
-        updateIncomeExpenseChart(monthlyData);
-        updateSavingsGrowthChart(monthlyData);
-        updateCategoryBarChart(transactions);
-        updateBudgetRadarChart(budgets, transactions);
-        updateGoalsChart(goals);
-        updateIncomeSourcesChart(transactions);
-        updateCategoryTrendChart(transactions);
-        updateAnalyticsStats(monthlyData, transactions, budgets, goals);
+        const response = await fetch('/api/analytics/bundle');
+        const bundle = await response.json();
+
+        updateTrendChart(bundle.monthly);
+        updateIncomeExpenseChart(bundle.monthly);
+        updateSavingsGrowthChart(bundle.monthly);
+        updateCategoryBarChart(bundle.expense_categories);
+        updateBudgetRadarChart(bundle.budgets);
+        updateGoalsChart(bundle.goals);
+        updateIncomeSourcesChart(bundle.income_sources);
+        updateCategoryTrendChart(bundle.category_trend);
+        updateAnalyticsStats(bundle);
     } catch (error) {
         console.error('Error loading analytics:', error);
     }
@@ -532,20 +706,12 @@ function updateSavingsGrowthChart(data) {
     });
 }
 
-function updateCategoryBarChart(transactions) {
+function updateCategoryBarChart(expenseCategories) {
     const ctx = document.getElementById('categoryBarChart');
     if (window.categoryBarChartInstance) window.categoryBarChartInstance.destroy();
 
-    const expensesByCategory = {};
-    transactions.forEach(t => {
-        if (t.type === 'expense') {
-            expensesByCategory[t.category] = (expensesByCategory[t.category] || 0) + t.amount;
-        }
-    });
-
-    const sorted = Object.entries(expensesByCategory)
-        .sort((a, b) => b[1] - a[1])
-        .slice(0, 8);
+    // Already sorted by total, largest first
+    const sorted = expenseCategories.slice(0, 8).map(c => [c.category, c.total]);
 
     window.categoryBarChartInstance = new Chart(ctx, {
         type: 'bar',
@@ -567,20 +733,13 @@ function updateCategoryBarChart(transactions) {
     });
 }
 
-function updateBudgetRadarChart(budgets, transactions) {
+function updateBudgetRadarChart(budgets) {
     const ctx = document.getElementById('budgetRadarChart');
     if (window.budgetRadarChartInstance) window.budgetRadarChartInstance.destroy();
 
-    const expensesByCategory = {};
-    transactions.forEach(t => {
-        if (t.type === 'expense') {
-            expensesByCategory[t.category] = (expensesByCategory[t.category] || 0) + t.amount;
-        }
-    });
-
     const labels = budgets.map(b => b.category);
     const limits = budgets.map(b => b.limit);
-    const spending = budgets.map(b => expensesByCategory[b.category] || 0);
+    const spending = budgets.map(b => b.spent);
 
     window.budgetRadarChartInstance = new Chart(ctx, {
         type: 'radar',
@@ -642,19 +801,12 @@ function updateGoalsChart(goals) {
     });
 }
 
-function updateIncomeSourcesChart(transactions) {
+function updateIncomeSourcesChart(incomeSources) {
     const ctx = document.getElementById('incomeSourcesChart');
     if (window.incomeSourcesChartInstance) window.incomeSourcesChartInstance.destroy();
 
-    const incomeBySource = {};
-    transactions.forEach(t => {
-        if (t.type === 'income') {
-            incomeBySource[t.category] = (incomeBySource[t.category] || 0) + t.amount;
-        }
-    });
-
-    const data = Object.values(incomeBySource);
-    const labels = Object.keys(incomeBySource);
+    const data = incomeSources.map(s => s.total);
+    const labels = incomeSources.map(s => s.category);
 
     if (data.length === 0) {
         return;
@@ -681,26 +833,16 @@ function updateIncomeSourcesChart(transactions) {
     });
 }
 
-function updateCategoryTrendChart(transactions) {
+function updateCategoryTrendChart(trend) {
     const ctx = document.getElementById('categoryTrendChart');
     if (window.categoryTrendChartInstance) window.categoryTrendChartInstance.destroy();
 
-    const categoryByMonth = {};
-    transactions.forEach(t => {
-        if (t.type === 'expense') {
-            const month = t.date.substring(0, 7);
-            if (!categoryByMonth[t.category]) categoryByMonth[t.category] = {};
-            categoryByMonth[t.category][month] = (categoryByMonth[t.category][month] || 0) + t.amount;
-        }
-    });
-
-    const months = [...new Set(transactions.map(t => t.date.substring(0, 7)))].sort();
-    const categories = Object.keys(categoryByMonth).slice(0, 5);
+    const months = trend.months;
     const colors = ['#a8d8ea', '#98ccdb', '#88bfd0', '#78b4c5', '#68a9ba'];
 
-    const datasets = categories.map((cat, idx) => ({
-        label: cat,
-        data: months.map(month => categoryByMonth[cat][month] || 0),
+    const datasets = trend.series.map((series, idx) => ({
+        label: series.category,
+        data: series.data,
         borderColor: colors[idx % colors.length],
         backgroundColor: colors[idx % colors.length] + '30',
         tension: 0.3,
@@ -722,23 +864,31 @@ function updateCategoryTrendChart(transactions) {
     });
 }
 
-function updateAnalyticsStats(monthlyData, transactions, budgets, goals) {
+function updateAnalyticsStats(bundle) {
     const container = document.getElementById('analyticsStats');
+    const monthlyData = bundle.monthly;
+    const budgets = bundle.budgets;
+    const goals = bundle.goals;
     
     const totalIncome = monthlyData.reduce((sum, d) => sum + (d.income || 0), 0);
     const totalExpenses = monthlyData.reduce((sum, d) => sum + (d.expenses || 0), 0);
     const totalSavings = totalIncome - totalExpenses;
     const savingsRate = totalIncome > 0 ? (totalSavings / totalIncome * 100).toFixed(1) : 0;
     
-    const avgIncome = totalIncome / 12;
-    const avgExpenses = totalExpenses / 12;
+    const avgIncome = totalIncome / monthlyData.length;
+    const avgExpenses = totalExpenses / monthlyData.length;
     
     const goalProgress = goals.length > 0 ? (goals.reduce((sum, g) => sum + g.progress, 0) / goals.length).toFixed(1) : 0;
     const completedGoals = goals.filter(g => g.progress >= 100).length;
     
     const budgetCategories = budgets.length;
-    const expenseCategories = [...new Set(transactions.filter(t => t.type === 'expense').map(t => t.category))].length;
-    const incomeCategories = [...new Set(transactions.filter(t => t.type === 'income').map(t => t.category))].length;
+    const expenseCategories = bundle.expense_categories.length;
+    const incomeCategories = bundle.income_sources.length;
+
+    // Recorded so far plus the recurring occurrences still to come
+    const nextMonth = bundle.projection[1] || bundle.projection[0];
+    const projectedNet = nextMonth.income - nextMonth.expenses;
+    const next = bundle.upcoming[0];
     
     container.innerHTML = `
         <div class="stat-box">
@@ -781,14 +931,57 @@ function updateAnalyticsStats(monthlyData, transactions, budgets, goals) {
             <div class="stat-label">Income Categories</div>
             <div class="stat-value">${incomeCategories}</div>
         </div>
+        <div class="stat-box">
+            <div class="stat-label">Projected ${nextMonth.month} Net</div>
+            <div class="stat-value" style="color: ${projectedNet >= 0 ? '#81c784' : '#ef5350'};">${formatCurrency(projectedNet)}</div>
+        </div>
+        <div class="stat-box">
+            <div class="stat-label">Next Recurring</div>
+            <div class="stat-value">${next ? `${next.category} ${formatCurrency(next.amount)} on ${next.date}` : 'None'}</div>
+        </div>
     `;
 }
 
+// Reports
+async function downloadReport(period) {
+    const status = document.getElementById('reportStatus');
+    status.textContent = 'Preparing report...';
+    try {
+        const response = await fetch('/api/reports', {
+            method: 'POST',
+            headers: { 'Content-Type': 'application/json' },
+            body: JSON.stringify({ period: period })
+        });
+        let job = await response.json();
+        while (job.status === 'pending') {
+            await new Promise(resolve => setTimeout(resolve, 1000));
+            job = await (await fetch(job.status_url)).json();
+        }
+        if (job.status !== 'done') {
+            status.textContent = 'Report generation failed.';
+            return;
+        }
+        status.textContent = '';
+        window.location.href = job.download_url;
+    } catch (error) {
+        console.error('Error generating report:', error);
+        status.textContent = 'Report generation failed.';
+    }
+}
+
 // Event listeners
 function setupEventListeners() {
     document.getElementById('transactionForm').addEventListener('submit', addTransaction);
     document.getElementById('budgetForm').addEventListener('submit', addBudget);
     document.getElementById('goalForm').addEventListener('submit', addGoal);
+    document.getElementById('transactionFilters').addEventListener('submit', (e) => {
+        e.preventDefault();
+        loadTransactions();
+    });
+    document.getElementById('loadMoreTransactions').addEventListener('click', () => loadTransactions(true));
+    document.getElementById('exportTransactions').addEventListener('click', () => {
+        window.location.href = '/api/transactions/export.csv?' + transactionFilterParams().toString();
+    });
 
     const dateInput = document.getElementById('date');
     dateInput.value = new Date().toISOString().split('T')[0];
@@ -798,6 +991,81 @@ function setupEventListeners() {
     });
 }
 
+// Live updates: the server pushes a small event for every committed change, so this tab patches its
+// state instead of re-fetching everything. Without a connected stream the handlers above reload instead.
+let liveUpdates = false;
+let analyticsRefreshTimer = null;
+
+function scheduleAnalyticsRefresh() {
+    // Coalesce bursts of changes into one bundle request
+    clearTimeout(analyticsRefreshTimer);
+    analyticsRefreshTimer = setTimeout(loadAnalytics, 1000);
+}
+
+function connectLiveUpdates() {
+    if (!window.EventSource) return;
+    const source = new EventSource('/api/events');
+    const on = (type, handler) => source.addEventListener(type, e => handler(JSON.parse(e.data)));
+
+    source.addEventListener('open', () => { liveUpdates = true; });
+    source.addEventListener('error', () => { liveUpdates = false; });  // EventSource reconnects by itself
+
+    on('summary', updateSummaryCards);
+    on('transaction.created', t => {
+        if (replica.db) {
+            scheduleReplicaSync();
+        } else if (transactionFilterParams().toString()) {
+            loadTransactions();
+        } else {
+            loadedTransactions = [t].concat(loadedTransactions);
+            displayTransactions(loadedTransactions);
+        }
+        loadBudgets();
+        scheduleAnalyticsRefresh();
+    });
+    on('transaction.deleted', ({ id }) => {
+        if (replica.db) {
+            scheduleReplicaSync();
+        } else {
+            loadedTransactions = loadedTransactions.filter(t => t.id !== id);
+            displayTransactions(loadedTransactions);
+        }
+        loadBudgets();
+        scheduleAnalyticsRefresh();
+    });
+    on('transactions.imported', () => {
+        if (replica.db) {
+            scheduleReplicaSync();
+        } else {
+            loadTransactions();
+        }
+        loadBudgets();
+        scheduleAnalyticsRefresh();
+    });
+    for (const action of ['created', 'updated', 'deleted']) {
+        on(`budget.${action}`, () => {
+            if (replica.db) scheduleReplicaSync();
+            loadBudgets();
+            scheduleAnalyticsRefresh();
+        });
+        on(`goal.${action}`, goal => {
+            if (replica.db) {
+                scheduleReplicaSync();
+            } else {
+                loadedGoals = loadedGoals.filter(g => g.id !== goal.id);
+                if (action !== 'deleted') loadedGoals.push(goal);
+                loadedGoals.sort((a, b) => a.id - b.id);
+                displayGoals(loadedGoals);
+            }
+            scheduleAnalyticsRefresh();
+        });
+        // Rules only change projections; their transactions arrive as transactions.imported
+        on(`recurring.${action}`, scheduleAnalyticsRefresh);
+    }
+    // The server dropped this stream or saw writes from another worker: reload everything
+    on('resync', () => loadUserData());
+}
+
 // Utilities
 function formatCurrency(amount) {
     if (amount === null || amount === undefined || isNaN(amount)) {
@@ -0,0 +1,92 @@
+from datetime import datetime
+
+from app import db, get_category, User, Transaction, monthly_totals
+
+
+def add(user, kind, amount, date):
+    db.session.add(Transaction(user_id=user.id, type=kind, category=get_category(user.id, 'Misc'), amount=amount,
+                               date=date))
+
+
+def test_monthly_uses_calendar_months(make_user):
+    user = make_user('alice')
+    # 30-day steps back from March 31 land on March 1 and skip February entirely
+    add(user, 'income', 100, datetime(2025, 2, 10))
+    add(user, 'expense', 40, datetime(2025, 2, 28, 23, 59))
+    add(user, 'expense', 5, datetime(2025, 3, 1))
+    add(user, 'income', 999, datetime(2024, 3, 31))  # outside a 12-month window
+    db.session.commit()
+
+    data = monthly_totals(user.id, 12, now=datetime(2025, 3, 31, 12, 0))
+
+    assert [d['period'] for d in data] == [f'2024-{m:02d}' for m in range(4, 13)] + ['2025-01', '2025-02', '2025-03']
+    assert data[0]['month'] == 'Apr'
+    feb, mar = data[-2], data[-1]
+    assert (feb['income'], feb['expenses']) == (100, 40)
+    assert (mar['income'], mar['expenses']) == (0, 5)
+    assert sum(d['income'] for d in data) == 100
+
+
+def test_monthly_window_parameter(client):
+    client.post('/api/transactions', json={'type': 'income', 'category': 'Salary', 'amount': 10})
+
+    data = client.get('/api/analytics/monthly?months=24').get_json()
+    assert len(data) == 24
+    assert data[-1]['period'] == datetime.now().strftime('%Y-%m')
+    assert data[-1]['income'] == 10
+
+    assert len(client.get('/api/analytics/monthly').get_json()) == 12
+    assert len(client.get('/api/analytics/monthly?months=0').get_json()) == 1
+
+
+def test_analytics_bundle(client):
+    month = datetime.now().strftime('%Y-%m')
+    for kind, category, amount in [('income', 'Salary', 3000), ('income', 'Gift', 100),
+                                   ('expense', 'Food', 200), ('expense', 'Food', 50),
+                                   ('expense', 'Rent', 900), ('expense', 'Fun', 25)]:
+        client.post('/api/transactions', json={'type': kind, 'category': category, 'amount': amount})
+    client.post('/api/budgets', json={'category': 'Food', 'limit': 500})
+    client.post('/api/budgets', json={'category': 'Travel', 'limit': 100})
+    client.post('/api/goals', json={'name': 'Car', 'target': 1000})
+
+    bundle = client.get('/api/analytics/bundle?months=6').get_json()
+
+    assert len(bundle['monthly']) == 6
+    assert bundle['monthly'][-1] == {'month': datetime.now().strftime('%b'), 'period': month,
+                                     'income': 3100, 'expenses': 1175}
+    assert bundle['expense_categories'] == [{'category': 'Rent', 'total': 900}, {'category': 'Food', 'total': 250},
+                                            {'category': 'Fun', 'total': 25}]
+    assert bundle['income_sources'] == [{'category': 'Salary', 'total': 3000}, {'category': 'Gift', 'total': 100}]
+
+    trend = bundle['category_trend']
+    assert trend['months'] == [m['period'] for m in bundle['monthly']]
+    assert [s['category'] for s in trend['series']] == ['Rent', 'Food', 'Fun']
+    assert trend['series'][1]['data'] == [0, 0, 0, 0, 0, 250]
+
+    budgets = {b['category']: b for b in bundle['budgets']}
+    assert (budgets['Food']['spent'], budgets['Food']['percentage']) == (250, 50.0)
+    assert (budgets['Travel']['spent'], budgets['Travel']['percentage']) == (0, 0)
+    assert [g['name'] for g in bundle['goals']] == ['Car']
+
+
+def test_budgets_report_spending_for_requested_month(client):
+    user = db.session.get(User, 1)
+    add(user, 'expense', 120, datetime(2025, 3, 5))
+    add(user, 'expense', 30, datetime(2025, 3, 20))
+    add(user, 'expense', 999, datetime(2025, 4, 1))
+    add(user, 'income', 75, datetime(2025, 3, 6))
+    db.session.add(Transaction(user_id=user.id, type='expense', category=get_category(user.id, 'Fun'), amount=80,
+                               date=datetime(2025, 3, 9)))
+    db.session.commit()
+    client.post('/api/budgets', json={'category': 'Misc', 'limit': 100, 'month': '2025-03'})
+    client.post('/api/budgets', json={'category': 'Fun', 'limit': 200, 'month': '2025-03'})
+    client.post('/api/budgets', json={'category': 'Food', 'limit': 50, 'month': '2025-03'})
+    client.post('/api/budgets', json={'category': 'Misc', 'limit': 100, 'month': '2025-04'})
+
+    budgets = client.get('/api/budgets?month=2025-03').get_json()
+    assert [(b['category'], b['spent'], b['remaining'], b['percentage']) for b in budgets] == [
+        ('Food', 0, 50, 0), ('Fun', 80, 120, 40.0), ('Misc', 150, -50, 150.0)
+    ]
+    assert [b['spent'] for b in client.get('/api/budgets?month=2025-04').get_json()] == [999]
+    assert client.get('/api/budgets').get_json() == []
+    assert client.get('/api/budgets?month=March').status_code == 400
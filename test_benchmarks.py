@@ -0,0 +1,62 @@
+import random
+from datetime import date
+
+import pytest
+
+from app import app, db, report_jobs, MonthlyRollup, Transaction
+from benchmarks import datagen, suite
+
+TODAY = date(2025, 3, 12)
+
+
+def test_generated_rows_are_deterministic_and_shaped():
+    rows = list(datagen.user_transactions(random.Random('0:0'), 2000, TODAY, 730))
+    assert rows == list(datagen.user_transactions(random.Random('0:0'), 2000, TODAY, 730))
+    assert rows != list(datagen.user_transactions(random.Random('0:1'), 2000, TODAY, 730))
+
+    income = [r for r in rows if r[0] == 'income']
+    assert 0.05 < len(income) / len(rows) < 0.15
+    assert {r[4].day for r in rows if r[1] in ('Rent', 'Salary')} <= {1, 15}
+    assert all(r[2] > 0 and (TODAY - r[4].date()).days < 730 for r in rows)
+
+
+def test_generate_bulk_inserts_users_with_rollups(ctx):
+    user_ids = datagen.generate(3, 100, seed=1, today=TODAY)
+    assert len(user_ids) == 3
+    for user_id in user_ids:
+        assert Transaction.query.filter_by(user_id=user_id).count() == 100
+        rolled = db.session.query(db.func.sum(MonthlyRollup.count)).filter_by(user_id=user_id).scalar()
+        assert rolled == 100
+
+
+def test_suite_covers_every_route(ctx, tmp_path, monkeypatch):
+    monkeypatch.setitem(app.config, 'REPORTS_DIR', str(tmp_path))
+    user_ids = datagen.generate(2, 120, today=date.today())
+    try:
+        run = suite.run_suite(app, user_ids, date.today(), requests=2, warmup=0)
+    finally:
+        report_jobs.shutdown()
+    assert run['uncovered'] == []
+    failed = {name: r for name, r in run['results'].items() if r['errors']}
+    assert failed == {}
+    assert run['results']['dashboard [cold]']['p50_ms'] > 0
+
+
+def test_compare_flags_only_real_regressions():
+    meta = {'users': 10, 'transactions': 2000, 'seed': 0, 'concurrency': 1}
+    baseline = {'meta': meta, 'results': {
+        'a': {'errors': 0, 'p50_ms': 10.0, 'p95_ms': 20.0, 'throughput_rps': 100, 'peak_alloc_kib': 50},
+        'b': {'errors': 0, 'p50_ms': 0.4, 'p95_ms': 0.5, 'throughput_rps': 2500, 'peak_alloc_kib': 10},
+    }}
+    current = {'meta': dict(meta), 'results': {
+        'a': {'errors': 1, 'p50_ms': 16.0, 'p95_ms': 25.0, 'throughput_rps': 60, 'peak_alloc_kib': 50},
+        'b': {'errors': 0, 'p50_ms': 0.9, 'p95_ms': 1.4, 'throughput_rps': 1100, 'peak_alloc_kib': 12},
+        'new': {'errors': 0, 'p50_ms': 99.0, 'p95_ms': 99.0, 'throughput_rps': 10, 'peak_alloc_kib': 1},
+    }}
+    assert suite.compare(current, baseline) == [
+        'a: 1 failed requests (baseline 0)',
+        'a: p50_ms 10 -> 16 (+60%)',
+    ]
+
+    with pytest.raises(ValueError, match='transactions'):
+        suite.compare(dict(current, meta=dict(meta, transactions=500)), baseline)
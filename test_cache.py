@@ -0,0 +1,89 @@
+from datetime import datetime, timedelta
+
+import app as app_module
+from app import response_cache
+from cache import ResponseCache
+
+
+def test_repeat_reads_hit_and_revalidate_with_304(client):
+    client.post('/api/budgets', json={'category': 'Food', 'limit': 300})
+
+    first = client.get('/api/budgets')
+    etag = first.headers['ETag']
+    assert first.status_code == 200 and etag
+    before = response_cache.stats()
+
+    second = client.get('/api/budgets')
+    assert second.get_data() == first.get_data()
+    assert response_cache.stats()['hits'] == before['hits'] + 1
+
+    not_modified = client.get('/api/budgets', headers={'If-None-Match': etag})
+    assert not_modified.status_code == 304
+    assert not_modified.get_data() == b''
+    assert not_modified.headers['ETag'] == etag
+
+
+def test_writes_invalidate_cached_responses(client):
+    etag = client.get('/api/dashboard').headers['ETag']
+    client.post('/api/transactions', json={'type': 'income', 'category': 'Salary', 'amount': 50})
+
+    response = client.get('/api/dashboard', headers={'If-None-Match': etag})
+    assert response.status_code == 200
+    assert response.get_json()['totalIncome'] == 50
+    assert response.headers['ETag'] != etag
+
+    tid = client.get('/api/transactions').get_json()['transactions'][0]['id']
+    etag = client.get('/api/transactions').headers['ETag']
+    client.delete(f'/api/transactions/{tid}')
+    assert client.get('/api/transactions', headers={'If-None-Match': etag}).get_json()['transactions'] == []
+
+
+def test_date_dependent_responses_expire_with_the_day(client, monkeypatch):
+    client.post('/api/transactions', json={'type': 'income', 'category': 'Salary', 'amount': 50})
+    client.post('/api/budgets', json={'category': 'Food', 'limit': 300})
+    dashboard = client.get('/api/dashboard')
+    assert dashboard.get_json()['monthIncome'] == 50
+    assert len(client.get('/api/budgets').get_json()) == 1
+    periods = [m['period'] for m in client.get('/api/analytics/monthly?months=1').get_json()]
+
+    later = datetime.now() + timedelta(days=40)  # always next month or the one after
+
+    class Later(datetime):
+        @classmethod
+        def now(cls, tz=None):
+            return later
+
+    monkeypatch.setattr(app_module, 'datetime', Later)
+    # No write in between: only the date moved
+    response = client.get('/api/dashboard', headers={'If-None-Match': dashboard.headers['ETag']})
+    assert response.status_code == 200
+    assert response.get_json()['monthIncome'] == 0 and response.get_json()['totalIncome'] == 50
+    assert response.headers['ETag'] != dashboard.headers['ETag']
+    assert client.get('/api/budgets').get_json() == []
+    assert [m['period'] for m in client.get('/api/analytics/monthly?months=1').get_json()] != periods
+
+
+def test_cache_is_per_user_and_per_query(client):
+    client.post('/api/transactions', json={'type': 'expense', 'category': 'Food', 'amount': 5})
+    mine = client.get('/api/transactions').get_json()
+
+    from app import app
+    other = app.test_client()
+    other.post('/api/auth/signup', json={'username': 'eve', 'email': 'eve@example.com', 'password': 'pw'})
+    assert other.get('/api/transactions').get_json()['transactions'] == []
+    assert client.get('/api/transactions?type=income').get_json()['transactions'] == []
+    assert client.get('/api/transactions').get_json() == mine
+
+
+def test_lru_eviction_is_bounded_by_size():
+    cache = ResponseCache(max_bytes=10)
+    cache.put('a', 0, b'12345', 'application/json')
+    cache.put('b', 0, b'12345', 'application/json')
+    assert cache.get('a', 0)  # 'a' becomes most recently used
+    cache.put('c', 0, b'12345', 'application/json')
+
+    assert cache.get('b', 0) is None
+    assert cache.get('a', 0) and cache.get('c', 0)
+    assert cache.get('a', 1) is None  # stale version
+    stats = cache.stats()
+    assert (stats['entries'], stats['bytes'], stats['evictions']) == (2, 10, 1)
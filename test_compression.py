@@ -0,0 +1,109 @@
+import gzip
+import os
+import re
+import shutil
+
+import pytest
+
+import assets
+from app import app, response_cache
+from compression import negotiate
+
+
+def test_negotiate_respects_q_values_and_offers():
+    assert negotiate('gzip, deflate, br', ('br', 'gzip')) == 'br'
+    assert negotiate('gzip, deflate, br', ('gzip',)) == 'gzip'
+    assert negotiate('br;q=0, gzip;q=0.5', ('br', 'gzip')) == 'gzip'
+    assert negotiate('*;q=0.1', ('br', 'gzip')) == 'br'
+    assert negotiate('*, gzip;q=0', ('gzip',)) is None
+    assert negotiate('identity', ('br', 'gzip')) is None
+    assert negotiate('', ('gzip',)) is None
+
+
+def test_json_is_compressed_once_and_revalidates(client):
+    for n in range(40):
+        client.post('/api/transactions', json={'type': 'expense', 'category': 'Food', 'amount': n})
+    plain = client.get('/api/transactions')
+    assert 'Content-Encoding' not in plain.headers
+    assert plain.headers['Vary'].startswith('Accept-Encoding')
+
+    before = response_cache.stats()['bytes']
+    zipped = client.get('/api/transactions', headers={'Accept-Encoding': 'gzip'})
+    assert zipped.headers['Content-Encoding'] == 'gzip'
+    assert gzip.decompress(zipped.get_data()) == plain.get_data()
+    assert len(zipped.get_data()) < len(plain.get_data()) / 3
+    assert response_cache.stats()['bytes'] == before + len(zipped.get_data())
+    assert zipped.headers['ETag'] == 'W/' + plain.headers['ETag']
+
+    again = client.get('/api/transactions', headers={'Accept-Encoding': 'gzip'})
+    assert again.get_data() == zipped.get_data()
+    assert response_cache.stats()['bytes'] == before + len(zipped.get_data())
+
+    revalidated = client.get('/api/transactions', headers={'Accept-Encoding': 'gzip',
+                                                            'If-None-Match': zipped.headers['ETag']})
+    assert revalidated.status_code == 304
+
+
+def test_small_and_disabled_responses_stay_plain(client, monkeypatch):
+    small = client.get('/api/auth/me', headers={'Accept-Encoding': 'gzip'})
+    assert 'Content-Encoding' not in small.headers
+
+    monkeypatch.setitem(app.config, 'COMPRESS_ENABLED', False)
+    page = client.get('/static/js/dashboard.js', headers={'Accept-Encoding': 'gzip'})
+    assert 'Content-Encoding' not in page.headers
+    page.close()
+
+
+def test_minify_keeps_template_literals_and_strings():
+    source = (
+        "// header\n"
+        "function f(items) {\n"
+        "    /* block\n"
+        "       comment */\n"
+        "    const url = 'http://example.com';  // trailing\n"
+        "    return `<ul>\n"
+        "        // not a comment\n"
+        "        ${items.map(i => `<li>${i}</li>`).join('')}\n"
+        "    </ul>`;\n"
+        "}\n"
+    )
+    assert assets.minify_js(source) == (
+        "function f(items) {\n"
+        "const url = 'http://example.com';  // trailing\n"
+        "return `<ul>\n"
+        "        // not a comment\n"
+        "        ${items.map(i => `<li>${i}</li>`).join('')}\n"
+        "    </ul>`;\n"
+        "}\n"
+    )
+    assert assets.minify_css('/* c */\n.a  > .b :hover {\n  color: red;\n  margin: 0 auto;\n}\n') == \
+        '.a>.b :hover{color:red;margin:0 auto}\n'
+
+
+@pytest.fixture
+def built_static(tmp_path, monkeypatch):
+    static = tmp_path / 'static'
+    shutil.copytree(app.static_folder, static, ignore=shutil.ignore_patterns(assets.DIST_DIR))
+    monkeypatch.setattr(app, 'static_folder', str(static))
+    monkeypatch.setitem(app.extensions, 'assets', assets.build(str(static)))
+    return static
+
+
+def test_templates_link_fingerprinted_immutable_assets(ctx, built_static):
+    client = app.test_client()
+    html = client.get('/').get_data(as_text=True)
+    urls = re.findall(r'(?:href|src)="/static/([^"]+)"', html)
+    assert urls == [app.extensions['assets']['css/auth.css'], app.extensions['assets']['js/auth.js']]
+
+    for url in urls:
+        response = client.get('/static/' + url, headers={'Accept-Encoding': 'gzip'})
+        assert response.headers['Cache-Control'] == 'public, max-age=31536000, immutable'
+        assert response.headers['Content-Encoding'] == 'gzip'
+        assert response.mimetype in ('text/css', 'text/javascript')
+        with open(os.path.join(built_static, url), 'rb') as f:
+            assert gzip.decompress(response.get_data()) == f.read()
+        response.close()
+
+    plain = client.get('/static/' + urls[1])
+    assert 'Content-Encoding' not in plain.headers
+    plain.close()
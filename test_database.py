@@ -0,0 +1,49 @@
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.exc import OperationalError
+
+from database import current_pragmas, engine_options, install_sqlite_pragmas, sqlite_pragmas
+
+CONFIG = {
+    'DB_POOL_SIZE': 7, 'ANALYTICS_POOL_SIZE': 3, 'DB_MAX_OVERFLOW': 2, 'DB_POOL_TIMEOUT': 9,
+    'SQLITE_JOURNAL_MODE': 'WAL', 'SQLITE_SYNCHRONOUS': 'NORMAL', 'SQLITE_BUSY_TIMEOUT': 2500,
+    'SQLITE_CACHE_SIZE': -2000, 'SQLITE_MMAP_SIZE': 1048576, 'SQLITE_TEMP_STORE': '',
+}
+
+
+def test_engine_options():
+    assert engine_options('sqlite://', CONFIG) == {}
+    assert engine_options('sqlite:///finance.db', CONFIG) == {
+        'pool_size': 7, 'max_overflow': 2, 'pool_timeout': 9, 'connect_args': {'timeout': 2.5}
+    }
+    assert engine_options('sqlite:///finance.db', CONFIG, 'ANALYTICS_POOL_SIZE')['pool_size'] == 3
+    assert 'connect_args' not in engine_options('sqlite:///finance.db', dict(CONFIG, SQLITE_BUSY_TIMEOUT=''))
+
+
+def test_pragmas_applied_to_every_connection(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'f.db'}")
+    install_sqlite_pragmas(engine, sqlite_pragmas(CONFIG))
+    names = ['journal_mode', 'synchronous', 'busy_timeout', 'cache_size', 'mmap_size', 'query_only']
+
+    with engine.connect() as first, engine.connect() as second:
+        for connection in (first, second):
+            assert current_pragmas(connection, names) == {
+                'journal_mode': 'wal', 'synchronous': 1, 'busy_timeout': 2500,
+                'cache_size': -2000, 'mmap_size': 1048576, 'query_only': 0
+            }
+
+
+def test_read_only_pool_rejects_writes(tmp_path):
+    url = f"sqlite:///{tmp_path / 'f.db'}"
+    writer = create_engine(url)
+    install_sqlite_pragmas(writer, sqlite_pragmas(CONFIG))
+    with writer.begin() as connection:
+        connection.exec_driver_sql('CREATE TABLE t (x INTEGER)')
+        connection.exec_driver_sql('INSERT INTO t VALUES (1)')
+
+    reader = create_engine(url)
+    install_sqlite_pragmas(reader, sqlite_pragmas(CONFIG, read_only=True))
+    with reader.connect() as connection:
+        assert connection.exec_driver_sql('SELECT count(*) FROM t').scalar() == 1
+        with pytest.raises(OperationalError, match='readonly'):
+            connection.exec_driver_sql('INSERT INTO t VALUES (2)')
@@ -0,0 +1,75 @@
+import json
+
+from app import app, db, event_broker
+from events import EventBroker
+
+
+def frames(response):
+    """Parse an SSE response lazily into (event, data) pairs; keep-alives come back as (None, None)"""
+    for chunk in response.response:
+        chunk = chunk.decode() if isinstance(chunk, bytes) else chunk
+        fields = dict(line.split(': ', 1) for line in chunk.strip().split('\n') if not line.startswith(':'))
+        yield fields.get('event'), json.loads(fields['data']) if 'data' in fields else None
+
+
+def test_stream_pushes_deltas_and_summary(client):
+    response = client.get('/api/events', buffered=False)
+    assert response.mimetype == 'text/event-stream'
+    stream = frames(response)
+    assert next(stream) == ('hello', {'version': 0})
+
+    added = client.post('/api/transactions', json={'type': 'income', 'category': 'Salary', 'amount': 100}).get_json()
+    event, data = next(stream)
+    assert event == 'transaction.created'
+    assert data == dict(added, version=1)
+    event, data = next(stream)
+    assert event == 'summary' and data['totalIncome'] == 100 and data['balance'] == 100
+
+    client.post('/api/budgets', json={'category': 'Food', 'limit': 50})
+    assert next(stream)[0] == 'budget.created'
+    assert next(stream)[0] == 'summary'
+
+    client.delete(f"/api/transactions/{added['id']}")
+    assert next(stream) == ('transaction.deleted', {'id': added['id'], 'version': 3})
+    assert next(stream)[1]['totalIncome'] == 0
+
+    assert event_broker.stats()['subscribers'] == 1
+    response.close()
+    assert event_broker.stats()['subscribers'] == 0
+
+
+def test_failed_write_publishes_nothing(client):
+    sub = event_broker.subscribe(1)
+    try:
+        assert client.post('/api/transactions', json={'type': 'income', 'category': 'X'}).status_code == 400
+        assert sub.get(0) is None
+    finally:
+        event_broker.unsubscribe(sub)
+
+
+def test_resync_when_another_process_wrote(client, monkeypatch):
+    monkeypatch.setitem(app.config, 'EVENTS_HEARTBEAT', 0.01)
+    stream = frames(client.get('/api/events', buffered=False))
+    assert next(stream)[0] == 'hello'
+    assert next(stream) == (None, None)  # keep-alive
+
+    # A write committed by some other worker bumps the version without publishing here
+    db.session.execute(db.text('UPDATE user SET data_version = data_version + 1 WHERE id = 1'))
+    db.session.commit()
+    assert next(stream) == ('resync', {'version': 1})
+    assert next(stream) == (None, None)
+
+
+def test_slow_consumer_is_dropped():
+    broker = EventBroker(max_queue=2)
+    slow, fast = broker.subscribe(7), broker.subscribe(7)
+    assert broker.publish(7, 'a', {}) == 2
+    fast.get(0)
+    assert broker.publish(7, 'b', {}) == 2
+    fast.get(0)
+    assert broker.publish(7, 'c', {}) == 1  # slow's queue was full
+
+    assert slow.dropped and not fast.dropped
+    assert broker.stats() == {'users': 1, 'subscribers': 1, 'dropped': 1, 'max_queue': 2}
+    assert [slow.get(0).type, slow.get(0).type] == ['a', 'b']
+    assert broker.publish(8, 'x', {}) == 0
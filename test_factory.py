@@ -0,0 +1,62 @@
+import multiprocessing
+import os
+import sqlite3
+
+import migrations
+from app import create_app, db, load_secret_key, User
+
+
+def file_config(tmp_path, **overrides):
+    return dict({'SQLALCHEMY_DATABASE_URI': f"sqlite:///{tmp_path / 'f.db'}", 'SECRET_KEY': None,
+                 'SECRET_KEY_FILE': str(tmp_path / 'secret_key')}, **overrides)
+
+
+def boot_worker(config):
+    """Entry point of one spawned process; returns the secret key the app ended up with"""
+    return create_app(config).secret_key
+
+
+def test_workers_share_sessions_and_keep_data(tmp_path):
+    first = create_app(file_config(tmp_path))
+    client = first.test_client()
+    assert client.post('/api/auth/signup', json={'username': 'a', 'email': 'a@example.com',
+                                                 'password': 'pw'}).status_code == 201
+    cookie = client.get_cookie('session')
+
+    # A second worker (or a restart) reuses the stored key and finds the data intact
+    second = create_app(file_config(tmp_path))
+    assert second.secret_key == first.secret_key
+    other = second.test_client()
+    other.set_cookie('session', cookie.value)
+    assert other.get('/api/auth/me').get_json()['username'] == 'a'
+    with second.app_context():
+        assert db.session.query(User).count() == 1
+
+
+def test_secret_key_is_created_without_hard_links(tmp_path, monkeypatch):
+    def no_links(src, dst):
+        raise PermissionError(1, 'Operation not permitted')
+    monkeypatch.setattr(os, 'link', no_links)
+    path = str(tmp_path / 'keys' / 'secret_key')
+    key = load_secret_key(path)
+    assert len(key) == 32
+    assert load_secret_key(path) == key
+    assert os.listdir(tmp_path / 'keys') == ['secret_key']
+
+def test_explicit_config_wins(tmp_path):
+    app = create_app(file_config(tmp_path, SECRET_KEY='fixed', AUTO_MIGRATE=False, DB_POOL_SIZE=3))
+    assert app.secret_key == 'fixed'
+    assert not (tmp_path / 'secret_key').exists()
+    assert app.config['SQLALCHEMY_ENGINE_OPTIONS']['pool_size'] == 3
+    assert app.config['REPORTS_DIR'].endswith('reports')
+
+
+def test_concurrent_workers_boot_against_a_fresh_database(tmp_path):
+    # Six processes start at once, as gunicorn -w 6 would, and race to migrate and create the key
+    with multiprocessing.get_context('spawn').Pool(6) as pool:
+        keys = pool.map(boot_worker, [file_config(tmp_path)] * 6)
+    assert len(set(keys)) == 1
+    with sqlite3.connect(tmp_path / 'f.db') as conn:
+        assert conn.execute('PRAGMA user_version').fetchone()[0] == migrations.head_version()
+        tables = {name for name, in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+    assert {'user', 'transaction', 'recurring_rule'} <= tables
@@ -0,0 +1,117 @@
+import csv
+import io
+import json
+from calendar import timegm
+from datetime import datetime
+
+from app import db, Category, Transaction, MonthlyRollup, rebuild_rollups
+
+
+def rollup_snapshot():
+    return sorted((r.month, r.type, db.session.get(Category, r.category_id).name, round(r.total, 6), r.count)
+                  for r in MonthlyRollup.query.all())
+
+
+def test_csv_import_with_error_report(client):
+    body = (
+        'type,category,amount,description,date\n'
+        'income,Salary,2500,March pay,2025-03-01\n'
+        'expense,Food,12.5,,2025-03-02 18:30\n'
+        'expense,,10,missing category,2025-03-02\n'
+        'transfer,Food,10,,2025-03-02\n'
+        'expense,Rent,abc,,2025-03-02\n'
+        'expense,Rent,900,,not-a-date\n'
+        'expense,Rent,900,,\n'
+    )
+    response = client.post('/api/transactions/import', data=body, content_type='text/csv')
+    assert response.status_code == 201
+    report = response.get_json()
+    assert report['imported'] == 3
+    assert report['failed'] == 4
+    assert [e['line'] for e in report['errors']] == [4, 5, 6, 7]
+
+    assert Transaction.query.count() == 3
+    assert client.get('/api/dashboard').get_json()['totalIncome'] == 2500
+
+
+def test_jsonl_import_keeps_rollups_consistent(client):
+    lines = [json.dumps({'type': 'expense', 'category': f'C{i % 7}', 'amount': i + 0.25,
+                         'date': f'2024-{i % 12 + 1:02d}-15'}) for i in range(12000)]
+    lines.insert(3, '{broken json')
+    response = client.post('/api/transactions/import?format=jsonl', data='\n'.join(lines))
+    report = response.get_json()
+    assert report['imported'] == 12000
+    assert report['errors'] == [{'line': 4, 'error': report['errors'][0]['error']}]
+
+    incremental = rollup_snapshot()
+    rebuild_rollups()
+    assert rollup_snapshot() == incremental
+
+
+def test_jsonl_rows_with_non_string_fields_are_reported(client):
+    lines = [
+        {'type': 'expense', 'category': 'Food', 'amount': 2},
+        {'type': 'expense', 'category': 5, 'amount': 2},
+        {'type': ['expense'], 'category': 'Food', 'amount': 2},
+        {'type': 'income', 'category': 'Gift', 'amount': 3, 'description': {'note': 'x'}},
+        {'type': 'income', 'category': 'Gift', 'amount': 4, 'description': None},
+    ]
+    response = client.post('/api/transactions/import?format=jsonl', data='\n'.join(map(json.dumps, lines)))
+    assert response.status_code == 201
+    report = response.get_json()
+    assert report['imported'] == 2
+    assert [(e['line'], e['error']) for e in report['errors']] == [
+        (2, 'category must be a string'), (3, 'type must be a string'), (4, 'description must be a string')]
+    assert Transaction.query.count() == 2
+
+
+def test_offset_dates_are_stored_as_local_time(client):
+    body = 'type,category,amount,date\nexpense,Food,5,2025-01-31T10:00:00+02:00\n'
+    assert client.post('/api/transactions/import', data=body, content_type='text/csv').get_json()['imported'] == 1
+    local = datetime.fromisoformat('2025-01-31T10:00:00+02:00').astimezone().replace(tzinfo=None)
+
+    # The ORM, the CSV export and the columnar epoch all read back the same wall-clock time
+    assert Transaction.query.one().date == local
+    [row] = client.get('/api/transactions').get_json()['transactions']
+    assert row['date'] == local.strftime('%Y-%m-%d %H:%M')
+    [exported] = csv.DictReader(io.StringIO(client.get('/api/transactions/export.csv').get_data(as_text=True)))
+    assert datetime.fromisoformat(exported['date']) == local
+    assert client.get('/api/transactions?format=columnar').get_json()['date'] == [timegm(local.timetuple())]
+
+def test_multipart_upload_and_bad_format(client):
+    data = {'file': (io.BytesIO(b'type,category,amount\nincome,Gift,20\n'), 'history.csv')}
+    response = client.post('/api/transactions/import', data=data, content_type='multipart/form-data')
+    assert response.get_json()['imported'] == 1
+
+    assert client.post('/api/transactions/import', data='x', content_type='text/plain').status_code == 400
+    response = client.post('/api/transactions/import', data='kind,amount\nincome,2\n', content_type='text/csv')
+    assert response.status_code == 400
+    assert 'type' in response.get_json()['error']
+
+
+def test_export_streams_filtered_csv_that_round_trips(client):
+    body = 'type,category,amount,description,date\n' + ''.join(
+        f'{"income" if i % 5 == 0 else "expense"},C{i % 3},{i}.5,"note, {i}",2025-01-{i % 28 + 1:02d} 09:15\n'
+        for i in range(5000)
+    )
+    client.post('/api/transactions/import', data=body, content_type='text/csv')
+
+    response = client.get('/api/transactions/export.csv')
+    assert response.is_streamed
+    assert response.mimetype == 'text/csv'
+    assert 'attachment' in response.headers['Content-Disposition']
+    rows = list(csv.DictReader(io.StringIO(response.get_data(as_text=True))))
+    assert len(rows) == 5000
+    assert rows[0]['date'] >= rows[-1]['date']
+    assert {r['description'] for r in rows[:3]} <= {f'note, {i}' for i in range(5000)}
+
+    filtered = client.get('/api/transactions/export.csv?type=income&category=C0').get_data(as_text=True)
+    filtered_rows = list(csv.DictReader(io.StringIO(filtered)))
+    assert len(filtered_rows) == len([i for i in range(5000) if i % 5 == 0 and i % 3 == 0])
+    assert client.get('/api/transactions/export.csv?end_date=soon').status_code == 400
+
+    # The export is itself a valid import file
+    before = Transaction.query.count()
+    report = client.post('/api/transactions/import', data=filtered, content_type='text/csv').get_json()
+    assert report['imported'] == len(filtered_rows) and report['failed'] == 0
+    assert Transaction.query.count() == before + len(filtered_rows)
@@ -0,0 +1,131 @@
+from datetime import datetime, timedelta
+import random
+import sqlite3
+
+import numpy as np
+
+from app import (db, category_ids, column_store, create_app, response_cache, Transaction, analytics_insights,
+                 user_columns)
+from analytics import rolling_mean
+
+
+def test_insights_match_python_reference(make_user):
+    user = make_user('alice')
+    rng = random.Random(7)
+    now = datetime(2025, 6, 18, 9, 0)  # a Wednesday
+    ids = category_ids(user.id, ['Food', 'Rent', 'Salary', 'Fun'])
+    rows = []
+    for _ in range(3000):
+        kind = rng.choice(['income', 'expense', 'expense'])
+        category = rng.choice(['Food', 'Rent', 'Salary', 'Fun'])
+        amount = round(rng.uniform(1, 500), 2)
+        date = now - timedelta(days=rng.randint(0, 500), minutes=rng.randint(0, 1439))
+        rows.append((kind, category, amount, date))
+        db.session.add(Transaction(user_id=user.id, type=kind, category_id=ids[category], amount=amount, date=date))
+    db.session.commit()
+
+    data = analytics_insights(user.id, months=6, weeks=4, window=3, now=now)
+
+    assert data['transactions'] == 3000
+    periods = ['2025-01', '2025-02', '2025-03', '2025-04', '2025-05', '2025-06']
+    assert [m['period'] for m in data['monthly']] == periods
+    for month in data['monthly']:
+        income = sum(a for k, c, a, d in rows if k == 'income' and d.strftime('%Y-%m') == month['period'])
+        expenses = sum(a for k, c, a, d in rows if k == 'expense' and d.strftime('%Y-%m') == month['period'])
+        assert abs(month['income'] - income) < 0.005
+        assert abs(month['expenses'] - expenses) < 0.005
+
+    expected = [m['expenses'] for m in data['monthly']]
+    assert data['rolling_expenses'][0] == round(expected[0], 2)
+    assert abs(data['rolling_expenses'][-1] - sum(expected[-3:]) / 3) < 0.01
+
+    assert [w['week_start'] for w in data['weekly_expenses']] == ['2025-05-26', '2025-06-02', '2025-06-09',
+                                                                  '2025-06-16']
+    this_week = sum(a for k, c, a, d in rows if k == 'expense' and d.date() >= datetime(2025, 6, 16).date())
+    assert abs(data['weekly_expenses'][-1]['expenses'] - this_week) < 0.005
+
+    totals = {}
+    for k, c, a, d in rows:
+        if k == 'expense':
+            totals[c] = totals.get(c, 0) + a
+    assert [c['category'] for c in data['category_expenses']] == sorted(totals, key=totals.get, reverse=True)
+    assert all(abs(c['total'] - totals[c['category']]) < 0.005 for c in data['category_expenses'])
+
+    expense_amounts = [a for k, c, a, d in rows if k == 'expense']
+    assert abs(data['expense_percentiles']['p50'] - float(np.percentile(expense_amounts, 50))) < 0.01
+
+
+def test_columns_reload_after_write(client):
+    client.post('/api/transactions', json={'type': 'expense', 'category': 'Food', 'amount': 12.5})
+    first = user_columns(1)
+    assert user_columns(1) is first
+
+    client.post('/api/transactions', json={'type': 'income', 'category': 'Salary', 'amount': 100})
+    second = user_columns(1)
+    assert second is not first
+    assert sorted(second.cents) == [1250, 10000]
+    assert second.categories == ['Food', 'Salary']
+
+    data = client.get('/api/analytics/insights?months=3&weeks=2').get_json()
+    assert len(data['monthly']) == 3 and len(data['weekly_expenses']) == 2
+    assert data['monthly'][-1]['net'] == 87.5
+    assert data['expense_percentiles'] == {'p50': 12.5, 'p90': 12.5, 'p99': 12.5}
+
+
+def test_insights_empty_user(client):
+    data = client.get('/api/analytics/insights').get_json()
+    assert data['transactions'] == 0
+    assert all(m['income'] == 0 and m['expenses'] == 0 for m in data['monthly'])
+    assert data['category_expenses'] == [] and data['expense_percentiles']['p99'] == 0
+
+
+def test_rolling_mean():
+    assert list(rolling_mean([3, 6, 9, 12], 2)) == [3, 4.5, 7.5, 10.5]
+    assert list(rolling_mean([], 3)) == []
+
+
+def test_insights_default_to_local_today(make_user, monkeypatch):
+    import app as app_module
+
+    class Clock(datetime):
+        """Half past midnight local time on March 1st, still February 28th in UTC"""
+        @classmethod
+        def now(cls, tz=None):
+            return datetime(2025, 3, 1, 0, 30)
+
+        @classmethod
+        def utcnow(cls):
+            return datetime(2025, 2, 28, 23, 30)
+
+    user = make_user('dave')
+    monkeypatch.setattr(app_module, 'datetime', Clock)
+    data = analytics_insights(user.id, months=1, weeks=1)
+    assert [m['period'] for m in data['monthly']] == ['2025-03']
+
+
+def test_lagging_analytics_replica_is_not_cached_as_current(tmp_path):
+    primary, replica = tmp_path / 'f.db', tmp_path / 'replica.db'
+    app = create_app({'SQLALCHEMY_DATABASE_URI': f'sqlite:///{primary}',
+                      'ANALYTICS_DATABASE_URL': f'sqlite:///{replica}', 'SECRET_KEY': 'test'})
+    column_store.clear()
+    response_cache.clear()
+
+    def replicate():
+        with sqlite3.connect(primary) as source, sqlite3.connect(replica) as target:
+            source.backup(target)
+
+    client = app.test_client()
+    client.post('/api/auth/signup', json={'username': 'a', 'email': 'a@example.com', 'password': 'pw'})
+    client.post('/api/transactions', json={'type': 'expense', 'category': 'Food', 'amount': 10})
+    replicate()
+    client.post('/api/transactions', json={'type': 'expense', 'category': 'Food', 'amount': 30})
+
+    def total():
+        [food] = client.get('/api/analytics/insights').get_json()['category_expenses']
+        return food['total']
+
+    assert total() == 10  # the replica has not seen the second write yet
+    replicate()
+    assert total() == 40
+    column_store.clear()
+    response_cache.clear()
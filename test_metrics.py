@@ -0,0 +1,72 @@
+import time
+
+import pytest
+from flask import g
+from sqlalchemy.exc import OperationalError
+
+from app import _after_cursor_execute, app, create_app, db, start_request_metrics
+from metrics import Registry
+
+
+def sample(text, prefix):
+    """Value of the first exposition line starting with `prefix`"""
+    return next(float(line.rsplit(' ', 1)[1]) for line in text.splitlines() if line.startswith(prefix))
+
+
+def test_routes_report_latency_and_query_counts(client):
+    before = client.get('/metrics').get_data(as_text=True)
+    client.get('/api/dashboard')
+    client.get('/api/dashboard')
+    client.post('/api/transactions', json={'type': 'income', 'category': 'Salary', 'amount': 5})
+
+    response = client.get('/metrics')
+    assert response.content_type.startswith('text/plain; version=0.0.4')
+    text = response.get_data(as_text=True)
+
+    def delta(prefix):
+        return sample(text, prefix) - (sample(before, prefix) if prefix in before else 0)
+
+    assert '# TYPE http_request_duration_seconds histogram' in text
+    assert delta('http_request_duration_seconds_count{endpoint="main.get_dashboard",method="GET"}') == 2
+    assert delta('http_requests_total{endpoint="main.add_transaction",method="POST",status="201"}') == 1
+    # insert + rollup upsert + data_version bump, at least
+    assert delta('http_request_db_queries_sum{endpoint="main.add_transaction"}') >= 3
+    assert delta('http_request_db_seconds_count{endpoint="main.add_transaction"}') == 1
+    assert 'http_request_duration_seconds_bucket{endpoint="main.get_dashboard",method="GET",le="+Inf"}' in text
+    assert sample(text, 'response_cache_entries') >= 1
+
+
+def test_failed_statements_are_timed_and_leave_nothing_behind(ctx):
+    connection = db.session.connection()
+    with app.test_request_context():
+        start_request_metrics()
+        with pytest.raises(OperationalError):
+            connection.exec_driver_sql('SELECT * FROM missing_table')
+        time.sleep(0.2)
+        connection.exec_driver_sql('SELECT 1')
+        assert g.db_queries == 2
+        assert g.db_seconds < 0.2
+    assert 'query_start' not in connection.connection.info
+
+def test_metrics_can_be_switched_off(tmp_path):
+    app = create_app({'SQLALCHEMY_DATABASE_URI': f"sqlite:///{tmp_path / 'f.db'}", 'METRICS_ENABLED': False})
+    assert app.test_client().get('/metrics').status_code == 404
+    assert not app.before_request_funcs.get(None)
+    with app.app_context():
+        assert not db.event.contains(db.engine, 'after_cursor_execute', _after_cursor_execute)
+
+
+def test_histogram_exposition():
+    registry = Registry()
+    hist = registry.histogram('latency_seconds', 'Latency', ('route',), buckets=(0.1, 1))
+    for value in (0.05, 0.1, 0.5, 3):
+        hist.observe(('a"b',), value)
+    assert registry.render().splitlines() == [
+        '# HELP latency_seconds Latency',
+        '# TYPE latency_seconds histogram',
+        'latency_seconds_bucket{route="a\\"b",le="0.1"} 2',
+        'latency_seconds_bucket{route="a\\"b",le="1"} 3',
+        'latency_seconds_bucket{route="a\\"b",le="+Inf"} 4',
+        'latency_seconds_sum{route="a\\"b"} 3.65',
+        'latency_seconds_count{route="a\\"b"} 4',
+    ]
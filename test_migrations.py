@@ -0,0 +1,63 @@
+import sqlite3
+
+from sqlalchemy import create_engine, inspect
+
+import migrations
+
+OLD_SCHEMA = """
+CREATE TABLE user (id INTEGER PRIMARY KEY, username VARCHAR(80), email VARCHAR(120),
+                   password VARCHAR(200), created_at DATETIME);
+CREATE TABLE "transaction" (id INTEGER PRIMARY KEY, user_id INTEGER, type VARCHAR(50),
+                            category VARCHAR(100), amount FLOAT, description VARCHAR(500), date DATETIME);
+CREATE TABLE budget (id INTEGER PRIMARY KEY, user_id INTEGER, category VARCHAR(100),
+                     "limit" FLOAT, month VARCHAR(7));
+CREATE TABLE savings_goal (id INTEGER PRIMARY KEY, user_id INTEGER, name VARCHAR(200), target FLOAT,
+                           current FLOAT, deadline DATETIME, priority VARCHAR(50));
+INSERT INTO user VALUES (1, 'alice', 'a@example.com', 'x', '2025-01-01 00:00:00');
+INSERT INTO "transaction" VALUES (1, 1, 'income', 'Salary', 100.0, 'January salary', '2025-01-02 00:00:00');
+INSERT INTO budget VALUES (1, 1, 'Food', 50.0, '2025-01');
+"""
+
+
+def test_upgrade_adds_indexes_without_losing_data(tmp_path):
+    path = tmp_path / 'old.db'
+    conn = sqlite3.connect(path)
+    conn.executescript(OLD_SCHEMA)
+    conn.close()
+
+    engine = create_engine(f'sqlite:///{path}')
+    assert migrations.upgrade(engine) == [v for v, _, _ in migrations.MIGRATIONS]
+    assert migrations.upgrade(engine) == []
+
+    inspector = inspect(engine)
+    names = {ix['name'] for table in ('transaction', 'budget', 'savings_goal') for ix in inspector.get_indexes(table)}
+    assert {name for name, _, _ in migrations.USER_INDEXES} <= names
+    with engine.connect() as conn:
+        assert conn.exec_driver_sql('SELECT amount FROM "transaction"').scalar() == 100.0
+        assert conn.exec_driver_sql(
+            'SELECT month, c.name, total, count FROM monthly_rollup JOIN category c ON c.id = category_id'
+        ).fetchall() == [('2025-01', 'Salary', 100.0, 1)]
+        assert conn.exec_driver_sql(
+            'SELECT c.name FROM "transaction" t JOIN category c ON c.id = t.category_id '
+            'UNION ALL SELECT c.name FROM budget b JOIN category c ON c.id = b.category_id'
+        ).scalars().all() == ['Salary', 'Food']
+        assert conn.exec_driver_sql("SELECT rowid FROM transaction_search WHERE transaction_search MATCH 'u1xsal*'").scalar() == 1
+        assert migrations.current_version(conn) == migrations.head_version()
+
+
+def test_upgraded_tables_match_the_models(tmp_path):
+    from app import db
+
+    path = tmp_path / 'old.db'
+    conn = sqlite3.connect(path)
+    conn.executescript(OLD_SCHEMA)
+    conn.close()
+    engine = create_engine(f'sqlite:///{path}')
+    migrations.upgrade(engine)
+
+    inspector = inspect(engine)
+    for table in db.metadata.sorted_tables:
+        if inspector.has_table(table.name):
+            assert {c['name'] for c in inspector.get_columns(table.name)} == set(table.columns.keys()), table.name
+            indexes = {ix['name']: tuple(ix['column_names']) for ix in inspector.get_indexes(table.name)}
+            assert indexes == {ix.name: tuple(c.name for c in ix.columns) for ix in table.indexes}, table.name
@@ -0,0 +1,84 @@
+import threading
+from datetime import datetime
+
+import recurring
+from app import (app, db, dashboard_summary, materialize_due, recurring_projection, upcoming_occurrences,
+                 RecurringRule, Transaction)
+
+
+def add_rule(client, **fields):
+    body = dict({'type': 'expense', 'category': 'Rent', 'amount': 100, 'frequency': 'monthly'}, **fields)
+    response = client.post('/api/recurring', json=body)
+    assert response.status_code == 201, response.get_json()
+    return response.get_json()
+
+
+def test_occurrences_are_counted_from_the_start_date():
+    start = datetime(2024, 1, 31)
+    dates = [when for _, when in recurring.occurrences(start, 'monthly', 0, datetime(2024, 5, 31))]
+    assert [d.day for d in dates] == [31, 29, 31, 30, 31]
+    for frequency in recurring.FREQUENCIES:
+        for when in (datetime(2023, 1, 1), datetime(2024, 3, 1), datetime(2024, 3, 31), datetime(2031, 7, 4, 12)):
+            n = recurring.first_index_from(start, frequency, when)
+            assert recurring.occurrence(start, frequency, n) >= when
+            assert n == 0 or recurring.occurrence(start, frequency, n - 1) < when
+    assert recurring.next_date(start, 'yearly', 2, end=datetime(2025, 12, 31)) is None
+
+
+def test_scheduler_writes_due_occurrences_once(client):
+    rule = add_rule(client, start_date='2024-01-31', end_date='2024-06-30', description='Flat')
+    assert rule['next_date'] == '2024-01-31' and rule['materialized'] == 0
+    assert Transaction.query.count() == 0
+
+    assert materialize_due(datetime(2024, 4, 15)) == 3
+    assert materialize_due(datetime(2024, 4, 15)) == 0
+    assert [t.date.strftime('%Y-%m-%d') for t in Transaction.query.order_by(Transaction.date)] == [
+        '2024-01-31', '2024-02-29', '2024-03-31']
+    [listed] = client.get('/api/recurring').get_json()
+    assert (listed['materialized'], listed['next_date']) == (3, '2024-04-30')
+
+    # The rest of the rule is only projected; nothing past end_date
+    projection = recurring_projection(1, 4, datetime(2024, 4, 15))
+    assert [(m['period'], m['expenses']) for m in projection] == [
+        ('2024-04', 100), ('2024-05', 100), ('2024-06', 100), ('2024-07', 0)]
+    assert Transaction.query.count() == 3
+
+    result = app.test_cli_runner().invoke(args=['materialize-recurring'])
+    assert result.exit_code == 0 and 'Wrote 3 recurring' in result.output
+    assert db.session.get(RecurringRule, rule['id']).next_date is None
+    assert client.get('/api/sync?since=0').get_json()['transactions']['upserted'][-1]['description'] == 'Flat'
+
+
+def test_long_rules_are_one_row_and_expand_lazily(client):
+    add_rule(client, type='income', category='Salary', amount=3000, start_date='2020-01-01', end_date='2029-12-31')
+    daily = add_rule(client, category='Coffee', amount=4, frequency='daily', start_date='2020-01-01')
+    assert RecurringRule.query.count() == 2 and Transaction.query.count() == 0
+
+    # Projections start at the current month, however far back the rule began
+    now = datetime(2025, 2, 10)
+    summary = dashboard_summary(1, now)
+    assert summary['projectedMonthIncome'] == 3000
+    assert summary['projectedMonthExpenses'] == 28 * 4
+    assert [d['date'] for d in upcoming_occurrences(1, 3)] == ['2020-01-01', '2020-01-01', '2020-01-02']
+
+    assert client.delete(f"/api/recurring/{daily['id']}").status_code == 200
+    assert [m['expenses'] for m in recurring_projection(1, 2, now)] == [0, 0]
+    bundle = client.get('/api/analytics/bundle?projection=2').get_json()
+    assert len(bundle['projection']) == 2 and bundle['upcoming'][0]['category'] == 'Salary'
+
+
+def test_rules_are_validated(client):
+    for body in ({'frequency': 'hourly'}, {'type': 'transfer'}, {'start_date': '2024-02-01', 'end_date': '2024-01-01'},
+                 {'start_date': '01/02/2024'}):
+        data = dict({'type': 'expense', 'category': 'Rent', 'amount': 1, 'frequency': 'weekly'}, **body)
+        assert client.post('/api/recurring', json=data).status_code == 400
+    assert client.delete('/api/recurring/99').status_code == 404
+
+
+def test_scheduler_thread_runs_until_stopped():
+    ran = threading.Event()
+    scheduler = recurring.Scheduler(0.01)
+    scheduler.start(ran.set)
+    assert ran.wait(5)
+    scheduler.stop()
+    assert not scheduler.running
@@ -0,0 +1,131 @@
+import os
+import subprocess
+import sys
+import time
+
+import pytest
+
+from app import app, report_jobs
+from reports import PENDING_TIMEOUT, ReportJobs, render_job
+
+
+@pytest.fixture
+def reports_dir(tmp_path, monkeypatch):
+    monkeypatch.setitem(app.config, 'REPORTS_DIR', str(tmp_path))
+    yield tmp_path
+    report_jobs.shutdown()
+
+
+def wait_for(client, job):
+    deadline = time.time() + 60
+    while time.time() < deadline:
+        status = client.get(job['status_url']).get_json()['status']
+        if status != 'pending':
+            return status
+        time.sleep(0.1)
+    raise AssertionError('report did not finish')
+
+
+def test_report_is_rendered_in_background_and_cached(client, reports_dir):
+    client.post('/api/transactions', json={'type': 'income', 'category': 'Salary', 'amount': 3000})
+    client.post('/api/transactions', json={'type': 'expense', 'category': 'Food', 'amount': 120})
+    client.post('/api/budgets', json={'category': 'Food', 'limit': 300})
+    client.post('/api/goals', json={'name': 'Holiday', 'target': 1000})
+
+    response = client.post('/api/reports', json={'period': 'monthly'})
+    assert response.status_code == 202
+    job = response.get_json()
+    assert wait_for(client, job) == 'done'
+
+    pdf = client.get(job['download_url'])
+    assert pdf.status_code == 200
+    assert pdf.mimetype == 'application/pdf'
+    assert pdf.get_data().startswith(b'%PDF')
+
+    # Unchanged data: served from the disk cache without a new render
+    again = client.post('/api/reports', json={'period': 'monthly'})
+    assert again.status_code == 200
+    assert again.get_json()['job_id'] == job['job_id']
+
+    # A write moves the data version, so the next request renders a fresh report
+    client.post('/api/transactions', json={'type': 'expense', 'category': 'Food', 'amount': 5})
+    fresh = client.post('/api/reports', json={'period': 'monthly'}).get_json()
+    assert fresh['job_id'] != job['job_id']
+    assert wait_for(client, fresh) == 'done'
+    assert client.get(job['download_url']).status_code == 404
+    assert [p.name for p in (reports_dir / '1').glob('*.pdf')] == [fresh['job_id'] + '.pdf']
+
+    yearly = client.post('/api/reports', json={'period': 'yearly', 'year': 2024}).get_json()
+    assert yearly['job_id'].startswith('yearly-2024-v')
+    assert wait_for(client, yearly) == 'done'
+
+
+def test_job_state_is_shared_through_the_reports_dir(client, reports_dir):
+    job = client.post('/api/reports', json={'period': 'yearly', 'year': 2024}).get_json()
+    # Another worker process: no in-memory state, only the files
+    other = ReportJobs()
+    assert other.status(str(reports_dir), 1, job['job_id']) in ('pending', 'done')
+    assert wait_for(client, job) == 'done'
+    assert other.status(str(reports_dir), 1, job['job_id']) == 'done'
+    assert [p.name for p in (reports_dir / '1').glob('*.pdf')] == [job['job_id'] + '.pdf']
+
+    # A render whose process died leaves a pending marker behind; it times out as failed
+    stale = reports_dir / '1' / 'monthly-2023-01-v1.pending'
+    stale.touch()
+    assert other.status(str(reports_dir), 1, 'monthly-2023-01-v1') == 'pending'
+    os.utime(stale, (time.time() - PENDING_TIMEOUT - 1,) * 2)
+    assert client.get('/api/reports/monthly-2023-01-v1').get_json()['status'] == 'failed'
+
+    # A render that raises records the failure for every process
+    base = reports_dir / '1' / 'monthly-2023-02-v1'
+    open(f'{base}.pending', 'w').close()
+    with pytest.raises(Exception):
+        render_job({}, f'{base}.pdf', f'{base}.pending', f'{base}.failed')
+    assert other.status(str(reports_dir), 1, 'monthly-2023-02-v1') == 'failed'
+    assert not os.path.exists(f'{base}.pending')
+
+
+def test_report_validation_and_unknown_jobs(client, reports_dir):
+    assert client.post('/api/reports', json={'period': 'weekly'}).status_code == 400
+    assert client.post('/api/reports', json={'period': 'monthly', 'month': '2025-13'}).status_code == 400
+    # strptime takes these, but they would not round-trip through a job id
+    for month in ('2025-1', ' 2025-01', 202501):
+        assert client.post('/api/reports', json={'period': 'monthly', 'month': month}).status_code == 400
+    assert client.post('/api/reports', json={'period': 'yearly', 'year': '٢٠٢٤'}).status_code == 400
+    assert client.post('/api/reports', json={'period': 'yearly', 'year': 'soon'}).status_code == 400
+    assert client.get('/api/reports/yearly-2020-v1').status_code == 404
+    assert client.get('/api/reports/../../etc/download').status_code == 404
+    assert client.get('/api/reports/yearly-2020-v1/download').status_code == 404
+
+
+# Runs app.py as `python app.py` would, with the dev server swapped for one report request
+RUN_AS_MAIN = """
+import runpy, sys, time, flask
+
+def serve(app, **kwargs):
+    app.config['REPORTS_DIR'] = sys.argv[1]
+    client = app.test_client()
+    client.post('/api/auth/signup', json={'username': 'a', 'email': 'a@example.com', 'password': 'pw'})
+    job = client.post('/api/reports', json={'period': 'yearly', 'year': 2024}).get_json()
+    while client.get(job['status_url']).get_json()['status'] == 'pending':
+        time.sleep(0.1)
+    print('status', client.get(job['status_url']).get_json()['status'])
+    pool = sys.modules['__main__'].report_jobs._pool()
+    print('worker', pool.submit(eval, "'app' in __import__('sys').modules, "
+                                      "hasattr(__import__('sys').modules['__mp_main__'], 'app')").result())
+
+flask.Flask.run = serve
+runpy.run_path('app.py', run_name='__main__')
+"""
+
+
+def test_report_workers_do_not_build_a_second_app(tmp_path):
+    env = dict(os.environ, DATABASE_URL=f"sqlite:///{tmp_path / 'f.db'}", SECRET_KEY='test-secret')
+    result = subprocess.run([sys.executable, '-c', RUN_AS_MAIN, str(tmp_path / 'reports')], env=env,
+                            cwd=os.path.dirname(os.path.abspath(__file__)), capture_output=True, text=True,
+                            timeout=120)
+    assert result.returncode == 0, result.stderr
+    assert 'status done' in result.stdout
+    # The worker neither imported the app module nor ran create_app() in its own copy of app.py
+    assert 'worker (False, False)' in result.stdout
+    assert result.stdout.count('[OK] Database initialized') == 1
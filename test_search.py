@@ -0,0 +1,94 @@
+from datetime import datetime
+
+from app import app, db, get_category, import_rows, Transaction
+import search
+
+
+def add(client, description, category='Food', amount=5):
+    return client.post('/api/transactions', json={
+        'type': 'expense', 'category': category, 'amount': amount, 'description': description
+    }).get_json()['id']
+
+
+def found(client, query):
+    return [t['id'] for t in client.get(f'/api/transactions/search?{query}').get_json()['results']]
+
+
+def test_terms_and_match_expression():
+    assert search.terms(7, 'Café-bar lunch_box!') == 'u7xcafé u7xbar u7xlunch u7xbox'
+    assert search.terms(7, None) == ''
+    assert search.match_expression(7, 'Lunch  bo') == '"u7xlunch"* "u7xbo"*'
+    assert search.match_expression(7, ' "*- ') is None
+
+
+def test_prefix_match_ranking_and_pages(client):
+    lunch = add(client, 'Lunch')
+    lunch_bob = add(client, 'Lunch with Bob, lunch money back')
+    lunchbox = add(client, 'lunchbox')
+    add(client, 'Coffee')
+
+    assert set(found(client, 'q=lun')) == {lunch, lunch_bob, lunchbox}
+    assert found(client, 'q=lunch+bo') == [lunch_bob]
+    assert found(client, 'q=LUNCH+with') == [lunch_bob]
+
+    first = client.get('/api/transactions/search?q=lun&limit=2').get_json()
+    assert first['next_offset'] == 2
+    second = client.get('/api/transactions/search?q=lun&limit=2&offset=2').get_json()
+    assert second['next_offset'] is None
+    assert len({t['id'] for t in first['results'] + second['results']}) == 3
+
+    assert client.get('/api/transactions/search?q=%21%21').status_code == 400
+    assert client.get('/api/transactions/search').status_code == 400
+
+
+def test_filters_and_users_are_isolated(client, make_user):
+    food = add(client, 'Groceries')
+    add(client, 'Groceries delivery', category='Shopping')
+    import_rows(make_user('other').id, [(0, ('expense', 'Food', 3.0, 'Groceries', datetime(2024, 1, 1)), None)])
+    import_rows(1, [(0, ('expense', 'Food', 4.0, 'Old groceries', datetime(2024, 1, 1)), None)])
+    old = Transaction.query.filter_by(user_id=1, description='Old groceries').one().id
+
+    assert len(found(client, 'q=groc')) == 3
+    assert set(found(client, 'q=groc&category=Food')) == {food, old}
+    assert found(client, 'q=groc&end_date=2024-12-31') == [old]
+    assert client.get('/api/transactions/search?q=groc&start_date=bad').status_code == 400
+
+
+def test_index_follows_deletes_updates_and_rebuilds(client):
+    tid = add(client, 'Taxi home')
+    client.delete(f'/api/transactions/{tid}')
+    assert found(client, 'q=taxi') == []
+
+    tid = add(client, 'Train ticket')
+    db.session.expire_all()
+    db.session.get(Transaction, tid).description = 'Bus ticket'
+    db.session.commit()
+    assert found(client, 'q=train') == []
+    assert found(client, 'q=bus') == [tid]
+
+    # Moving it to another category changes no terms; the category filter follows the row
+    db.session.expire_all()
+    db.session.get(Transaction, tid).category = get_category(1, 'Travel')
+    db.session.commit()
+    assert found(client, 'q=bus') == [tid]
+    assert found(client, 'q=bus&category=Travel') == [tid]
+    assert found(client, 'q=bus&category=Food') == []
+    [result] = client.get('/api/transactions/search?q=bus').get_json()['results']
+    assert result['category'] == 'Travel'
+
+    # Category and description together: old terms out, new terms in
+    db.session.expire_all()
+    transaction = db.session.get(Transaction, tid)
+    transaction.category, transaction.description = get_category(1, 'Food'), 'Coach ticket'
+    db.session.commit()
+    assert found(client, 'q=bus') == []
+    assert found(client, 'q=coach&category=Food') == [tid]
+    assert found(client, 'q=coach&category=Travel') == []
+
+    # Writes that skip the app's hooks are picked up by a rebuild
+    db.session.execute(db.text('UPDATE "transaction" SET description = \'Ferry\' WHERE id = :id'), {'id': tid})
+    db.session.commit()
+    result = app.test_cli_runner().invoke(args=['rebuild-search-index'])
+    assert 'rebuilt from 1 transactions' in result.output
+    assert found(client, 'q=ferry') == [tid]
+    assert found(client, 'q=bus') == []
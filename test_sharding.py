@@ -0,0 +1,110 @@
+import sqlite3
+
+from app import create_app
+from sharding import jump_hash, shard_for
+from test_factory import file_config
+
+
+def sharded_config(tmp_path, count, **overrides):
+    return file_config(tmp_path, SHARD_COUNT=count,
+                       SHARD_DATABASE_URL=f"sqlite:///{tmp_path / 'shard-{shard}.db'}", **overrides)
+
+
+def signup(app, name):
+    client = app.test_client()
+    response = client.post('/api/auth/signup', json={'username': name, 'email': f'{name}@example.com',
+                                                     'password': 'pw'})
+    assert response.status_code == 201
+    return client, response.get_json()['user_id']
+
+
+def rows(path, sql, *params):
+    conn = sqlite3.connect(path)
+    try:
+        return conn.execute(sql, params).fetchall()
+    finally:
+        conn.close()
+
+
+def test_jump_hash_is_stable_and_only_moves_users_onto_new_shards():
+    assert [jump_hash(key, 10) for key in range(8)] == [jump_hash(key, 10) for key in range(8)]
+    before = [shard_for(user_id, 4) for user_id in range(1, 2001)]
+    after = [shard_for(user_id, 5) for user_id in range(1, 2001)]
+    moved = [new for old, new in zip(before, after) if old != new]
+    assert set(moved) == {4}
+    assert 300 < len(moved) < 500  # about a fifth
+    assert all(400 < before.count(shard) < 600 for shard in range(4))
+
+
+def test_user_data_lives_on_its_shard(tmp_path):
+    app = create_app(sharded_config(tmp_path, 3))
+    users = {}
+    for n in range(6):
+        client, user_id = signup(app, f'u{n}')
+        users[user_id] = client
+        for amount in (10, 20):
+            assert client.post('/api/transactions', json={'type': 'expense', 'category': 'Food', 'amount': amount,
+                                                          'description': f'lunch {n}'}).status_code == 201
+        assert client.post('/api/budgets', json={'category': 'Food', 'limit': 100}).status_code == 201
+
+    assert rows(tmp_path / 'f.db', 'SELECT COUNT(*) FROM "transaction"') == [(0,)]
+    assert len(rows(tmp_path / 'f.db', 'SELECT id FROM user')) == 6
+    for user_id, client in users.items():
+        shard = tmp_path / f'shard-{shard_for(user_id, 3)}.db'
+        assert rows(shard, 'SELECT SUM(amount) FROM "transaction" WHERE user_id = ?', user_id) == [(30.0,)]
+        assert rows(shard, 'SELECT password, data_version FROM user WHERE id = ?', user_id) == [('', 3)]
+        assert client.get('/api/dashboard').get_json()['totalExpenses'] == 30
+        assert len(client.get('/api/transactions/search?q=lunch').get_json()['results']) == 2
+        budgets = client.get('/api/budgets').get_json()
+        assert [b['category'] for b in budgets] == ['Food']
+    assert client.get('/api/auth/me').get_json()['username'] == 'u5'
+
+
+def test_rebalance_moves_users_onto_added_shards(tmp_path):
+    app = create_app(file_config(tmp_path))
+    clients = []
+    for n in range(8):
+        client, user_id = signup(app, f'u{n}')
+        client.post('/api/transactions', json={'type': 'income', 'category': 'Salary', 'amount': 100 + n,
+                                               'description': f'pay {n}'})
+        clients.append((client, user_id))
+
+    # Move everything out of the main database onto two shards, then grow to three
+    for count, previous in ((2, 0), (3, 2)):
+        app = create_app(sharded_config(tmp_path, count))
+        result = app.test_cli_runner().invoke(args=['rebalance-shards', '--from-count', str(previous)])
+        assert result.exit_code == 0, result.output
+    assert rows(tmp_path / 'f.db', 'SELECT COUNT(*) FROM "transaction"') == [(0,)]
+    for n, (client, user_id) in enumerate(clients):
+        shard = shard_for(user_id, 3)
+        for other in {0, 1, 2} - {shard}:
+            assert rows(tmp_path / f'shard-{other}.db', 'SELECT * FROM user WHERE id = ?', user_id) == []
+        other = app.test_client()
+        other.set_cookie('session', client.get_cookie('session').value)
+        [transaction] = other.get('/api/transactions').get_json()['transactions']
+        assert transaction['amount'] == 100 + n and transaction['category'] == 'Salary'
+        assert other.get('/api/sync?since=1').get_json()['reset'] is True  # ids changed on the way
+        assert other.get('/api/transactions/search?q=pay').get_json()['results'][0]['id'] == transaction['id']
+        assert other.post('/api/transactions', json={'type': 'expense', 'category': 'Salary',
+                                                     'amount': 1}).status_code == 201
+
+    result = app.test_cli_runner().invoke(args=['shard-stats'])
+    assert result.exit_code == 0
+    assert result.output.splitlines()[-1].split() == ['all', '8', '16', f'{sum(range(100, 108)):.2f}', '8.00']
+
+
+def test_write_behind_keeps_a_queue_per_shard(tmp_path):
+    app = create_app(sharded_config(tmp_path, 2, WRITE_BEHIND=True))
+    try:
+        users = [signup(app, f'u{n}') for n in range(4)]
+        for client, _ in users:
+            assert client.post('/api/goals', json={'name': 'Trip', 'target': 500}).status_code == 201
+        for client, user_id in users:
+            assert rows(tmp_path / f'shard-{shard_for(user_id, 2)}.db',
+                        'SELECT name FROM savings_goal WHERE user_id = ?', user_id) == [('Trip',)]
+            assert [g['name'] for g in client.get('/api/goals').get_json()] == ['Trip']
+        assert [q.stats()['operations'] for q in app.extensions['write_queues']] == [
+            sum(shard_for(user_id, 2) == shard for _, user_id in users) for shard in (0, 1)]
+    finally:
+        for write_queue in app.extensions['write_queues']:
+            write_queue.stop()
@@ -0,0 +1,71 @@
+from datetime import datetime, timedelta
+
+from app import app, db, import_rows, ChangeLog
+
+
+def add(client, amount, category='Food'):
+    return client.post('/api/transactions', json={'type': 'expense', 'category': category,
+                                                  'amount': amount}).get_json()['id']
+
+
+def sync(client, since):
+    response = client.get(f'/api/sync?since={since}')
+    assert response.status_code == 200
+    return response.get_json()
+
+
+def test_snapshot_then_only_what_changed(client):
+    gone, kept = add(client, 5), add(client, 6)
+    client.post('/api/goals', json={'name': 'Car', 'target': 900})
+
+    snapshot = sync(client, 0)
+    assert snapshot['reset'] is True
+    assert [t['id'] for t in snapshot['transactions']['upserted']] == [gone, kept]
+    assert [g['name'] for g in snapshot['goals']['upserted']] == ['Car']
+
+    assert client.delete(f'/api/transactions/{gone}').status_code == 200
+    new = add(client, 7, 'Rent')
+    budget = client.post('/api/budgets', json={'category': 'Rent', 'limit': 800}).get_json()['id']
+    delta = sync(client, snapshot['version'])
+    assert delta['reset'] is False and delta['version'] == snapshot['version'] + 3
+    assert [(t['id'], t['category']) for t in delta['transactions']['upserted']] == [(new, 'Rent')]
+    assert delta['transactions']['deleted'] == [gone]
+    assert [b['id'] for b in delta['budgets']['upserted']] == [budget]
+    assert delta['goals'] == {'upserted': [], 'deleted': []}
+
+    # SQLite reuses the highest id after a delete; the row comes back as an upsert, not a delete
+    assert client.delete(f'/api/transactions/{new}').status_code == 200
+    assert add(client, 8) == new
+    latest = sync(client, delta['version'])
+    assert [(t['id'], t['amount']) for t in latest['transactions']['upserted']] == [(new, 8)]
+    assert latest['transactions']['deleted'] == []
+
+    # Up to date: nothing but the version
+    assert sync(client, latest['version']) == {
+        'version': latest['version'], 'reset': False, 'transactions': {'upserted': [], 'deleted': []},
+        'budgets': {'upserted': [], 'deleted': []}, 'goals': {'upserted': [], 'deleted': []}}
+    # A version from the future (say, a restored database) forces a snapshot
+    assert sync(client, latest['version'] + 5)['reset'] is True
+    assert client.get('/api/sync?since=abc').status_code == 400
+
+
+def test_imports_are_logged_as_id_ranges(client):
+    version = sync(client, 0)['version']
+    now = datetime(2024, 5, 1)
+    import_rows(1, ((0, ('expense', 'Food', float(n), 'bulk', now), None) for n in range(50)))
+    assert db.session.query(ChangeLog).filter_by(version=version + 1).count() == 1
+    delta = sync(client, version)
+    assert [t['amount'] for t in delta['transactions']['upserted']] == [float(n) for n in range(50)]
+
+
+def test_pruning_makes_old_clients_start_over(client):
+    version = sync(client, 0)['version']
+    add(client, 1)
+    db.session.query(ChangeLog).update({'created_at': datetime.now() - timedelta(days=100)})
+    db.session.commit()
+    add(client, 2)
+
+    result = app.test_cli_runner().invoke(args=['prune-change-log', '--days', '30'])
+    assert result.exit_code == 0 and 'Pruned 1 ' in result.output
+    assert sync(client, version)['reset'] is True
+    assert len(sync(client, version + 1)['transactions']['upserted']) == 1
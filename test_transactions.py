@@ -0,0 +1,131 @@
+from datetime import datetime, timedelta
+
+from app import db, category_ids, Category, Transaction
+
+
+def seed(user_id, count, start=datetime(2025, 1, 1)):
+    ids = category_ids(user_id, ['Food', 'Rent', 'Fun'])
+    db.session.execute(db.insert(Transaction), [{
+        'user_id': user_id,
+        'type': 'income' if i % 4 == 0 else 'expense',
+        'category_id': ids[['Food', 'Rent', 'Fun'][i % 3]],
+        'amount': float(i),
+        'description': '',
+        # Pairs of rows share a timestamp so the id tie-breaker matters
+        'date': start + timedelta(hours=i // 2)
+    } for i in range(count)])
+    db.session.commit()
+
+
+def collect(client, query=''):
+    ids, cursor, pages = [], None, 0
+    while True:
+        url = f'/api/transactions?{query}' + (f'&cursor={cursor}' if cursor else '')
+        data = client.get(url).get_json()
+        ids += [t['id'] for t in data['transactions']]
+        pages += 1
+        cursor = data['next_cursor']
+        if not cursor:
+            return ids, pages
+
+
+def test_keyset_pagination_walks_every_row_once(client):
+    seed(1, 237)
+    ids, pages = collect(client, 'limit=25')
+    assert pages == 10
+    assert len(ids) == len(set(ids)) == 237
+
+    rows = Transaction.query.order_by(Transaction.date.desc(), Transaction.id.desc()).all()
+    assert ids == [t.id for t in rows]
+
+
+def test_default_page_is_bounded(client):
+    seed(1, 120)
+    data = client.get('/api/transactions').get_json()
+    assert len(data['transactions']) == 50
+    assert data['next_cursor']
+    assert len(client.get('/api/transactions?limit=100000').get_json()['transactions']) == 120
+
+
+def test_filters(client, make_user):
+    seed(1, 100)
+    seed(make_user('other').id, 50)
+
+    ids, _ = collect(client, 'type=expense&category=Food&min_amount=10&max_amount=60&limit=7')
+    expected = Transaction.query.filter(
+        Transaction.user_id == 1, Transaction.type == 'expense', Transaction.category.has(Category.name == 'Food'),
+        Transaction.amount >= 10, Transaction.amount <= 60
+    ).count()
+    assert len(ids) == expected > 0
+
+    # end_date is inclusive of the whole day
+    data = client.get('/api/transactions?start_date=2025-01-02&end_date=2025-01-02&limit=500').get_json()
+    assert len(data['transactions']) == 48
+    assert all(t['date'].startswith('2025-01-02') for t in data['transactions'])
+
+
+def test_bad_filters_are_rejected(client):
+    assert client.get('/api/transactions?start_date=yesterday').status_code == 400
+    assert client.get('/api/transactions?min_amount=lots').status_code == 400
+    assert client.get('/api/transactions?cursor=!!!').status_code == 400
+
+
+def decode_columns(page):
+    return [{
+        'id': page['id'][i],
+        'type': page['types'][page['type'][i]],
+        'category': page['categories'][page['category'][i]],
+        'amount': page['amount'][i],
+        'description': page['description'][i],
+        'date': datetime.utcfromtimestamp(page['date'][i]).strftime('%Y-%m-%d %H:%M'),
+    } for i in range(page['count'])]
+
+
+def test_columnar_pages_match_row_pages(client):
+    seed(1, 130)
+    query = 'limit=40&type=expense&start_date=2025-01-02'
+    rows, columns, row_cursor, column_cursor = [], [], None, None
+    while True:
+        suffix = f'&cursor={row_cursor}' if row_cursor else ''
+        page = client.get(f'/api/transactions?{query}{suffix}').get_json()
+        rows += page['transactions']
+        suffix = f'&cursor={column_cursor}' if column_cursor else ''
+        columnar = client.get(f'/api/transactions?{query}&format=columnar{suffix}').get_json()
+        assert columnar['format'] == 'columnar' and columnar['categories']
+        columns += decode_columns(columnar)
+        row_cursor, column_cursor = page['next_cursor'], columnar['next_cursor']
+        assert bool(row_cursor) == bool(column_cursor)
+        if not row_cursor:
+            break
+    assert len(rows) == 61
+    assert columns == rows
+
+
+def test_columnar_allows_larger_pages_and_rejects_unknown_formats(client):
+    seed(1, 600)
+    assert client.get('/api/transactions?limit=5000').get_json()['next_cursor'] is not None
+    page = client.get('/api/transactions?limit=5000&format=columnar').get_json()
+    assert page['count'] == 600 and page['next_cursor'] is None
+    assert page['date'][0] == int((datetime(2025, 1, 1) + timedelta(hours=299) - datetime(1970, 1, 1)).total_seconds())
+
+    empty = client.get('/api/transactions?format=columnar&category=None').get_json()
+    assert empty['count'] == 0 and empty['id'] == [] and empty['categories'] == []
+    assert client.get('/api/transactions?format=xml').status_code == 400
+
+
+def test_categories_are_interned_per_user(client, make_user):
+    for amount in (5, 6):
+        client.post('/api/transactions', json={'type': 'expense', 'category': 'Food', 'amount': amount})
+    client.post('/api/budgets', json={'category': 'Food', 'limit': 100})
+    seed(make_user('other').id, 3)
+
+    mine = Category.query.filter_by(user_id=1).all()
+    assert [c.name for c in mine] == ['Food']
+    assert Category.query.filter_by(name='Food').count() == 2
+    assert {t.category_id for t in Transaction.query.filter_by(user_id=1)} == {mine[0].id}
+
+    page = client.get('/api/transactions').get_json()['transactions']
+    assert [t['category'] for t in page] == ['Food', 'Food']
+    assert client.get('/api/budgets').get_json()[0]['category'] == 'Food'
+    assert client.get('/api/transactions?category=Rent').get_json()['transactions'] == []
+    assert client.post('/api/transactions', json={'type': 'expense', 'category': '  ', 'amount': 1}).status_code == 400
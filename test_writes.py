@@ -0,0 +1,142 @@
+import threading
+
+import pytest
+
+from app import create_app, db, Transaction
+from test_factory import file_config
+from writes import WriteQueue, WriteQueueUnavailable
+
+
+def test_queue_batches_concurrent_writes_and_fails_them_one_by_one():
+    batches = []
+
+    def run_batch(operations):
+        batches.append(len(operations))
+        outcomes = []
+        for operation in operations:
+            try:
+                outcomes.append((operation(), None))
+            except Exception as e:
+                outcomes.append((None, e))
+        return outcomes
+
+    def fail():
+        raise ValueError('bad row')
+
+    write_queue = WriteQueue(max_batch=8, max_delay=0.05)
+    write_queue.start(run_batch)
+    results = [None] * 16
+    errors = []
+
+    def client(i):
+        try:
+            results[i] = write_queue.submit(fail if i == 3 else lambda: i * 10)
+        except ValueError as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=client, args=(i,)) for i in range(16)]
+    try:
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    finally:
+        write_queue.stop()
+    assert [r for i, r in enumerate(results) if i != 3] == [i * 10 for i in range(16) if i != 3]
+    assert len(errors) == 1
+    assert max(batches) > 1 and sum(batches) == 16
+    assert write_queue.stats() == {'batches': len(batches), 'operations': 16, 'queued': 0}
+    assert not write_queue.running
+
+
+def test_failed_commit_fails_the_whole_batch():
+    def run_batch(operations):
+        raise RuntimeError('disk full')
+
+    write_queue = WriteQueue()
+    write_queue.start(run_batch)
+    try:
+        with pytest.raises(RuntimeError, match='disk full'):
+            write_queue.submit(lambda: 1)
+    finally:
+        write_queue.stop()
+
+
+@pytest.mark.filterwarnings('ignore::pytest.PytestUnhandledThreadExceptionWarning')  # the writer dies on purpose
+def test_callers_give_up_on_a_wedged_or_dead_writer():
+    release, ran = threading.Event(), []
+
+    def run_batch(operations):
+        if not ran:
+            ran.append('first')
+            raise SystemExit  # the writer thread dies without answering
+        release.wait(10)
+        ran.extend(operation() for operation in operations)
+        return [(None, None)] * len(operations)
+
+    write_queue = WriteQueue(max_delay=0, timeout=0.2)
+    write_queue.start(run_batch)
+    try:
+        with pytest.raises(WriteQueueUnavailable):
+            write_queue.submit(lambda: 'lost')
+        # A new writer replaces the dead one, then wedges on its first batch
+        with pytest.raises(WriteQueueUnavailable):
+            write_queue.submit(lambda: 'wedged')
+        with pytest.raises(WriteQueueUnavailable):
+            write_queue.submit(lambda: 'abandoned')
+        release.set()
+        assert write_queue.submit(lambda: 'late') is None
+        # The abandoned write was still queued when its caller gave up, so it never ran
+        assert ran == ['first', 'wedged', 'late']
+    finally:
+        release.set()
+        write_queue.stop()
+    with pytest.raises(WriteQueueUnavailable, match='stopped'):
+        write_queue.submit(lambda: 1)
+
+def test_write_behind_commits_before_acknowledging(tmp_path):
+    app = create_app(file_config(tmp_path, WRITE_BEHIND=True))
+    try:
+        client = app.test_client()
+        assert client.post('/api/auth/signup', json={'username': 'w', 'email': 'w@example.com',
+                                                     'password': 'pw'}).status_code == 201
+        added = []
+
+        def add(i):
+            with app.test_client() as own:
+                own.set_cookie('session', client.get_cookie('session').value)
+                category = None if i == 7 else 'Food'
+                response = own.post('/api/transactions', json={'type': 'expense', 'category': category,
+                                                               'amount': i + 1, 'description': f'meal {i}'})
+                added.append(response.status_code)
+
+        threads = [threading.Thread(target=add, args=(i,)) for i in range(20)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        # The bad write fails on its own; the rest of its batch still commits
+        assert sorted(added) == [201] * 19 + [400]
+        page = client.get('/api/transactions').get_json()['transactions']
+        assert len(page) == 19
+        assert client.delete(f"/api/transactions/{page[0]['id']}").status_code == 200
+        assert client.delete(f"/api/transactions/{page[0]['id']}").status_code == 404
+        assert len(client.get('/api/transactions').get_json()['transactions']) == 18
+        with app.app_context():
+            assert db.session.query(Transaction).count() == 18
+        stats = app.extensions['write_queues'][0].stats()
+        assert stats['operations'] == 22
+    finally:
+        app.extensions['write_queues'][0].stop()
+
+
+
+def test_writes_answer_503_when_the_queue_is_down(tmp_path):
+    app = create_app(file_config(tmp_path, WRITE_BEHIND=True))
+    client = app.test_client()
+    client.post('/api/auth/signup', json={'username': 'w', 'email': 'w@example.com', 'password': 'pw'})
+    app.extensions['write_queues'][0].stop()
+    response = client.post('/api/transactions', json={'type': 'expense', 'category': 'Food', 'amount': 1})
+    assert response.status_code == 503
+    assert 'stopped' in response.get_json()['error']
+    assert client.delete('/api/transactions/1').status_code == 503
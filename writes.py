@@ -0,0 +1,121 @@
+"""Group commit: one writer thread commits the writes of many requests together.
+
+With ``WRITE_BEHIND`` on, a write request hands its operation to the queue and
+blocks. The writer thread takes the first waiting operation, gathers more
+until ``max_batch`` are queued or ``max_delay`` seconds have passed, runs them
+all in one database transaction and commits once. Only then does each request
+get its result, so a 201 still means the row is committed, as durable as with
+a commit per request. Under concurrent load the fsync and the SQLite write lock
+are paid once per batch instead of once per request; a lone request waits at
+most ``max_delay`` longer.
+
+A request waits at most ``timeout`` seconds for its batch; past that, or when the
+queue has been stopped, ``submit()`` raises ``WriteQueueUnavailable`` instead of
+holding the request thread forever. An operation still queued when its caller
+gives up is dropped, never run; one already in a running batch may still commit.
+A writer thread that died is replaced on the next submit.
+
+The queue itself knows nothing about databases: ``start()`` takes a
+``run_batch(operations)`` callable that runs the operations in one transaction
+and returns a ``(result, exception)`` pair for each.
+"""
+from concurrent.futures import Future, TimeoutError
+import queue
+import threading
+import time
+
+_STOP = object()
+
+
+class WriteQueueUnavailable(RuntimeError):
+    """The write could not be confirmed: the queue is stopped or its batch did not commit in time"""
+
+
+class WriteQueue:
+    def __init__(self, max_batch=64, max_delay=0.002, timeout=30):
+        self.max_batch = max_batch
+        self.max_delay = max_delay
+        self.timeout = timeout
+        self._queue = queue.Queue()
+        self._thread = None
+        self._run_batch = None
+        self._lock = threading.Lock()
+        self.batches = 0
+        self.operations = 0
+
+    @property
+    def running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self, run_batch):
+        with self._lock:
+            self._run_batch = run_batch
+            if not self.running:
+                self._start_thread()
+
+    def _start_thread(self):
+        self._thread = threading.Thread(target=self._run, args=(self._run_batch,), name='group-commit', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Commit what is queued, then end the writer thread"""
+        with self._lock:
+            thread, self._thread = self._thread, None
+        if thread is not None:
+            self._queue.put(_STOP)
+            thread.join()
+
+    def submit(self, operation):
+        """Queue `operation` and wait until its batch commits; returns its result or raises its exception"""
+        with self._lock:
+            if self._thread is None:
+                raise WriteQueueUnavailable('the write queue is stopped')
+            if not self._thread.is_alive():
+                self._start_thread()  # the writer died; a new one picks up what is queued
+        future = Future()
+        self._queue.put((operation, future))
+        try:
+            return future.result(timeout=self.timeout)
+        except TimeoutError:
+            future.cancel()  # still queued: the writer skips it
+            raise WriteQueueUnavailable(f'the write was not committed within {self.timeout:g}s')
+
+    def stats(self):
+        return {'batches': self.batches, 'operations': self.operations, 'queued': self._queue.qsize()}
+
+    def _collect(self, first):
+        """The batch starting with `first`, and whether a stop was requested while gathering it"""
+        batch = [first]
+        deadline = time.monotonic() + self.max_delay
+        while len(batch) < self.max_batch:
+            try:
+                item = self._queue.get(timeout=max(0.0, deadline - time.monotonic()))
+            except queue.Empty:
+                break
+            if item is _STOP:
+                return batch, True
+            batch.append(item)
+        return batch, False
+
+    def _run(self, run_batch):
+        stopping = False
+        while not stopping:
+            item = self._queue.get()
+            if item is _STOP:
+                break
+            batch, stopping = self._collect(item)
+            # Drop operations whose callers already gave up waiting
+            batch = [(operation, future) for operation, future in batch if future.set_running_or_notify_cancel()]
+            if not batch:
+                continue
+            try:
+                outcomes = run_batch([operation for operation, _ in batch])
+            except Exception as e:  # the commit itself failed, so nothing in the batch was written
+                outcomes = [(None, e)] * len(batch)
+            self.batches += 1
+            self.operations += len(batch)
+            for (_, future), (result, error) in zip(batch, outcomes):
+                if error is not None:
+                    future.set_exception(error)
+                else:
+                    future.set_result(result)
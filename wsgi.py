@@ -0,0 +1,8 @@
+"""Production entry point: a WSGI server imports `app` from here, once per worker process.
+
+    gunicorn wsgi:app          # settings come from gunicorn.conf.py
+
+Every worker shares the database file and the session key (SECRET_KEY, or the
+generated instance/secret_key), so requests can land on any worker.
+"""
+from app import app  # noqa: F401